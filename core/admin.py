@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     Compromisso, Nota, Transacao, CartaoCredito, DespesaCartao, 
     Ativo, OperacaoInvestimento, Desafio, SemanaDesafio, ContaPagar, 
-    AnaliseBot
+    AnaliseBot, Tarefa, PresetScreener, ExecucaoPipeline
 )
 
 # --- CONFIGURAÇÃO DA ADMINISTRAÇÃO ---
@@ -77,4 +77,24 @@ class DesafioAdmin(admin.ModelAdmin):
 class ContaPagarAdmin(admin.ModelAdmin):
     list_display = ('titulo', 'valor', 'data_vencimento', 'status_vencimento', 'recorrencia', 'user')
     list_filter = ('pago', 'recorrencia', 'data_vencimento')
-    search_fields = ('titulo',)
\ No newline at end of file
+    search_fields = ('titulo',)
+
+# --- FILA DE TAREFAS ---
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'user', 'status', 'progresso', 'criado_em', 'finalizado_em')
+    list_filter = ('tipo', 'status')
+
+@admin.register(ExecucaoPipeline)
+class ExecucaoPipelineAdmin(admin.ModelAdmin):
+    list_display = ('pipeline', 'user', 'iniciado_em', 'duracao_ms', 'total_falhas')
+    list_filter = ('pipeline',)
+    readonly_fields = ('etapas', 'simbolos')
+
+
+# --- RADAR DE MERCADO ---
+
+@admin.register(PresetScreener)
+class PresetScreenerAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'ordenar_por', 'limite', 'user')
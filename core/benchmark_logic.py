@@ -0,0 +1,90 @@
+"""
+Benchmark das views principais: número de queries e latência (p50/p95).
+
+Cada view é chamada pelo test client, logado como um usuário com volume
+sintético (dados_sinteticos.gerar_perfil). As primeiras chamadas aquecem
+os caches (diagnóstico, templates) e ficam fora da medição; as queries
+contadas são as da chamada em regime. `verificar_limites` compara com
+LIMITES (sobrescritos por settings.BENCHMARK_LIMITES) e lista as
+regressões; o teste e o `manage.py benchmark_views` falham se houver alguma.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+VIEWS = ['dashboard', 'financas', 'investimentos_dashboard', 'saude_financeira', 'desafios_lista']
+
+# Teto por view. As queries são as de hoje e não crescem com o volume (sem
+# N+1): subir o número é regressão. A latência (com VOLUMES_PADRAO) tem
+# folga para máquinas lentas de CI.
+LIMITES = {
+    'dashboard': {'consultas': 9, 'p95_ms': 500},
+    'financas': {'consultas': 7, 'p95_ms': 800},
+    'investimentos_dashboard': {'consultas': 6, 'p95_ms': 500},
+    'saude_financeira': {'consultas': 3, 'p95_ms': 300},
+    'desafios_lista': {'consultas': 4, 'p95_ms': 500},
+}
+
+
+def limites_configurados():
+    extras = getattr(settings, 'BENCHMARK_LIMITES', {})
+    return {view: {**LIMITES.get(view, {}), **extras.get(view, {})} for view in VIEWS}
+
+
+def percentil(valores, p):
+    """ Percentil pelo posto mais próximo (p em 0-100) """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posto = max(math.ceil(p / 100 * len(ordenados)), 1)
+    return ordenados[posto - 1]
+
+
+def medir_view(cliente, nome, repeticoes=20, aquecimento=2):
+    """ {'view', 'consultas', 'p50_ms', 'p95_ms', 'max_ms'} de GET na view `nome` """
+    url = reverse(nome)
+    for _ in range(aquecimento):
+        cliente.get(url)
+
+    tempos = []
+    consultas = 0
+    for _ in range(repeticoes):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            resposta = cliente.get(url)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        if resposta.status_code != 200:
+            raise AssertionError(f"{nome}: status {resposta.status_code}")
+        consultas = max(consultas, len(capturadas))
+
+    return {
+        'view': nome,
+        'consultas': consultas,
+        'p50_ms': round(percentil(tempos, 50), 2),
+        'p95_ms': round(percentil(tempos, 95), 2),
+        'max_ms': round(max(tempos), 2),
+    }
+
+
+def executar_benchmark(user, views=None, repeticoes=20, aquecimento=2):
+    cliente = Client()
+    cliente.force_login(user)
+    return [medir_view(cliente, nome, repeticoes, aquecimento) for nome in views or VIEWS]
+
+
+def verificar_limites(resultados, limites=None):
+    """ Mensagens das views acima do teto (lista vazia = tudo dentro) """
+    limites = limites if limites is not None else limites_configurados()
+    regressoes = []
+    for resultado in resultados:
+        teto = limites.get(resultado['view'], {})
+        if 'consultas' in teto and resultado['consultas'] > teto['consultas']:
+            regressoes.append(f"{resultado['view']}: {resultado['consultas']} queries (limite {teto['consultas']})")
+        if 'p95_ms' in teto and resultado['p95_ms'] > teto['p95_ms']:
+            regressoes.append(f"{resultado['view']}: p95 {resultado['p95_ms']} ms (limite {teto['p95_ms']} ms)")
+    return regressoes
@@ -1,167 +1,466 @@
+import logging
+import time
+from datetime import timedelta
 import yfinance as yf
-import requests
 import pandas as pd
-from io import StringIO
-from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.db import transaction
 from .models import Ativo, AnaliseBot
+from .cache_mercado import get_cache_mercado
+from .health_logic import invalidar_diagnostico
+from .historico_logic import periodos_pendentes, gravar_historico, dividendos_acumulados
+from .screener_logic import carregar_tabela, carregar_tabela_async, aplicar_filtros, CRITERIOS_PADRAO
+from .medicao import Medidor
 
-# --- 1. CONFIGURAÇÃO DE DISFARCE (Apenas para o Fundamentus) ---
-def get_headers():
-    return {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
+logger = logging.getLogger(__name__)
 
-# --- 2. FUNÇÃO DE ANÁLISE DA CARTEIRA (CORRIGIDA) ---
-def executar_analise_carteira(user):
-    ativos = Ativo.objects.filter(user=user)
-    
-    # REMOVI A SESSÃO AQUI. O yfinance vai gerenciar a dele sozinho.
-    
-    print("--- INICIANDO ANÁLISE COMPLETA (LOCAL) ---")
+# --- 1. CLIENTE DE DADOS DE MERCADO (Plugável) ---
+class ClienteYahoo:
+    """
+    Cliente padrão de dados de mercado, baseado no yfinance.
+    Qualquer objeto com os mesmos métodos (cotacoes, info, dividendos,
+    historico) pode substituí-lo, por exemplo um stub local nos testes.
+    """
+    def cotacoes(self, simbolos):
+        """
+        Último preço de todos os símbolos em um único download.
+        Retorna uma Series indexada pelo símbolo (ausentes ficam de fora).
+        """
+        simbolos = list(simbolos)
+        if not simbolos:
+            return pd.Series(dtype=float)
 
-    for ativo in ativos:
-        # Prepara ticker para o Yahoo
-        if ativo.tipo == 'CRIPTO': ticker_yf = f"{ativo.ticker}-BRL"
-        elif ativo.ticker.endswith('.SA'): ticker_yf = ativo.ticker
-        else: ticker_yf = f"{ativo.ticker}.SA"
+        df = yf.download(simbolos, period='5d', progress=False, auto_adjust=False, threads=True)
+        if df.empty:
+            return pd.Series(dtype=float)
+
+        fechamento = df['Close']
+        if isinstance(fechamento, pd.Series):
+            fechamento = fechamento.to_frame(simbolos[0])
+        return fechamento.ffill().iloc[-1].dropna().astype(float)
+
+    def info(self, simbolo):
+        return yf.Ticker(simbolo).info
+
+    def dividendos(self, simbolo):
+        return yf.Ticker(simbolo).dividends
+
+    def historico(self, simbolo, inicio, fim=None):
+        """
+        Fechamentos e dividendos diários de `inicio` até `fim` (inclusive;
+        None = até hoje). Retorna um DataFrame indexado por data com
+        'fechamento' e 'dividendo'.
+        """
+        # No yfinance o `end` é exclusivo
+        end = fim + timedelta(days=1) if fim else None
+        df = yf.Ticker(simbolo).history(start=inicio, end=end, auto_adjust=False, actions=True)
+        if df.empty:
+            return pd.DataFrame(columns=['fechamento', 'dividendo'])
+        datas = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        return pd.DataFrame({
+            'fechamento': df['Close'].to_numpy(),
+            'dividendo': df['Dividends'].to_numpy() if 'Dividends' in df else 0.0,
+        }, index=datas.normalize())
+
+class ClienteCacheado:
+    """
+    Envolve qualquer cliente com o cache compartilhado de mercado: uma
+    cotação/info/dividendos já buscada por outro usuário não volta à rede
+    até vencer o TTL do seu tipo.
+    """
+    def __init__(self, cliente, cache=None):
+        self.cliente = cliente
+        self.cache = cache or get_cache_mercado()
+
+    def cotacoes(self, simbolos):
+        encontrados = {}
+        faltando = []
+        for simbolo in simbolos:
+            preco = self.cache.obter('preco', simbolo)
+            if preco is None:
+                faltando.append(simbolo)
+            else:
+                encontrados[simbolo] = preco
+
+        if faltando:
+            novos = self.cliente.cotacoes(faltando)
+            for simbolo, preco in novos.items():
+                self.cache.guardar('preco', simbolo, float(preco))
+                encontrados[simbolo] = float(preco)
+
+        return pd.Series(encontrados, dtype=float)
+
+    def info(self, simbolo):
+        return self.cache.obter_ou_buscar('info', simbolo, lambda: self.cliente.info(simbolo))
+
+    def dividendos(self, simbolo):
+        return self.cache.obter_ou_buscar('dividendos', simbolo, lambda: self.cliente.dividendos(simbolo))
+
+    def historico(self, simbolo, inicio, fim=None):
+        # A série local (historico_logic) já é o cache: só o trecho novo chega aqui
+        return self.cliente.historico(simbolo, inicio, fim)
+
+class BuscaIncremental:
+    """
+    Adapta um cliente para o coletar_dados_mercado: a etapa 'historico' pede
+    só os trechos pendentes de cada símbolo (numa tabela só); as demais
+    etapas passam direto.
+    """
+    def __init__(self, cliente, pendentes):
+        self.cliente = cliente
+        self.pendentes = pendentes
+
+    def historico(self, simbolo):
+        tabelas = [self.cliente.historico(simbolo, desde, ate) for desde, ate in self.pendentes[simbolo]]
+        cheias = [tabela for tabela in tabelas if not tabela.empty]
+        if len(cheias) <= 1:
+            return cheias[0] if cheias else tabelas[0]
+        return pd.concat(cheias)
+
+    def __getattr__(self, nome):
+        return getattr(self.cliente, nome)
+
+def montar_simbolo_yahoo(ativo):
+    """ Converte o ticker cadastrado no símbolo usado pelo Yahoo """
+    if ativo.tipo == 'CRIPTO': return f"{ativo.ticker}-BRL"
+    if ativo.ticker.endswith('.SA'): return ativo.ticker
+    return f"{ativo.ticker}.SA"
+
+# --- 2. COLETA CONCORRENTE (Todos os tickers de uma vez) ---
+def coletar_dados_mercado(pedidos, cliente=None, max_workers=8, timeout=15, ao_progredir=None, medidor=None):
+    """
+    Baixa em paralelo os dados pedidos para cada símbolo.
 
+    pedidos: {simbolo: ['preco', 'info', 'dividendos']}
+    Cada par (símbolo, etapa) vira uma tarefa no pool, com seu próprio timeout
+    contado a partir do início da tarefa. Falhas não interrompem os demais.
+
+    ao_progredir(concluidas, total), se informado, é chamado a cada tarefa
+    finalizada (com sucesso, erro ou timeout). Com `medidor`, a duração de
+    cada (símbolo, etapa) fica registrada nele.
+
+    Retorna (dados, falhas):
+        dados  = {simbolo: {etapa: valor}}  (só as etapas que deram certo)
+        falhas = [{'simbolo': ..., 'etapa': ..., 'erro': ...}]
+    """
+    cliente = cliente or ClienteYahoo()
+    dados = {simbolo: {} for simbolo in pedidos}
+    falhas = []
+    inicios = {}
+    fins = {}
+
+    def tarefa(simbolo, etapa):
+        inicios[(simbolo, etapa)] = time.monotonic()
         try:
-            # --- MUDANÇA AQUI: Não passamos mais session=session ---
-            stock = yf.Ticker(ticker_yf) 
-            
-            # A) PREÇO ATUAL (Prioriza fast_info)
-            try:
-                preco_atual = stock.fast_info['last_price']
-            except:
-                try:
-                    info = stock.info
-                    preco_atual = info.get('currentPrice') or info.get('regularMarketPrice') or 0
-                except:
-                    print(f"Erro ao pegar preço de {ativo.ticker}")
-                    continue
+            return getattr(cliente, etapa)(simbolo)
+        finally:
+            fins[(simbolo, etapa)] = time.monotonic()
 
-            if preco_atual and preco_atual > 0:
-                # --- CÁLCULO 1: VARIAÇÃO DE COTA ---
-                ativo.preco_medio = float(ativo.preco_medio)
-                ativo.quantidade_atual = float(ativo.quantidade_atual)
-                preco_atual_float = float(preco_atual)
-
-                variacao_unitaria = preco_atual_float - ativo.preco_medio
-                ativo.valorizacao_rs = variacao_unitaria * ativo.quantidade_atual
-                
-                if ativo.preco_medio > 0:
-                    ativo.valorizacao_pct = ((preco_atual_float / ativo.preco_medio) - 1) * 100
-                else:
-                    ativo.valorizacao_pct = 0
-
-                # --- CÁLCULO 2: DIVIDENDOS ACUMULADOS ---
-                try:
-                    if ativo.tipo in ['ACAO', 'FII']:
-                        divs = stock.dividends
-                        
-                        if not divs.empty:
-                            # Converte data do banco para UTC
-                            data_inicio = pd.Timestamp(ativo.data_inicio).tz_localize('UTC')
-                            divs_filtrados = divs[divs.index >= data_inicio]
-                            
-                            total_por_acao = float(divs_filtrados.sum())
-                            ativo.total_dividendos = total_por_acao * ativo.quantidade_atual
-                        else:
-                            ativo.total_dividendos = 0
-                except Exception as e:
-                    print(f"Erro calculando dividendos {ativo.ticker}: {e}")
-                
-                ativo.save()
+    def medir(simbolo, etapa, erro=None):
+        if medidor is not None:
+            inicio = inicios.get((simbolo, etapa))
+            fim = fins.get((simbolo, etapa), time.monotonic())
+            medidor.registrar(etapa, simbolo, (fim - inicio) * 1000 if inicio is not None else 0.0, erro)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futuros = {
+        executor.submit(tarefa, simbolo, etapa): (simbolo, etapa)
+        for simbolo, etapas in pedidos.items()
+        for etapa in etapas
+    }
+    # Teto global: se todos os workers travarem, as tarefas da fila nunca começam
+    lotes = -(-len(futuros) // max_workers)
+    prazo_final = time.monotonic() + timeout * (lotes + 1)
+    pendentes = set(futuros)
 
-                # --- CÁLCULO 3: VALUATION (Graham & Bazin) ---
+    try:
+        while pendentes:
+            prontos, pendentes = wait(pendentes, timeout=0.1, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                simbolo, etapa = futuros[futuro]
                 try:
-                    # Para Valuation, precisamos do .info completo
-                    info = stock.info
-                    score = 0
-                    recomendacao = "NEUTRO"
-                    detalhes = {}
-
-                    if ativo.tipo == 'ACAO' or ativo.tipo == 'FII':
-                        dy = (info.get('dividendYield', 0) or 0) * 100
-                        pvp = info.get('priceToBook', 0) or 0
-                        pl = info.get('trailingPE', 0) or 0
-                        
-                        # Critérios Visuais
-                        if dy > 6 and 0 < pvp < 1.5: score = 5; recomendacao = "COMPRAR"
-                        elif dy > 4: score = 3; recomendacao = "MANTER"
-                        else: score = 1; recomendacao = "REVISAR"
-                        
-                        detalhes = {'dy': dy, 'pvp': pvp, 'pl': pl}
-                    
-                    elif ativo.tipo == 'CRIPTO':
-                        score = 3; recomendacao = "MANTER"; detalhes = {}
-
-                    AnaliseBot.objects.update_or_create(
-                        ativo=ativo,
-                        defaults={
-                            'preco_atual': preco_atual,
-                            'recomendacao': recomendacao,
-                            'pontuacao': score,
-                            'pl': detalhes.get('pl', 0),
-                            'pvp': detalhes.get('pvp', 0),
-                            'dy': detalhes.get('dy', 0)
-                        }
-                    )
+                    dados[simbolo][etapa] = futuro.result()
+                    medir(simbolo, etapa)
                 except Exception as e:
-                    print(f"Erro Valuation {ativo.ticker}: {e}")
+                    falhas.append({'simbolo': simbolo, 'etapa': etapa, 'erro': str(e)})
+                    medir(simbolo, etapa, str(e))
+
+            agora = time.monotonic()
+            for futuro in list(pendentes):
+                inicio = inicios.get(futuros[futuro])
+                estourou = inicio is not None and agora - inicio > timeout
+                if estourou or agora > prazo_final:
+                    simbolo, etapa = futuros[futuro]
+                    futuro.cancel()
+                    pendentes.discard(futuro)
+                    falhas.append({'simbolo': simbolo, 'etapa': etapa, 'erro': f'timeout ({timeout}s)'})
+                    medir(simbolo, etapa, f'timeout ({timeout}s)')
+
+            if ao_progredir:
+                ao_progredir(len(futuros) - len(pendentes), len(futuros))
+    finally:
+        # Não espera threads travadas: o resultado delas já foi descartado
+        executor.shutdown(wait=False, cancel_futures=True)
 
+    return dados, falhas
+
+def gravar_historicos_coletados(dados, pendentes, falhas):
+    """ Grava na série local os trechos que a coleta trouxe """
+    for simbolo, trechos in pendentes.items():
+        tabela = dados.get(simbolo, {}).get('historico')
+        if tabela is None:
+            continue
+        try:
+            gravar_historico(simbolo, min(desde for desde, _ in trechos), tabela)
         except Exception as e:
-            print(f"Erro Crítico {ativo.ticker}: {e}")
+            falhas.append({'simbolo': simbolo, 'etapa': 'historico', 'erro': str(e)})
+
+def atualizar_historico(inicios, cliente=None, max_workers=8, timeout=15):
+    """
+    Atualiza a série local dos símbolos ({simbolo: primeira data necessária}),
+    buscando na rede só o trecho que falta. Retorna (atualizados, falhas).
+    """
+    pendentes = periodos_pendentes(inicios)
+    if not pendentes:
+        return 0, []
+    busca = BuscaIncremental(cliente or ClienteYahoo(), pendentes)
+    dados, falhas = coletar_dados_mercado(
+        {simbolo: ['historico'] for simbolo in pendentes}, cliente=busca, max_workers=max_workers, timeout=timeout,
+    )
+    gravar_historicos_coletados(dados, pendentes, falhas)
+    return len(pendentes) - len({f['simbolo'] for f in falhas}), falhas
+
+def calcular_valorizacao(ativos, simbolos, cotacoes, dados=None):
+    """
+    Monta a tabela de preços da carteira (uma linha por ativo) e calcula a
+    valorização coluna a coluna. Quem ficou sem cotação no lote usa o
+    currentPrice/regularMarketPrice do .info, se houver.
+    """
+    dados = dados or {}
+    tabela = pd.DataFrame.from_records(
+        [(a.pk, a.ticker, simbolos[a.pk], float(a.quantidade_atual), float(a.preco_medio)) for a in ativos],
+        columns=['pk', 'ticker', 'simbolo', 'quantidade', 'preco_medio'],
+        index='pk',
+    )
+    tabela['preco_atual'] = tabela['simbolo'].map(cotacoes).astype(float)
+
+    reserva = {
+        simbolo: (d['info'].get('currentPrice') or d['info'].get('regularMarketPrice'))
+        for simbolo, d in dados.items() if d.get('info')
+    }
+    tabela['preco_atual'] = tabela['preco_atual'].fillna(tabela['simbolo'].map(reserva).astype(float))
 
-# --- 3. FUNÇÃO DE RADAR (Mantida, pois usa requests puro) ---
-def buscar_oportunidades_mercado():
-    print("--- [DEBUG] 1. Iniciando busca no Fundamentus ---")
-    url = 'https://www.fundamentus.com.br/resultado.php'
-    
+    tabela['valorizacao_rs'] = (tabela['preco_atual'] - tabela['preco_medio']) * tabela['quantidade']
+    tabela['valorizacao_pct'] = (
+        ((tabela['preco_atual'] / tabela['preco_medio']) - 1) * 100
+    ).where(tabela['preco_medio'] > 0, 0)
+    return tabela
+
+# --- 3. FUNÇÃO DE ANÁLISE DA CARTEIRA ---
+def executar_analise_carteira(user, cliente=None, max_workers=8, timeout=15, progresso=None):
+    """
+    Analisa a carteira em duas fases:
+      1. Coleta: cotações num único download em lote, info e o trecho
+         pendente do histórico (fechamentos e dividendos) em paralelo.
+      2. Uma única passada que calcula os scores e grava as AnaliseBot.
+
+    progresso(percentual, mensagem), se informado, recebe o andamento
+    (usado pela fila de tarefas para a barra de progresso).
+
+    Cada etapa é cronometrada (core/medicao.py) e o resumo da execução,
+    com os símbolos mais lentos, fica gravado mesmo se a análise falhar.
+
+    Retorna um resumo com os ativos processados e as falhas parciais.
+    """
+    medidor = Medidor('robo', user)
     try:
-        # AQUI PRECISAMOS DA SESSÃO/HEADERS, pois não é yfinance
-        r = requests.get(url, headers=get_headers())
-        r.raise_for_status()
-        
-        df = pd.read_html(StringIO(r.text), decimal=',', thousands='.', attrs={'id': 'resultado'})[0]
-        
-        # Limpeza
-        for col in ['Div.Yield', 'Mrg Ebit', 'Mrg. Líq.', 'ROIC', 'ROE', 'Cresc. Rec.5a']:
-            df[col] = df[col].astype(str).str.replace('.', '').str.replace(',', '.').str.replace('%', '')
-            df[col] = pd.to_numeric(df[col], errors='coerce') / 100
-
-        for col in ['Liq.2meses', 'Patrim. Líq']:
-            df[col] = df[col].astype(str).str.replace('.', '').str.replace(',', '.')
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        # Filtros
-        df = df[df['Liq.2meses'] > 1000000]
-        df = df[(df['P/L'] > 0.01) & (df['P/L'] <= 15)]
-        df = df[(df['P/VP'] > 0.01) & (df['P/VP'] <= 1.5)]
-        df = df[df['Div.Yield'] > 0.06]
-        df = df[df['ROE'] > 0.10]
-
-        df = df.sort_values(by='Div.Yield', ascending=False)
-        top_20 = df.head(20)
-        
-        resultados = []
-        for index, row in top_20.iterrows():
-            resultados.append({
-                'ticker': row['Papel'],
-                'tipo': 'ACAO', 
-                'preco': float(row['Cotação']) / 100 if float(row['Cotação']) > 1000 else float(row['Cotação']),
-                'score': 5,
-                'recomendacao': "COMPRA FORTE",
-                'detalhes': {
-                    'dy': row['Div.Yield'] * 100,
-                    'pl': row['P/L'],
-                    'pvp': row['P/VP'],
-                    'roe': row['ROE'] * 100
-                }
-            })
-        
-        return resultados
+        return _analisar_carteira(user, cliente, max_workers, timeout, progresso, medidor)
+    finally:
+        medidor.salvar()
+
+def _analisar_carteira(user, cliente, max_workers, timeout, progresso, medidor):
+    progresso = progresso or (lambda percentual, mensagem='': None)
+    cliente = cliente or ClienteCacheado(ClienteYahoo())
+    with medidor.etapa('simbolos'):
+        ativos = list(Ativo.objects.filter(user=user))
+        simbolos = {ativo.pk: montar_simbolo_yahoo(ativo) for ativo in ativos}
+    falhas = []
 
+    # --- ETAPA 1: COTAÇÕES (Um único download para a carteira toda) ---
+    progresso(5, 'Baixando cotações')
+    try:
+        with medidor.etapa('cotacoes'):
+            cotacoes = cliente.cotacoes(sorted(set(simbolos.values())))
     except Exception as e:
-        print(f"--- [DEBUG] ERRO CRÍTICO NO SCREENER: {e} ---")
-        return []
\ No newline at end of file
+        cotacoes = pd.Series(dtype=float)
+        falhas.append({'simbolo': '*', 'etapa': 'cotacoes', 'erro': str(e)})
+
+    # --- ETAPA 2: INFO & HISTÓRICO (Concorrente) ---
+    # Dividendos vêm da série local: só o trecho ainda não gravado vai à rede
+    inicios = {}
+    for ativo in ativos:
+        if ativo.tipo in ['ACAO', 'FII']:
+            simbolo = simbolos[ativo.pk]
+            inicios[simbolo] = min(ativo.data_inicio, inicios.get(simbolo, ativo.data_inicio))
+    pendentes = periodos_pendentes(inicios)
+
+    pedidos = {}
+    for ativo in ativos:
+        simbolo = simbolos[ativo.pk]
+        etapas = pedidos.setdefault(simbolo, [])
+        # .info serve ao valuation e de reserva para quem ficou sem cotação
+        precisa_info = ativo.tipo in ['ACAO', 'FII'] or simbolo not in cotacoes.index
+        if precisa_info and 'info' not in etapas:
+            etapas.append('info')
+        if simbolo in pendentes and 'historico' not in etapas:
+            etapas.append('historico')
+
+    progresso(20, 'Coletando indicadores')
+    # Tempo de relógio da coleta; a duração de cada info/histórico por símbolo vai no medidor
+    with medidor.etapa('coleta'):
+        dados, falhas_coleta = coletar_dados_mercado(
+            {s: e for s, e in pedidos.items() if e}, cliente=BuscaIncremental(cliente, pendentes),
+            max_workers=max_workers, timeout=timeout, medidor=medidor,
+            ao_progredir=lambda feitas, total: progresso(20 + 70 * feitas // total, 'Coletando indicadores'),
+        )
+    falhas += falhas_coleta
+    with medidor.etapa('gravacao'):
+        gravar_historicos_coletados(dados, pendentes, falhas)
+
+    with medidor.etapa('calculo'):
+        # Soma por ação desde a data de início de cada ativo (uma consulta local)
+        dividendos_por_acao = dividendos_acumulados({
+            ativo.pk: (simbolos[ativo.pk], ativo.data_inicio) for ativo in ativos if ativo.tipo in ['ACAO', 'FII']
+        })
+
+        # --- ETAPA 3: VALORIZAÇÃO (Vetorizada, coluna a coluna) ---
+        tabela = calcular_valorizacao(ativos, simbolos, cotacoes, dados)
+        linhas = tabela.to_dict('index')
+
+        # --- ETAPA 4: CÁLCULO (uma passada, sem rede) ---
+        analises = []
+        for ativo in ativos:
+            simbolo = simbolos[ativo.pk]
+            dados_ticker = dados.get(simbolo, {})
+            info = dados_ticker.get('info')
+            linha = linhas[ativo.pk]
+
+            preco_atual = linha['preco_atual']
+            if pd.isna(preco_atual) or preco_atual <= 0:
+                falhas.append({'simbolo': simbolo, 'etapa': 'cotacoes', 'erro': 'sem cotação disponível'})
+                medidor.falha('cotacoes')
+                continue
+
+            # --- CÁLCULO 1: VARIAÇÃO DE COTA ---
+            ativo.valorizacao_rs = linha['valorizacao_rs']
+            ativo.valorizacao_pct = linha['valorizacao_pct']
+            quantidade = linha['quantidade']
+
+            # --- CÁLCULO 2: DIVIDENDOS ACUMULADOS (Série local) ---
+            if ativo.pk in dividendos_por_acao:
+                ativo.total_dividendos = dividendos_por_acao[ativo.pk] * quantidade
+
+            # --- CÁLCULO 3: VALUATION (Graham & Bazin) ---
+            score = 0
+            recomendacao = "NEUTRO"
+            detalhes = {}
+
+            if ativo.tipo == 'ACAO' or ativo.tipo == 'FII':
+                # Para Valuation, precisamos do .info completo
+                if info is None:
+                    continue
+                dy = (info.get('dividendYield', 0) or 0) * 100
+                pvp = info.get('priceToBook', 0) or 0
+                pl = info.get('trailingPE', 0) or 0
+
+                # Critérios Visuais
+                if dy > 6 and 0 < pvp < 1.5: score = 5; recomendacao = "COMPRAR"
+                elif dy > 4: score = 3; recomendacao = "MANTER"
+                else: score = 1; recomendacao = "REVISAR"
+
+                detalhes = {'dy': dy, 'pvp': pvp, 'pl': pl}
+
+            elif ativo.tipo == 'CRIPTO':
+                score = 3; recomendacao = "MANTER"
+
+            analises.append(AnaliseBot(
+                ativo=ativo,
+                preco_atual=round(preco_atual, 2),
+                recomendacao=recomendacao,
+                pontuacao=score,
+                pl=detalhes.get('pl', 0),
+                pvp=detalhes.get('pvp', 0),
+                dy=detalhes.get('dy', 0),
+            ))
+
+    # --- ETAPA 5: GRAVAÇÃO (Um único upsert) ---
+    progresso(95, 'Gravando análises')
+    with medidor.etapa('gravacao'), transaction.atomic():
+        AnaliseBot.objects.bulk_create(
+            analises,
+            update_conflicts=True,
+            unique_fields=['ativo'],
+            update_fields=['preco_atual', 'recomendacao', 'pontuacao', 'pl', 'pvp', 'dy', 'data_analise'],
+        )
+        # bulk_create não dispara signals: invalida o snapshot da saúde financeira aqui
+        invalidar_diagnostico(user_id=user.pk)
+
+    for falha in falhas:
+        logger.warning("Falha na etapa %s de %s: %s", falha['etapa'], falha['simbolo'], falha['erro'])
+
+    return {'ativos': ativos, 'analisados': len(analises), 'falhas': falhas}
+
+# --- 4. FUNÇÃO DE RADAR (Lê o snapshot do Fundamentus) ---
+def buscar_oportunidades_mercado(criterios=None, ordenar_por='dy', limite=20, medidor=None):
+    """
+    Aplica os critérios (padrão: Graham & Bazin) sobre o snapshot salvo.
+    Nenhum download: presets de usuários avaliam a mesma tabela em cache.
+    Com `medidor`, cronometra a leitura da tabela e o filtro.
+    """
+    medidor = medidor or Medidor('screener')
+    try:
+        # Tabela já processada pelo `manage.py refresh_screener`
+        with medidor.etapa('carregar'):
+            _, df = carregar_tabela()
+        with medidor.etapa('filtro'):
+            registros = aplicar_filtros(df, CRITERIOS_PADRAO if criterios is None else criterios, ordenar_por, limite)
+        return _oportunidades(registros)
+
+    except Exception:
+        logger.exception("Erro no screener (etapas: %s)", medidor.resumo()['etapas'])
+        return []
+
+
+async def buscar_oportunidades_mercado_async(criterios=None, ordenar_por='dy', limite=20):
+    """
+    buscar_oportunidades_mercado para a view async: a leitura do snapshot (e
+    a primeira carga, se não houver nenhum) não prende o event loop. O filtro
+    é vetorizado e roda no próprio loop.
+    """
+    medidor = Medidor('screener')
+    try:
+        with medidor.etapa('carregar'):
+            _, df = await carregar_tabela_async()
+        with medidor.etapa('filtro'):
+            registros = aplicar_filtros(df, CRITERIOS_PADRAO if criterios is None else criterios, ordenar_por, limite)
+        return _oportunidades(registros)
+
+    except Exception:
+        logger.exception("Erro no screener (etapas: %s)", medidor.resumo()['etapas'])
+        return []
+
+
+def _oportunidades(registros):
+    return [{
+        'ticker': r['papel'],
+        'tipo': 'ACAO',
+        'preco': r['cotacao'],
+        'score': 5,
+        'recomendacao': "COMPRA FORTE",
+        'detalhes': {
+            'dy': r['dy'] * 100,
+            'pl': r['pl'],
+            'pvp': r['pvp'],
+            'roe': r['roe'] * 100
+        }
+    } for r in registros]
@@ -0,0 +1,186 @@
+"""
+Cache compartilhado de dados de mercado.
+
+Fica entre o bot_logic e a rede: dois usuários com WEGE3 na carteira pagam
+uma única ida ao Yahoo por janela de TTL. As chaves são (tipo, símbolo), com
+TTL e limite de tamanho próprios por tipo de dado.
+
+Backends:
+  - 'memoria': LRU em processo (padrão).
+  - 'django':  usa o framework de cache do Django (LocMem, banco, Redis...);
+               o descarte por tamanho fica a cargo do backend (MAX_ENTRIES).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Segundos que cada tipo de dado continua válido
+TTL_PADRAO = {
+    'preco': 5 * 60,
+    'info': 6 * 60 * 60,
+    'dividendos': 12 * 60 * 60,
+    'screener': 30 * 60,
+}
+
+# Máximo de entradas por tipo (apenas no backend em memória)
+LIMITE_PADRAO = {
+    'preco': 2000,
+    'info': 1000,
+    'dividendos': 1000,
+    'screener': 4,
+}
+
+_AUSENTE = object()
+
+
+class CacheMercadoBase:
+    """ Contadores de hit/miss e o obter_ou_buscar comum aos backends """
+
+    def __init__(self, ttls=None):
+        self.ttls = {**TTL_PADRAO, **(ttls or {})}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._buscas = {}
+        self._buscas_lock = threading.Lock()
+
+    def _contar(self, tipo, campo):
+        with self._stats_lock:
+            stats = self._stats.setdefault(tipo, {'hits': 0, 'misses': 0})
+            stats[campo] += 1
+
+    def obter(self, tipo, chave):
+        valor = self._ler(tipo, chave)
+        self._contar(tipo, 'misses' if valor is _AUSENTE else 'hits')
+        return None if valor is _AUSENTE else valor
+
+    def guardar(self, tipo, chave, valor):
+        self._gravar(tipo, chave, valor)
+
+    def obter_ou_buscar(self, tipo, chave, funcao):
+        """
+        Retorna o valor em cache ou chama funcao() e guarda o resultado.
+        Buscas simultâneas da mesma chave no processo esperam a primeira.
+        """
+        valor = self._ler(tipo, chave)
+        if valor is not _AUSENTE:
+            self._contar(tipo, 'hits')
+            return valor
+
+        with self._buscas_lock:
+            trava = self._buscas.setdefault((tipo, chave), threading.Lock())
+        try:
+            with trava:
+                valor = self._ler(tipo, chave)
+                if valor is not _AUSENTE:
+                    self._contar(tipo, 'hits')
+                    return valor
+                self._contar(tipo, 'misses')
+                valor = funcao()
+                self._gravar(tipo, chave, valor)
+                return valor
+        finally:
+            # A trava só existe durante a busca: quem chegar depois acha o valor no cache
+            with self._buscas_lock:
+                if self._buscas.get((tipo, chave)) is trava:
+                    del self._buscas[(tipo, chave)]
+
+    def limpar(self):
+        """ Zera os contadores (os backends apagam também os dados) """
+        with self._stats_lock:
+            self._stats.clear()
+
+    def estatisticas(self):
+        with self._stats_lock:
+            resumo = {}
+            for tipo, stats in self._stats.items():
+                total = stats['hits'] + stats['misses']
+                resumo[tipo] = {**stats, 'taxa_acerto': stats['hits'] / total if total else 0}
+            return resumo
+
+
+class CacheMemoria(CacheMercadoBase):
+    """ LRU em processo, com TTL e limite de tamanho por tipo """
+
+    def __init__(self, ttls=None, limites=None):
+        super().__init__(ttls)
+        self.limites = {**LIMITE_PADRAO, **(limites or {})}
+        self._dados = {}
+        self._lock = threading.Lock()
+
+    def _ler(self, tipo, chave):
+        with self._lock:
+            entradas = self._dados.get(tipo)
+            if not entradas or chave not in entradas:
+                return _AUSENTE
+            expira_em, valor = entradas[chave]
+            if expira_em < time.monotonic():
+                del entradas[chave]
+                return _AUSENTE
+            entradas.move_to_end(chave)
+            return valor
+
+    def _gravar(self, tipo, chave, valor):
+        expira_em = time.monotonic() + self.ttls.get(tipo, 300)
+        with self._lock:
+            entradas = self._dados.setdefault(tipo, OrderedDict())
+            entradas[chave] = (expira_em, valor)
+            entradas.move_to_end(chave)
+            limite = self.limites.get(tipo)
+            while limite and len(entradas) > limite:
+                entradas.popitem(last=False)
+
+    def limpar(self):
+        super().limpar()
+        with self._lock:
+            self._dados.clear()
+
+
+class CacheDjango(CacheMercadoBase):
+    """ Delegado ao framework de cache do Django (compartilhado entre processos) """
+
+    def __init__(self, alias='default', ttls=None):
+        super().__init__(ttls)
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _chave(self, tipo, chave):
+        return f"mercado:{tipo}:{chave}"
+
+    def _ler(self, tipo, chave):
+        return self._cache.get(self._chave(tipo, chave), _AUSENTE)
+
+    def _gravar(self, tipo, chave, valor):
+        self._cache.set(self._chave(tipo, chave), valor, timeout=self.ttls.get(tipo, 300))
+
+    def limpar(self):
+        super().limpar()
+        # Apaga o alias inteiro: use um alias dedicado ao mercado
+        self._cache.clear()
+
+
+_cache_global = None
+_cache_global_lock = threading.Lock()
+
+
+def criar_cache_mercado():
+    """ Monta o cache conforme settings.MERCADO_CACHE """
+    config = getattr(settings, 'MERCADO_CACHE', {})
+    if config.get('BACKEND', 'memoria') == 'django':
+        return CacheDjango(alias=config.get('ALIAS', 'default'), ttls=config.get('TTL'))
+    return CacheMemoria(ttls=config.get('TTL'), limites=config.get('LIMITE'))
+
+
+def get_cache_mercado():
+    """ Instância única por processo, compartilhada entre todos os usuários """
+    global _cache_global
+    if _cache_global is None:
+        with _cache_global_lock:
+            if _cache_global is None:
+                _cache_global = criar_cache_mercado()
+    return _cache_global
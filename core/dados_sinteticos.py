@@ -0,0 +1,212 @@
+"""
+Gerador de dados sintéticos para benchmarks.
+
+Cria volume (centenas de milhares / milhões de linhas) espalhado por vários
+usuários e alguns anos, com bulk_create em lotes. Determinístico pela seed.
+Atenção: bulk_create não dispara signals; o que eles manteriam é refeito
+no fim de cada gerador (rollup mensal das transações, posição dos ativos,
+parcelas do cartão; `gerar_perfil` invalida os widgets do dashboard). `gerar_perfil` cria tudo a partir de volumes por usuário.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .desafio_logic import criar_desafios_em_lote
+from .painel_logic import invalidar_widgets
+from .posicao_logic import reconstruir_posicoes
+from .resumo_logic import reconstruir_resumos
+from .models import (
+    Transacao, ContaPagar, Compromisso, Nota, Ativo, OperacaoInvestimento, Desafio,
+    CartaoCredito, DespesaCartao, ParcelaCartao,
+)
+
+CATEGORIAS = [c for c, _ in Transacao.CATEGORIA_CHOICES]
+
+
+def _em_lotes(modelo, gerador, total, batch_size):
+    lote = []
+    for objeto in gerador:
+        lote.append(objeto)
+        if len(lote) >= batch_size:
+            modelo.objects.bulk_create(lote, batch_size=batch_size)
+            lote = []
+    modelo.objects.bulk_create(lote, batch_size=batch_size)
+    return total
+
+
+def criar_usuarios(quantidade, prefixo='bench'):
+    existentes = set(User.objects.filter(username__startswith=prefixo).values_list('username', flat=True))
+    novos = [
+        User(username=f"{prefixo}{i}") for i in range(quantidade) if f"{prefixo}{i}" not in existentes
+    ]
+    User.objects.bulk_create(novos)
+    return list(User.objects.filter(username__startswith=prefixo).order_by('pk')[:quantidade])
+
+
+def gerar_transacoes(usuarios, total, anos=3, seed=42, batch_size=5000):
+    rnd = random.Random(seed)
+    inicio = date.today() - timedelta(days=365 * anos)
+    dias = 365 * anos
+
+    def gerar():
+        for i in range(total):
+            yield Transacao(
+                user=usuarios[i % len(usuarios)],
+                descricao=f"Lançamento {i}",
+                valor=round(rnd.uniform(5, 5000), 2),
+                tipo='receita' if rnd.random() < 0.3 else 'despesa',
+                categoria=rnd.choice(CATEGORIAS),
+                data=inicio + timedelta(days=rnd.randrange(dias)),
+            )
+
+    _em_lotes(Transacao, gerar(), total, batch_size)
+    reconstruir_resumos(users=usuarios)
+    return total
+
+
+def gerar_contas(usuarios, total, seed=42, batch_size=5000):
+    rnd = random.Random(seed)
+    hoje = date.today()
+
+    def gerar():
+        for i in range(total):
+            yield ContaPagar(
+                user=usuarios[i % len(usuarios)],
+                titulo=f"Conta {i}",
+                valor=round(rnd.uniform(20, 3000), 2),
+                data_vencimento=hoje + timedelta(days=rnd.randint(-720, 180)),
+                pago=rnd.random() < 0.85,
+            )
+
+    return _em_lotes(ContaPagar, gerar(), total, batch_size)
+
+
+def gerar_compromissos(usuarios, total, seed=42, batch_size=5000):
+    rnd = random.Random(seed)
+    agora = timezone.now()
+
+    def gerar():
+        for i in range(total):
+            yield Compromisso(
+                user=usuarios[i % len(usuarios)],
+                titulo=f"Compromisso {i}",
+                data_hora=agora + timedelta(hours=rnd.randint(-24 * 720, 24 * 180)),
+                concluido=rnd.random() < 0.8,
+            )
+
+    return _em_lotes(Compromisso, gerar(), total, batch_size)
+
+
+def gerar_notas(usuarios, total, seed=42, batch_size=5000):
+    def gerar():
+        for i in range(total):
+            yield Nota(user=usuarios[i % len(usuarios)], titulo=f"Nota {i}", conteudo="...")
+
+    return _em_lotes(Nota, gerar(), total, batch_size)
+
+
+def gerar_operacoes(usuarios, total, ativos_por_usuario=10, anos=3, seed=42, batch_size=5000):
+    rnd = random.Random(seed)
+    Ativo.objects.bulk_create([
+        Ativo(user=user, ticker=f"BENCH{n}", tipo='ACAO')
+        for user in usuarios for n in range(ativos_por_usuario)
+    ])
+    ativos = list(Ativo.objects.filter(user__in=usuarios, ticker__startswith='BENCH').values_list('pk', flat=True))
+    inicio = date.today() - timedelta(days=365 * anos)
+    dias = 365 * anos
+
+    def gerar():
+        for i in range(total):
+            yield OperacaoInvestimento(
+                ativo_id=ativos[i % len(ativos)],
+                tipo=rnd.choices(['C', 'V', 'D'], weights=[7, 2, 1])[0],
+                data=inicio + timedelta(days=rnd.randrange(dias)),
+                quantidade=rnd.randint(1, 200),
+                preco_unitario=round(rnd.uniform(5, 120), 2),
+            )
+
+    _em_lotes(OperacaoInvestimento, gerar(), total, batch_size)
+    reconstruir_posicoes(Ativo.objects.filter(user__in=usuarios, ticker__startswith='BENCH'))
+    return total
+
+
+def gerar_despesas_cartao(usuarios, total, cartoes_por_usuario=2, anos=2, seed=42, batch_size=5000):
+    """ Compras parceladas nos cartões do usuário, já com o livro de parcelas """
+    rnd = random.Random(seed)
+    CartaoCredito.objects.bulk_create([
+        CartaoCredito(user=user, nome=f"BENCH{n}", limite=10000, dia_fechamento=1 + 7 * n % 28, dia_vencimento=10)
+        for user in usuarios for n in range(cartoes_por_usuario)
+    ])
+    cartoes = list(CartaoCredito.objects.filter(user__in=usuarios, nome__startswith='BENCH').values_list('pk', flat=True))
+    inicio = date.today() - timedelta(days=365 * anos)
+    dias = 365 * anos + 30
+
+    def gerar():
+        for i in range(total):
+            yield DespesaCartao(
+                cartao_id=cartoes[i % len(cartoes)],
+                descricao=f"Compra {i}",
+                valor=round(rnd.uniform(10, 2000), 2),
+                data_compra=inicio + timedelta(days=rnd.randrange(dias)),
+                categoria=rnd.choice(CATEGORIAS),
+                parcelas=rnd.choices([1, 2, 3, 6, 10, 12], weights=[10, 3, 3, 2, 1, 1])[0],
+            )
+
+    despesas = gerar()
+    while True:
+        lote = [d for _, d in zip(range(batch_size), despesas)]
+        if not lote:
+            break
+        criadas = DespesaCartao.objects.bulk_create(lote)
+        ParcelaCartao.objects.bulk_create(
+            [parcela for despesa in criadas for parcela in despesa.gerar_parcelas()], batch_size=batch_size
+        )
+    return total
+
+
+def gerar_desafios(usuarios, total, semanas=52, seed=42, batch_size=500):
+    """ Desafios com todas as semanas, via criar_desafios_em_lote """
+    rnd = random.Random(seed)
+    hoje = date.today()
+    desafios = [
+        Desafio(
+            user=usuarios[i % len(usuarios)],
+            objetivo=f"Desafio {i}",
+            valor_inicial=round(rnd.uniform(1, 50), 2),
+            incremento=round(rnd.uniform(0, 10), 2),
+            duracao_semanas=semanas,
+            data_inicio=hoje - timedelta(days=rnd.randrange(365)),
+        )
+        for i in range(total)
+    ]
+    return criar_desafios_em_lote(desafios, batch_size=batch_size)
+
+
+# Volumes por usuário do benchmark de views (manage.py benchmark_views)
+VOLUMES_PADRAO = {
+    'transacoes': 2000,
+    'despesas_cartao': 300,
+    'operacoes': 500,
+    'compromissos': 300,
+    'notas': 100,
+    'contas': 50,
+    'desafios': 3,  # 52 SemanaDesafio cada
+}
+
+
+def gerar_perfil(usuarios, volumes=None, seed=42):
+    """ Gera todas as tabelas com `volumes` (por usuário; faltando, VOLUMES_PADRAO) """
+    volumes = {**VOLUMES_PADRAO, **(volumes or {})}
+    n = len(usuarios)
+    gerar_transacoes(usuarios, volumes['transacoes'] * n, seed=seed)
+    gerar_despesas_cartao(usuarios, volumes['despesas_cartao'] * n, seed=seed)
+    gerar_operacoes(usuarios, volumes['operacoes'] * n, seed=seed)
+    gerar_compromissos(usuarios, volumes['compromissos'] * n, seed=seed)
+    gerar_notas(usuarios, volumes['notas'] * n, seed=seed)
+    gerar_contas(usuarios, volumes['contas'] * n, seed=seed)
+    gerar_desafios(usuarios, volumes['desafios'] * n, seed=seed)
+    for user in usuarios:
+        invalidar_widgets(user.pk)
+    return volumes
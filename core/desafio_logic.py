@@ -0,0 +1,59 @@
+"""
+Criação e atualização em lote dos desafios.
+
+As semanas são montadas em memória (Desafio.gerar_semanas) e gravadas com um
+único bulk_create; marcar um intervalo de semanas é um único UPDATE.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Desafio, SemanaDesafio
+from .painel_logic import invalidar_widgets
+
+
+def criar_desafio(desafio):
+    """ Salva o desafio e todas as semanas na mesma transação """
+    if not desafio.incremento:
+        # Garante que incremento não seja None para não dar erro na conta
+        desafio.incremento = 0
+    with transaction.atomic():
+        desafio.save()
+        SemanaDesafio.objects.bulk_create(desafio.gerar_semanas())
+    return desafio
+
+
+def criar_desafios_em_lote(desafios, batch_size=500):
+    """
+    Vários desafios de uma vez: um bulk_create para os desafios e as semanas
+    em lotes de `batch_size`. Retorna (total_desafios, total_semanas).
+    """
+    total_desafios = total_semanas = 0
+    for inicio in range(0, len(desafios), batch_size):
+        lote = desafios[inicio:inicio + batch_size]
+        for desafio in lote:
+            desafio.incremento = desafio.incremento or 0
+        with transaction.atomic():
+            # Postgres e SQLite (3.35+) devolvem os pks no bulk_create
+            Desafio.objects.bulk_create(lote)
+            semanas = [semana for desafio in lote for semana in desafio.gerar_semanas()]
+            SemanaDesafio.objects.bulk_create(semanas, batch_size=2000)
+        total_desafios += len(lote)
+        total_semanas += len(semanas)
+    # bulk_create não dispara signals: o widget do dashboard é invalidado aqui
+    for user_id in {desafio.user_id for desafio in desafios}:
+        invalidar_widgets(user_id, 'desafio')
+    return total_desafios, total_semanas
+
+
+def marcar_semanas(desafio, de, ate, pago=True):
+    """
+    Marca (ou desmarca) as semanas `de`..`ate` num único UPDATE. Semanas que
+    já estão no estado pedido ficam intactas (mantêm a data de pagamento).
+    Retorna quantas semanas mudaram.
+    """
+    alteradas = SemanaDesafio.objects.filter(
+        desafio=desafio, numero__gte=de, numero__lte=ate, pago=not pago
+    ).update(pago=pago, data_pagamento=timezone.now().date() if pago else None)
+    if alteradas:
+        invalidar_widgets(desafio.user_id, 'desafio')
+    return alteradas
@@ -0,0 +1,230 @@
+"""
+Desempenho da carteira ao longo do tempo.
+
+Reproduz as OperacaoInvestimento contra os fechamentos da série local
+(PrecoHistorico) numa grade diária: matriz dias x ativos de quantidades e
+preços, tudo vetorizado em NumPy/pandas. Dela saem o valor diário, o
+retorno ponderado pelo tempo (TWR), a TIR dos fluxos (XIRR) e a
+contribuição de cada ativo.
+
+Convenção dos fluxos no TWR: aportes entram no início do dia (somam à base),
+vendas saem no fim do dia (somam ao resultado) e dividendos são retorno.
+"""
+import numpy as np
+import pandas as pd
+
+from .bot_logic import montar_simbolo_yahoo
+from .models import Ativo, OperacaoInvestimento, PrecoHistorico
+
+
+def _matriz_diaria(eventos, coluna, dias, ativos):
+    """ Soma `coluna` por (dia, ativo) numa matriz alinhada a `dias` x `ativos` """
+    if eventos.empty:
+        return np.zeros((len(dias), len(ativos)))
+    tabela = eventos.pivot_table(index='data', columns='ativo', values=coluna, aggfunc='sum')
+    return tabela.reindex(index=dias, columns=ativos, fill_value=0).fillna(0).to_numpy()
+
+
+def _sem_desempenho():
+    return {'serie': pd.DataFrame(), 'twr': 0.0, 'xirr': None, 'contribuicoes': []}
+
+
+def calcular_desempenho(operacoes, precos, inicio=None, fim=None):
+    """
+    operacoes: DataFrame com ativo, ticker, tipo ('C', 'V', 'D'), data,
+               quantidade, preco_unitario, taxas e simbolo.
+    precos:    DataFrame de fechamentos (índice = data, colunas = símbolo).
+
+    Retorna um dict com:
+        serie          DataFrame diário (valor, aportes, dividendos, retorno, twr)
+        twr            retorno acumulado ponderado pelo tempo no período
+        xirr           TIR anualizada dos fluxos (None se não convergir)
+        contribuicoes  [{ticker, resultado, contribuicao, valor_final}]
+    """
+    if operacoes.empty:
+        return _sem_desempenho()
+
+    operacoes = operacoes.copy()
+    operacoes['data'] = pd.to_datetime(operacoes['data'])
+    for campo in ('quantidade', 'preco_unitario', 'taxas'):
+        operacoes[campo] = operacoes[campo].astype(float)
+
+    primeira = operacoes['data'].min()
+    inicio = pd.Timestamp(inicio) if inicio is not None else primeira
+    fim = pd.Timestamp(fim) if fim is not None else pd.Timestamp.today().normalize()
+    # A grade começa na primeira operação: a posição de abertura do período sai do replay
+    dias = pd.date_range(min(primeira, inicio), fim, freq='D')
+    ativos = list(operacoes['ativo'].drop_duplicates())
+
+    # --- Fluxos por (dia, ativo) ---
+    compra = operacoes['tipo'] == 'C'
+    venda = operacoes['tipo'] == 'V'
+    bruto = operacoes['quantidade'] * operacoes['preco_unitario']
+    operacoes['delta_qtd'] = np.where(compra, operacoes['quantidade'], np.where(venda, -operacoes['quantidade'], 0.0))
+    operacoes['aporte'] = np.where(compra, bruto + operacoes['taxas'], 0.0)
+    operacoes['resgate'] = np.where(venda, bruto - operacoes['taxas'], 0.0)
+    operacoes['dividendo'] = np.where(operacoes['tipo'] == 'D', operacoes['preco_unitario'], 0.0)
+    operacoes['preco_op'] = np.where(compra | venda, operacoes['preco_unitario'], np.nan)
+
+    quantidades = _matriz_diaria(operacoes, 'delta_qtd', dias, ativos).cumsum(axis=0)
+    aportes = _matriz_diaria(operacoes, 'aporte', dias, ativos)
+    resgates = _matriz_diaria(operacoes, 'resgate', dias, ativos)
+    dividendos = _matriz_diaria(operacoes, 'dividendo', dias, ativos)
+
+    # --- Preços: fechamento da série local; sem série, o preço da última operação ---
+    simbolo_do_ativo = operacoes.drop_duplicates('ativo').set_index('ativo')['simbolo']
+    fechamentos = precos.copy()
+    fechamentos.index = pd.to_datetime(fechamentos.index)
+    fechamentos = fechamentos.reindex(columns=list(simbolo_do_ativo.reindex(ativos)))
+    fechamentos = fechamentos.reindex(fechamentos.index.union(dias)).sort_index().ffill().reindex(dias)
+    fechamentos.columns = ativos
+    precos_op = (
+        operacoes.dropna(subset=['preco_op'])
+        .pivot_table(index='data', columns='ativo', values='preco_op', aggfunc='last')
+        .reindex(index=dias, columns=ativos).ffill()
+    )
+    matriz_precos = fechamentos.fillna(precos_op).fillna(0).to_numpy()
+
+    valores = quantidades * matriz_precos
+    valor_anterior = np.vstack([np.zeros((1, len(ativos))), valores[:-1]])
+
+    # --- Retorno diário (TWR) ---
+    base = valor_anterior.sum(axis=1) + aportes.sum(axis=1)
+    resultado_dia = valores.sum(axis=1) + resgates.sum(axis=1) + dividendos.sum(axis=1)
+    retorno = np.divide(resultado_dia, base, out=np.ones_like(base), where=base > 0) - 1
+
+    # Ganho de cada ativo no dia; somado e dividido pela base do dia, dá o retorno
+    ganho = valores - valor_anterior - aportes + resgates + dividendos
+
+    serie = pd.DataFrame({
+        'valor': valores.sum(axis=1),
+        'aportes': aportes.sum(axis=1) - resgates.sum(axis=1),
+        'dividendos': dividendos.sum(axis=1),
+        'retorno': retorno,
+    }, index=dias)
+    no_periodo = np.asarray(dias >= inicio)
+    serie = serie[no_periodo]
+    if serie.empty:
+        # Período vazio (inicio depois de fim, ou fim antes da primeira operação)
+        return _sem_desempenho()
+    serie['twr'] = (1 + serie['retorno']).cumprod() - 1
+    twr = float(serie['twr'].iloc[-1])
+
+    # --- XIRR: valor de abertura e aportes saem, resgates/dividendos/valor final entram ---
+    abertura = valor_anterior[no_periodo][0].sum()
+    fluxos = -serie['aportes'] + serie['dividendos']
+    if abertura:
+        fluxos.iloc[0] -= abertura
+    fluxos.iloc[-1] += serie['valor'].iloc[-1]
+    fluxos = fluxos[fluxos != 0]
+    taxa = xirr(fluxos.index, fluxos.to_numpy())
+
+    # --- Contribuição por ativo (soma dos retornos diários de cada um) ---
+    peso = np.divide(1.0, base, out=np.zeros_like(base), where=base > 0)[no_periodo]
+    ganho = ganho[no_periodo]
+    tickers = operacoes.drop_duplicates('ativo').set_index('ativo')['ticker'].reindex(ativos)
+    contribuicoes = pd.DataFrame({
+        'ticker': tickers.to_numpy(),
+        'resultado': ganho.sum(axis=0),
+        'contribuicao': (ganho * peso[:, None]).sum(axis=0),
+        'valor_final': valores[-1],
+    }).sort_values('contribuicao', ascending=False)
+
+    return {
+        'serie': serie,
+        'twr': twr,
+        'xirr': taxa,
+        'contribuicoes': contribuicoes.to_dict('records'),
+    }
+
+
+def xirr(datas, valores, chute=0.1, iteracoes=100, tolerancia=1e-9):
+    """
+    TIR anualizada de fluxos em datas irregulares (Newton, com bisseção de
+    reserva). Retorna None se os fluxos não trocam de sinal.
+    """
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) < 2 or not (valores.min() < 0 < valores.max()):
+        return None
+    datas = pd.DatetimeIndex(datas)
+    anos = ((datas - datas[0]).days / 365.0).to_numpy()
+
+    def vpl(taxa):
+        return np.sum(valores / (1 + taxa) ** anos)
+
+    taxa = chute
+    for _ in range(iteracoes):
+        fator = (1 + taxa) ** anos
+        f = np.sum(valores / fator)
+        derivada = np.sum(-anos * valores / (fator * (1 + taxa)))
+        if derivada == 0:
+            break
+        nova = taxa - f / derivada
+        if not np.isfinite(nova) or nova <= -1:
+            break
+        if abs(nova - taxa) < tolerancia:
+            return float(nova)
+        taxa = nova
+
+    # Bisseção entre -99% e +10000% a.a.
+    baixo, alto = -0.99, 100.0
+    f_baixo, f_alto = vpl(baixo), vpl(alto)
+    if np.sign(f_baixo) == np.sign(f_alto):
+        return None
+    for _ in range(200):
+        meio = (baixo + alto) / 2
+        f_meio = vpl(meio)
+        if abs(f_meio) < tolerancia or alto - baixo < tolerancia:
+            return float(meio)
+        if np.sign(f_meio) == np.sign(f_baixo):
+            baixo, f_baixo = meio, f_meio
+        else:
+            alto = meio
+    return float((baixo + alto) / 2)
+
+
+def carregar_operacoes(user):
+    """ Operações do usuário num DataFrame, já com o símbolo do Yahoo """
+    ativos = {a.pk: a for a in Ativo.objects.filter(user=user).only('ticker', 'tipo')}
+    registros = OperacaoInvestimento.objects.filter(ativo__user=user).values_list(
+        'ativo_id', 'tipo', 'data', 'quantidade', 'preco_unitario', 'taxas'
+    )
+    operacoes = pd.DataFrame.from_records(
+        list(registros), columns=['ativo', 'tipo', 'data', 'quantidade', 'preco_unitario', 'taxas']
+    )
+    operacoes['ticker'] = operacoes['ativo'].map({pk: a.ticker for pk, a in ativos.items()})
+    operacoes['simbolo'] = operacoes['ativo'].map({pk: montar_simbolo_yahoo(a) for pk, a in ativos.items()})
+    return operacoes
+
+
+def carregar_precos(simbolos, fim=None):
+    """ Fechamentos locais pivotados (data x símbolo) """
+    consulta = PrecoHistorico.objects.filter(simbolo__in=list(simbolos))
+    if fim is not None:
+        consulta = consulta.filter(data__lte=fim)
+    registros = pd.DataFrame.from_records(
+        list(consulta.values_list('data', 'simbolo', 'fechamento')), columns=['data', 'simbolo', 'fechamento']
+    )
+    if registros.empty:
+        return pd.DataFrame()
+    return registros.pivot(index='data', columns='simbolo', values='fechamento')
+
+
+def desempenho_usuario(user, inicio=None, fim=None):
+    """ Carrega operações e preços do usuário e calcula o desempenho do período """
+    operacoes = carregar_operacoes(user)
+    if operacoes.empty:
+        return calcular_desempenho(operacoes, pd.DataFrame())
+    precos = carregar_precos(operacoes['simbolo'].unique(), fim=fim)
+    return calcular_desempenho(operacoes, precos, inicio=inicio, fim=fim)
+
+
+def resumir_serie(serie, pontos=400):
+    """ Reduz a série diária para o gráfico (no máximo `pontos` pontos) """
+    if len(serie) <= pontos:
+        return serie
+    passo = -(-len(serie) // pontos)
+    indices = list(range(0, len(serie), passo))
+    if indices[-1] != len(serie) - 1:
+        indices.append(len(serie) - 1)
+    return serie.iloc[indices]
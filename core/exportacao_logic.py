@@ -0,0 +1,195 @@
+"""
+Exportação (backup) do histórico financeiro do usuário.
+
+Tudo sai como gerador de bytes: as consultas usam .iterator(chunk_size)
+e cada linha é escrita e descartada, então a memória não cresce com o
+tamanho do histórico (serve direto num StreamingHttpResponse ou num
+arquivo). Formatos: CSV (uma tabela), JSONL (uma ou todas, cada linha
+com a chave "tabela") e ZIP (um CSV por tabela + manifesto.json).
+
+Exportação incremental: com `desde`, só as linhas criadas/alteradas a
+partir dali (campo atualizado_em). O `gerado_em` do manifesto é o
+`desde` da próxima sincronização. Exclusões não aparecem no incremental.
+"""
+import csv
+import json
+import zipfile
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Transacao, DespesaCartao, OperacaoInvestimento, ContaPagar, Nota
+
+TAMANHO_BLOCO = 2000
+FORMATOS = ('csv', 'jsonl', 'zip')
+
+# tabela -> (model, filtro do dono, colunas exportadas)
+TABELAS = {
+    'transacoes': (Transacao, 'user', [
+        'id', 'data', 'descricao', 'valor', 'tipo', 'categoria', 'pago', 'atualizado_em',
+    ]),
+    'despesas_cartao': (DespesaCartao, 'cartao__user', [
+        'id', 'cartao__nome', 'data_compra', 'descricao', 'valor', 'categoria',
+        'parcelas', 'parcela_atual', 'atualizado_em',
+    ]),
+    'operacoes': (OperacaoInvestimento, 'ativo__user', [
+        'id', 'ativo__ticker', 'ativo__tipo', 'tipo', 'data', 'quantidade',
+        'preco_unitario', 'taxas', 'atualizado_em',
+    ]),
+    'contas': (ContaPagar, 'user', [
+        'id', 'titulo', 'valor', 'data_vencimento', 'pago', 'recorrencia', 'atualizado_em',
+    ]),
+    'notas': (Nota, 'user', [
+        'id', 'titulo', 'conteudo', 'cor', 'criado_em', 'atualizado_em',
+    ]),
+}
+
+
+class ErroExportacao(ValueError):
+    pass
+
+
+def ler_desde(texto):
+    """ '2025-01-31' ou '2025-01-31T10:00:00[-03:00]' -> datetime aware (None se vazio) """
+    if not texto:
+        return None
+    momento = parse_datetime(texto)
+    if momento is None:
+        dia = parse_date(texto)
+        if dia is None:
+            raise ErroExportacao(f"data inválida para 'desde': {texto!r}")
+        momento = datetime.combine(dia, time.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def nomes_colunas(tabela):
+    # 'cartao__nome' -> 'cartao_nome' no cabeçalho
+    return [coluna.replace('__', '_') for coluna in TABELAS[tabela][2]]
+
+
+def registros(user, tabela, desde=None, chunk_size=TAMANHO_BLOCO):
+    """ Tuplas da tabela do usuário em ordem de id, sem carregar tudo na memória """
+    if tabela not in TABELAS:
+        raise ErroExportacao(f"tabela desconhecida: {tabela!r}")
+    model, dono, colunas = TABELAS[tabela]
+    consulta = model.objects.filter(**{dono: user})
+    if desde is not None:
+        consulta = consulta.filter(atualizado_em__gte=desde)
+    return consulta.order_by('pk').values_list(*colunas).iterator(chunk_size=chunk_size)
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor)
+
+
+class _Buffer:
+    """ Destino de escrita que só guarda o que foi escrito desde a última coleta """
+
+    def __init__(self):
+        self.pedacos = []
+
+    def write(self, dados):
+        self.pedacos.append(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def coletar(self):
+        dados = b''.join(p if isinstance(p, bytes) else p.encode('utf-8') for p in self.pedacos)
+        self.pedacos = []
+        return dados
+
+
+def _blocos_csv(nomes, linhas, chunk_size):
+    buffer = _Buffer()
+    escritor = csv.writer(buffer)
+    escritor.writerow(nomes)
+    for numero, linha in enumerate(linhas, start=1):
+        escritor.writerow([_texto(v) for v in linha])
+        if numero % chunk_size == 0:
+            yield buffer.coletar()
+    yield buffer.coletar()
+
+
+def gerar_csv(user, tabela, desde=None, chunk_size=TAMANHO_BLOCO):
+    """ CSV (UTF-8 com BOM, abre direto no Excel) de uma tabela, em blocos de bytes """
+    yield '\ufeff'.encode('utf-8')
+    yield from _blocos_csv(nomes_colunas(tabela), registros(user, tabela, desde, chunk_size), chunk_size)
+
+
+def gerar_jsonl(user, tabelas=None, desde=None, chunk_size=TAMANHO_BLOCO):
+    """ Um objeto JSON por linha, com a chave "tabela" """
+    buffer = _Buffer()
+    for tabela in tabelas or TABELAS:
+        nomes = nomes_colunas(tabela)
+        for numero, linha in enumerate(registros(user, tabela, desde, chunk_size), start=1):
+            objeto = {'tabela': tabela, **dict(zip(nomes, linha))}
+            buffer.write(json.dumps(objeto, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            if numero % chunk_size == 0:
+                yield buffer.coletar()
+        yield buffer.coletar()
+
+
+def gerar_zip(user, tabelas=None, desde=None, chunk_size=TAMANHO_BLOCO):
+    """
+    ZIP com um CSV por tabela e um manifesto.json. O zipfile escreve num
+    destino sem seek (descritores de dados após cada arquivo), então o
+    arquivo compactado também sai em blocos.
+    """
+    gerado_em = timezone.now()
+    buffer = _Buffer()
+    contagens = {}
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as pacote:
+        for tabela in tabelas or TABELAS:
+            contagens[tabela] = 0
+
+            def contando(linhas, tabela=tabela):
+                for linha in linhas:
+                    contagens[tabela] += 1
+                    yield linha
+
+            linhas = contando(registros(user, tabela, desde, chunk_size))
+            with pacote.open(f"{tabela}.csv", mode='w', force_zip64=True) as destino:
+                for bloco in _blocos_csv(nomes_colunas(tabela), linhas, chunk_size):
+                    destino.write(bloco)
+                    yield buffer.coletar()
+        manifesto = {
+            'usuario': user.get_username(),
+            'gerado_em': gerado_em.isoformat(),
+            'desde': desde.isoformat() if desde else None,
+            'linhas': contagens,
+        }
+        pacote.writestr('manifesto.json', json.dumps(manifesto, ensure_ascii=False, indent=2))
+    yield buffer.coletar()
+
+
+def exportar(user, formato='zip', tabela=None, desde=None, chunk_size=TAMANHO_BLOCO):
+    """
+    Gerador de bytes no formato pedido. CSV exige uma tabela; JSONL e ZIP
+    exportam todas, ou só `tabela` se informada.
+    """
+    if formato not in FORMATOS:
+        raise ErroExportacao(f"formato desconhecido: {formato!r}")
+    if tabela is not None and tabela not in TABELAS:
+        raise ErroExportacao(f"tabela desconhecida: {tabela!r}")
+    if formato == 'csv':
+        if tabela is None:
+            raise ErroExportacao("o formato CSV exporta uma tabela por vez (informe a tabela)")
+        return gerar_csv(user, tabela, desde, chunk_size)
+    tabelas = [tabela] if tabela else None
+    if formato == 'jsonl':
+        return gerar_jsonl(user, tabelas, desde, chunk_size)
+    return gerar_zip(user, tabelas, desde, chunk_size)
+
+
+def nome_arquivo(formato, tabela=None):
+    return f"backup_{tabela or 'financas'}_{timezone.localdate():%Y%m%d}.{formato}"
@@ -2,8 +2,9 @@ from django import forms
 from django.contrib.auth.models import User
 from .models import (
     Compromisso, Nota, Transacao, CartaoCredito, DespesaCartao, 
-    Ativo, OperacaoInvestimento, Desafio, ContaPagar
+    Ativo, OperacaoInvestimento, Desafio, ContaPagar, PresetScreener
 )
+from .exportacao_logic import ler_desde, ErroExportacao
 
 # --- USUÁRIO E PERFIL ---
 
@@ -46,6 +47,32 @@ class PerfilForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
         }
 
+class ExportarDadosForm(forms.Form):
+    """ Backup do histórico (GET). Com 'desde', só o que mudou a partir da data """
+    FORMATO_CHOICES = [('zip', 'ZIP (um CSV por tabela)'), ('jsonl', 'JSONL'), ('csv', 'CSV (uma tabela)')]
+    TABELA_CHOICES = [
+        ('', 'Todas'), ('transacoes', 'Transações'), ('despesas_cartao', 'Despesas de Cartão'),
+        ('operacoes', 'Operações de Investimento'), ('contas', 'Contas a Pagar'), ('notas', 'Notas'),
+    ]
+
+    formato = forms.ChoiceField(choices=FORMATO_CHOICES, initial='zip', required=False, widget=forms.Select(attrs={'class': 'form-select'}))
+    tabela = forms.ChoiceField(choices=TABELA_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
+    # Data (AAAA-MM-DD) ou o 'gerado_em' do manifesto da exportação anterior
+    desde = forms.CharField(required=False, label="Alterado desde", widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
+    def clean_desde(self):
+        try:
+            return ler_desde(self.cleaned_data['desde'].strip())
+        except ErroExportacao as erro:
+            raise forms.ValidationError(str(erro))
+
+    def clean(self):
+        dados = super().clean()
+        dados['formato'] = dados.get('formato') or 'zip'
+        if dados['formato'] == 'csv' and not dados.get('tabela'):
+            self.add_error('tabela', "Para CSV, escolha uma tabela (ou use ZIP para todas).")
+        return dados
+
 # --- FINANÇAS E CARTÕES ---
 
 class TransacaoForm(forms.ModelForm):
@@ -61,6 +88,18 @@ class TransacaoForm(forms.ModelForm):
             'pago': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+class ImportarExtratoForm(forms.Form):
+    """ Upload do extrato (CSV/OFX). Com cartão, as linhas viram compras no cartão """
+    FORMATO_CHOICES = [('auto', 'Detectar pela extensão'), ('csv', 'CSV'), ('ofx', 'OFX')]
+
+    arquivo = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ofx,.qfx,.txt'}))
+    formato = forms.ChoiceField(choices=FORMATO_CHOICES, initial='auto', widget=forms.Select(attrs={'class': 'form-select'}))
+    cartao = forms.ModelChoiceField(
+        queryset=CartaoCredito.objects.none(), required=False, label="Fatura do cartão",
+        help_text="Deixe em branco para importar no fluxo de caixa.",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
 class CartaoForm(forms.ModelForm):
     class Meta:
         model = CartaoCredito
@@ -112,6 +151,54 @@ class OperacaoInvestimentoForm(forms.ModelForm):
             'taxas': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
         }
 
+class PresetScreenerForm(forms.ModelForm):
+    """
+    Filtro personalizado do Radar. Os campos numéricos viram a lista de
+    critérios declarativos (campo, op, valor) usada pelo motor de filtros.
+    """
+    liquidez_min = forms.DecimalField(required=False, label="Liquidez mínima (R$/dia)",
+                                      widget=forms.NumberInput(attrs={'class': 'form-control'}))
+    pl_max = forms.DecimalField(required=False, label="P/L máximo",
+                                widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'}))
+    pvp_max = forms.DecimalField(required=False, label="P/VP máximo",
+                                 widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'}))
+    dy_min = forms.DecimalField(required=False, label="Dividend Yield mínimo (%)",
+                                widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'}))
+    roe_min = forms.DecimalField(required=False, label="ROE mínimo (%)",
+                                 widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'}))
+
+    class Meta:
+        model = PresetScreener
+        fields = ['nome', 'ordenar_por', 'limite']
+        widgets = {
+            'nome': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ex: Dividendos Baratos'}),
+            'ordenar_por': forms.Select(attrs={'class': 'form-select'}),
+            'limite': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 100}),
+        }
+
+    def montar_criterios(self):
+        dados = self.cleaned_data
+        criterios = []
+        if dados.get('liquidez_min') is not None:
+            criterios.append({'campo': 'liq_2meses', 'op': 'gte', 'valor': float(dados['liquidez_min'])})
+        if dados.get('pl_max') is not None:
+            criterios += [{'campo': 'pl', 'op': 'gt', 'valor': 0}, {'campo': 'pl', 'op': 'lte', 'valor': float(dados['pl_max'])}]
+        if dados.get('pvp_max') is not None:
+            criterios += [{'campo': 'pvp', 'op': 'gt', 'valor': 0}, {'campo': 'pvp', 'op': 'lte', 'valor': float(dados['pvp_max'])}]
+        # Percentuais são guardados como fração, igual ao snapshot
+        if dados.get('dy_min') is not None:
+            criterios.append({'campo': 'dy', 'op': 'gte', 'valor': float(dados['dy_min']) / 100})
+        if dados.get('roe_min') is not None:
+            criterios.append({'campo': 'roe', 'op': 'gte', 'valor': float(dados['roe_min']) / 100})
+        return criterios
+
+    def save(self, commit=True):
+        preset = super().save(commit=False)
+        preset.criterios = self.montar_criterios()
+        if commit:
+            preset.save()
+        return preset
+
 # --- AGENDA E NOTAS ---
 
 class CompromissoForm(forms.ModelForm):
@@ -1,35 +1,37 @@
-from django.db.models import Sum
+from django.db.models import Sum, Count, F, DecimalField
 from django.utils import timezone
 from datetime import timedelta
-from .models import Transacao, ContaPagar, CartaoCredito, AnaliseBot, Ativo
+from .models import ContaPagar, CartaoCredito, DespesaCartao, AnaliseBot, Ativo, DiagnosticoFinanceiro
+from .resumo_logic import totais_desde
 
 def gerar_diagnostico_financeiro(user):
     # --- 1. COLETA DE DADOS (Últimos 30 dias) ---
+    # Uma agregação condicional por tabela: o número de queries não depende do volume
     hoje = timezone.now().date()
     inicio_mes = hoje - timedelta(days=30)
     
-    # Fluxo de Caixa
-    receitas = Transacao.objects.filter(user=user, tipo='receita', data__gte=inicio_mes).aggregate(Sum('valor'))['valor__sum'] or 0
-    despesas = Transacao.objects.filter(user=user, tipo='despesa', data__gte=inicio_mes).aggregate(Sum('valor'))['valor__sum'] or 0
+    # Fluxo de Caixa (rollup mensal + os dias do mês anterior que caem na janela)
+    receitas, despesas = totais_desde(user, inicio_mes)
     
     # Contas e Dívidas
-    contas_atrasadas = ContaPagar.objects.filter(user=user, pago=False, data_vencimento__lt=hoje)
-    total_atrasado = sum(c.valor for c in contas_atrasadas)
-    qtd_atrasadas = contas_atrasadas.count()
+    atrasadas = ContaPagar.objects.filter(user=user, pago=False, data_vencimento__lt=hoje).aggregate(
+        total=Sum('valor'),
+        quantidade=Count('id'),
+    )
+    total_atrasado = atrasadas['total'] or 0
+    qtd_atrasadas = atrasadas['quantidade']
     
     # Cartão de Crédito (Limite tomado)
-    cartoes = CartaoCredito.objects.filter(user=user)
-    limite_total = sum(c.limite for c in cartoes)
-    divida_cartao = 0
-    for c in cartoes:
-        gastos = c.despesas.aggregate(Sum('valor'))['valor__sum'] or 0
-        divida_cartao += gastos
+    limite_total = CartaoCredito.objects.filter(user=user).aggregate(total=Sum('limite'))['total'] or 0
+    divida_cartao = DespesaCartao.objects.filter(cartao__user=user).aggregate(total=Sum('valor'))['total'] or 0
 
     # Investimentos (Qualidade da Carteira via Robô)
-    ativos = Ativo.objects.filter(user=user)
-    analises_ruins = AnaliseBot.objects.filter(ativo__user=user, recomendacao__icontains='VENDER')
-    analises_boas = AnaliseBot.objects.filter(ativo__user=user, recomendacao__icontains='COMPRAR')
-    total_investido = sum(a.total_investido() for a in ativos)
+    total_investido = Ativo.objects.filter(user=user).aggregate(
+        total=Sum(F('quantidade_atual') * F('preco_medio'), output_field=DecimalField(max_digits=24, decimal_places=8))
+    )['total'] or 0
+    tickers_ruins = list(
+        AnaliseBot.objects.filter(ativo__user=user, recomendacao__icontains='VENDER').values_list('ativo__ticker', flat=True)
+    )
 
     # --- 2. CÁLCULO DO SCORE (0 a 100) ---
     score = 50 # Começa na média
@@ -97,8 +99,8 @@ def gerar_diagnostico_financeiro(user):
         })
 
     # Sobre Investimentos
-    if analises_ruins.exists():
-        nomes = ", ".join([a.ativo.ticker for a in analises_ruins])
+    if tickers_ruins:
+        nomes = ", ".join(tickers_ruins)
         recomendacoes.append({
             'tipo': 'info',
             'titulo': 'Otimização de Carteira',
@@ -118,4 +120,48 @@ def gerar_diagnostico_financeiro(user):
         'total_atrasado': total_atrasado,
         'uso_cartao': uso_cartao,
         'recomendacoes': recomendacoes
-    }
\ No newline at end of file
+    }
+
+
+# --- SNAPSHOT (cache por usuário, invalidado por signals) ---
+
+def invalidar_diagnostico(**filtros):
+    """
+    Marca o snapshot como desatualizado e sobe a versão (muda o ETag na hora).
+    Ex.: invalidar_diagnostico(user_id=3) ou invalidar_diagnostico(user__ativo__in=ativos)
+    """
+    return DiagnosticoFinanceiro.objects.filter(**filtros).update(valido=False, versao=F('versao') + 1)
+
+
+def obter_diagnostico(user):
+    """
+    Snapshot do diagnóstico, recalculado só se foi invalidado ou se virou o
+    dia (a janela de 30 dias e as contas atrasadas dependem da data).
+    """
+    hoje = timezone.now().date()
+    snapshot, _ = DiagnosticoFinanceiro.objects.get_or_create(user=user)
+    if snapshot.valido and snapshot.data_referencia == hoje:
+        return snapshot
+
+    versao_lida = snapshot.versao
+    diagnostico = gerar_diagnostico_financeiro(user)
+    if snapshot.valido:
+        # Válido mas de outro dia: é um conteúdo novo, então versão nova
+        snapshot.versao += 1
+    campos = {
+        'versao': snapshot.versao,
+        'valido': True,
+        'data_referencia': hoje,
+        'score': diagnostico['score'],
+        'taxa_poupanca': float(diagnostico['taxa_poupanca']),
+        'total_atrasado': diagnostico['total_atrasado'],
+        'uso_cartao': float(diagnostico['uso_cartao']),
+        'recomendacoes': diagnostico['recomendacoes'],
+        'gerado_em': timezone.now(),
+    }
+    # Se algo invalidou durante o cálculo, a versão mudou e o UPDATE não marca
+    # como válido: a próxima leitura recalcula de novo
+    DiagnosticoFinanceiro.objects.filter(pk=snapshot.pk, versao=versao_lida).update(**campos)
+    for campo, valor in campos.items():
+        setattr(snapshot, campo, valor)
+    return snapshot
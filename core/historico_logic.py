@@ -0,0 +1,122 @@
+"""
+Série histórica local de fechamentos e dividendos por símbolo.
+
+A rede só é consultada para os trechos que faltam: antes do primeiro dia
+coberto (ativo mais antigo que a série) e do último pregão gravado até hoje,
+uma vez por dia. O último pregão é baixado de novo porque o fechamento
+gravado pode ter sido parcial (cotação do meio do pregão). Somar dividendos
+desde a data de início de um ativo vira uma consulta por intervalo nas
+tabelas locais.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SerieHistorica, PrecoHistorico, DividendoHistorico
+
+# Primeira carga de um símbolo sem data de início conhecida
+ANOS_PADRAO = 10
+
+
+def inicio_padrao(hoje=None):
+    hoje = hoje or timezone.localdate()
+    return hoje.replace(year=hoje.year - ANOS_PADRAO)
+
+
+def periodos_pendentes(inicios, hoje=None):
+    """
+    inicios: {simbolo: primeira data necessária}
+    Retorna {simbolo: [(desde, ate), ...]} só para quem precisa ir à rede;
+    `ate` None é até hoje. Série inexistente: um trecho, do início pedido.
+    Início pedido anterior ao já coberto: o buraco até o primeiro dia
+    gravado. Série ainda não conferida hoje: do último pregão gravado em
+    diante (ele é sobrescrito).
+    """
+    hoje = hoje or timezone.localdate()
+    series = {s.simbolo: s for s in SerieHistorica.objects.filter(simbolo__in=list(inicios))}
+    pendentes = {}
+    for simbolo, inicio in inicios.items():
+        inicio = inicio or inicio_padrao(hoje)
+        serie = series.get(simbolo)
+        if serie is None or serie.inicio is None:
+            pendentes[simbolo] = [(inicio, None)]
+            continue
+        trechos = []
+        if inicio < serie.inicio:
+            # Ativo mais antigo que a série: só o que vem antes dela
+            trechos.append((inicio, serie.inicio - timedelta(days=1)))
+        if serie.atualizado_em is None or timezone.localdate(serie.atualizado_em) < hoje:
+            desde = serie.fim or serie.inicio
+            if desde <= hoje:
+                trechos.append((desde, None))
+        if trechos:
+            pendentes[simbolo] = trechos
+    return pendentes
+
+
+def gravar_historico(simbolo, desde, tabela):
+    """
+    Grava o trecho baixado a partir de `desde`. tabela: DataFrame indexado
+    por data com as colunas 'fechamento' e 'dividendo' (0 nos dias sem
+    provento). Fechamentos já gravados são sobrescritos (o do último pregão
+    pode ter sido parcial); dividendos repetidos são ignorados. Reprocessar
+    é seguro.
+    """
+    tabela = tabela if tabela is not None else pd.DataFrame(columns=['fechamento', 'dividendo'])
+    datas = [pd.Timestamp(d).date() for d in tabela.index]
+    fechamentos = tabela['fechamento'] if 'fechamento' in tabela else pd.Series(dtype=float)
+    dividendos = tabela['dividendo'] if 'dividendo' in tabela else pd.Series(dtype=float)
+
+    precos = [
+        PrecoHistorico(simbolo=simbolo, data=data, fechamento=float(valor))
+        for data, valor in zip(datas, fechamentos) if pd.notna(valor)
+    ]
+    proventos = [
+        DividendoHistorico(simbolo=simbolo, data=data, valor=float(valor))
+        for data, valor in zip(datas, dividendos) if pd.notna(valor) and valor > 0
+    ]
+
+    with transaction.atomic():
+        PrecoHistorico.objects.bulk_create(
+            precos, update_conflicts=True, unique_fields=['simbolo', 'data'], update_fields=['fechamento'],
+            batch_size=2000,
+        )
+        DividendoHistorico.objects.bulk_create(proventos, ignore_conflicts=True, batch_size=2000)
+
+        serie, _ = SerieHistorica.objects.select_for_update().get_or_create(simbolo=simbolo)
+        serie.inicio = min(serie.inicio, desde) if serie.inicio else desde
+        if datas:
+            serie.fim = max(serie.fim, max(datas)) if serie.fim else max(datas)
+        serie.atualizado_em = timezone.now()
+        serie.save()
+    return len(precos), len(proventos)
+
+
+def dividendos_acumulados(pedidos):
+    """
+    pedidos: {chave: (simbolo, data_inicio)}
+    Retorna {chave: soma por ação dos dividendos com data ex >= data_inicio},
+    só para os símbolos que já têm série local. Uma única consulta.
+    """
+    if not pedidos:
+        return {}
+    simbolos = {simbolo for simbolo, _ in pedidos.values()}
+    cobertos = set(SerieHistorica.objects.filter(simbolo__in=simbolos, inicio__isnull=False)
+                   .values_list('simbolo', flat=True))
+    desde = min(inicio for simbolo, inicio in pedidos.values() if simbolo in cobertos) if cobertos else None
+    if desde is None:
+        return {}
+
+    eventos = defaultdict(list)
+    for simbolo, data, valor in DividendoHistorico.objects.filter(
+        simbolo__in=cobertos, data__gte=desde
+    ).values_list('simbolo', 'data', 'valor'):
+        eventos[simbolo].append((data, valor))
+
+    return {
+        chave: sum(valor for data, valor in eventos[simbolo] if data >= inicio)
+        for chave, (simbolo, inicio) in pedidos.items() if simbolo in cobertos
+    }
@@ -0,0 +1,35 @@
+"""
+Cliente HTTP assíncrono para as views async (ASGI).
+
+Usa o AsyncSession do curl_cffi (o mesmo pacote que o yfinance usa por
+baixo): pool de conexões com keep-alive, e várias requisições em voo sem
+prender nenhuma thread. Há uma sessão por event loop. No ASGI é uma por
+processo, compartilhada por todas as requisições; no WSGI/runserver cada
+view async roda num loop próprio e a sessão vive só durante ela.
+"""
+import asyncio
+import weakref
+
+from curl_cffi.requests import AsyncSession
+from django.conf import settings
+
+CONFIG_PADRAO = {
+    'CONEXOES': 20,   # conexões simultâneas por sessão (tamanho do pool)
+    'TIMEOUT': 20,    # segundos por requisição
+}
+
+_sessoes = weakref.WeakKeyDictionary()
+
+
+def configuracao():
+    return {**CONFIG_PADRAO, **getattr(settings, 'HTTP_ASYNC', {})}
+
+
+def sessao_http():
+    """ Sessão do event loop corrente (criada na primeira chamada) """
+    loop = asyncio.get_running_loop()
+    sessao = _sessoes.get(loop)
+    if sessao is None:
+        config = configuracao()
+        sessao = _sessoes[loop] = AsyncSession(max_clients=config['CONEXOES'], timeout=config['TIMEOUT'])
+    return sessao
@@ -0,0 +1,295 @@
+"""
+Importação de extratos bancários (CSV e OFX) e faturas de cartão.
+
+O arquivo é lido linha a linha: cada lançamento vira uma Transacao (ou
+DespesaCartao, se for informado um cartão), com a categoria deduzida da
+descrição. A impressão (hash da linha) fica indexada por usuário/cartão:
+reimportar o mesmo extrato não duplica. A gravação é em lotes de
+bulk_create dentro de uma única transação.
+
+Memória: os lotes têm tamanho fixo, mas a contagem de linhas repetidas
+(lançamentos sem FITID) guarda uma entrada por linha distinta do arquivo,
+O(linhas distintas). Linhas com FITID (OFX) não entram na contagem.
+"""
+import csv
+import hashlib
+import re
+import unicodedata
+from functools import lru_cache
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .health_logic import invalidar_diagnostico
+from .painel_logic import invalidar_widgets
+from .models import Transacao, DespesaCartao, ParcelaCartao
+from .resumo_logic import somar_transacoes
+
+TAMANHO_LOTE = 2000
+CENTAVO = Decimal('0.01')
+
+# Palavras-chave (sem acento, minúsculas) -> categoria; a primeira que casar vence
+REGRAS_CATEGORIA = [
+    ('salario', ['salario', 'folha de pagamento', 'proventos']),
+    ('investimento', ['corretora', 'tesouro direto', 'aplicacao', 'resgate cdb', 'b3 ']),
+    ('moradia', ['aluguel', 'condominio', 'energia', 'enel', 'cemig', 'sabesp', 'agua', 'internet', 'iptu']),
+    ('alimentacao', ['mercado', 'supermerc', 'padaria', 'ifood', 'restaurante', 'lanchonete', 'acougue']),
+    ('transporte', ['uber', '99app', 'posto', 'combustivel', 'estacionamento', 'metro', 'pedagio']),
+    ('saude', ['farmacia', 'drogaria', 'drogasil', 'hospital', 'clinica', 'laboratorio', 'unimed']),
+    ('educacao', ['escola', 'faculdade', 'universidade', 'curso', 'udemy', 'livraria']),
+    ('lazer', ['netflix', 'spotify', 'cinema', 'steam', 'ingresso', 'disney', 'bar ']),
+    ('freela', ['freela', 'pix recebido']),
+]
+
+
+class ErroImportacao(ValueError):
+    pass
+
+
+def _sem_acento(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+@lru_cache(maxsize=4096)
+def categorizar(descricao):
+    texto = _sem_acento(descricao) + ' '
+    for categoria, palavras in REGRAS_CATEGORIA:
+        if any(palavra in texto for palavra in palavras):
+            return categoria
+    return 'outros'
+
+
+def linhas_texto(binario):
+    """ Decodifica linha a linha: UTF-8, com cp1252 de reserva (comum nos OFX dos bancos) """
+    for bruta in binario:
+        if isinstance(bruta, str):
+            yield bruta
+            continue
+        try:
+            yield bruta.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            yield bruta.decode('cp1252', errors='replace')
+
+
+def ler_valor(texto):
+    """ '1.234,56', '-45.90', '1,234.56', 'R$ 10,00' ou '(12,00)' -> Decimal """
+    texto = texto.strip().replace('R$', '').replace(' ', '')
+    negativo = texto.startswith('(') and texto.endswith(')')
+    texto = texto.strip('()')
+    if ',' in texto and texto.rfind(',') > texto.rfind('.'):
+        # Formato brasileiro: ponto de milhar, vírgula decimal
+        texto = texto.replace('.', '').replace(',', '.')
+    else:
+        texto = texto.replace(',', '')
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        raise ErroImportacao(f"valor inválido: {texto!r}")
+    return -valor if negativo else valor
+
+
+def ler_data(texto):
+    texto = texto.strip()
+    if len(texto) == 10 and texto[2] == '/' and texto[5] == '/':
+        # Caminho rápido do formato mais comum (dd/mm/aaaa), sem strptime
+        try:
+            return date(int(texto[6:]), int(texto[3:5]), int(texto[:2]))
+        except ValueError:
+            raise ErroImportacao(f"data inválida: {texto!r}")
+    for formato in ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ErroImportacao(f"data inválida: {texto!r}")
+
+
+# --- LEITORES (geradores de {data, descricao, valor, id}) ---
+
+COLUNAS = {
+    'data': ['data', 'date', 'data lancamento', 'data do lancamento', 'dt'],
+    'descricao': ['descricao', 'historico', 'lancamento', 'description', 'memo', 'estabelecimento', 'titulo'],
+    'valor': ['valor', 'amount', 'value', 'valor (r$)', 'quantia'],
+}
+
+
+def ler_csv(linhas):
+    """
+    CSV com cabeçalho (separador ';' ou ',' detectado na primeira linha).
+    Gera (numero_da_linha, lançamento ou ErroImportacao).
+    """
+    linhas = iter(linhas)
+    cabecalho = next(linhas, '')
+    separador = ';' if cabecalho.count(';') >= cabecalho.count(',') else ','
+    nomes = [_sem_acento(c).strip() for c in next(csv.reader([cabecalho], delimiter=separador))]
+    indices = {}
+    for campo, apelidos in COLUNAS.items():
+        encontrado = next((i for i, nome in enumerate(nomes) if nome in apelidos), None)
+        if encontrado is None:
+            raise ErroImportacao(f"coluna '{campo}' não encontrada no cabeçalho")
+        indices[campo] = encontrado
+
+    for numero, registro in enumerate(csv.reader(linhas, delimiter=separador), start=2):
+        if not any(c.strip() for c in registro):
+            continue
+        try:
+            yield numero, {
+                'data': ler_data(registro[indices['data']]),
+                'descricao': registro[indices['descricao']].strip()[:200],
+                'valor': ler_valor(registro[indices['valor']]),
+                'id': None,
+            }
+        except (ErroImportacao, IndexError) as erro:
+            yield numero, ErroImportacao(str(erro) or 'colunas faltando')
+
+
+_TAG_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+def ler_ofx(linhas):
+    """
+    OFX 1.x (SGML, tags sem fechamento) ou 2.x (XML), lido como fluxo de
+    tags: só o <STMTTRN> corrente fica em memória.
+    """
+    atual = None
+    numero = 0
+    for linha in linhas:
+        for fechamento, tag, valor in _TAG_OFX.findall(linha):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not fechamento:
+                    atual = {}
+                    continue
+                if atual is not None:
+                    numero += 1
+                    yield numero, _lancamento_ofx(atual)
+                atual = None
+            elif atual is not None and not fechamento and valor.strip():
+                atual[tag] = valor.strip()
+
+
+def _lancamento_ofx(campos):
+    try:
+        data_ofx = campos['DTPOSTED'][:8]
+        return {
+            'data': date(int(data_ofx[:4]), int(data_ofx[4:6]), int(data_ofx[6:8])),
+            'descricao': (campos.get('MEMO') or campos.get('NAME') or campos.get('TRNTYPE', ''))[:200],
+            'valor': ler_valor(campos['TRNAMT'].replace(',', '.')),
+            'id': campos.get('FITID'),
+        }
+    except (KeyError, ValueError, ErroImportacao) as erro:
+        return ErroImportacao(f"lançamento OFX incompleto: {erro}")
+
+
+def detectar_formato(nome_arquivo):
+    return 'ofx' if nome_arquivo.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+# --- IMPORTAÇÃO ---
+
+def impressao(dono, lancamento, ocorrencia):
+    """
+    Hash estável da linha. Com FITID (OFX) ele basta; sem ele, data, valor,
+    descrição e a ocorrência (duas linhas idênticas no mesmo dia são dois
+    lançamentos diferentes).
+    """
+    if lancamento['id']:
+        chave = f"{dono}|id|{lancamento['id']}"
+    else:
+        chave = (f"{dono}|{lancamento['data']:%Y-%m-%d}|{lancamento['valor']}|"
+                 f"{_sem_acento(lancamento['descricao']).strip()}|{ocorrencia}")
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+
+def importar_extrato(user, linhas, formato='csv', cartao=None, batch_size=TAMANHO_LOTE, max_erros=50):
+    """
+    Importa os lançamentos de `linhas` (iterável de str/bytes, lido uma vez).
+    Sem `cartao`: Transacao (valor negativo = despesa). Com `cartao`:
+    DespesaCartao só dos débitos (pagamentos/estornos são ignorados).
+
+    Retorna {'lidas', 'importadas', 'duplicadas', 'ignoradas', 'erros'}.
+    """
+    leitor = ler_ofx if formato == 'ofx' else ler_csv
+    resumo = {'lidas': 0, 'importadas': 0, 'duplicadas': 0, 'ignoradas': 0, 'erros': []}
+    dono = f"c{cartao.pk}" if cartao else f"u{user.pk}"
+    lote = {}
+    ocorrencias = {}
+
+    def gravar():
+        if not lote:
+            return
+        existentes = _impressoes_existentes(user, cartao, list(lote))
+        novos = [objeto for chave, objeto in lote.items() if chave not in existentes]
+        resumo['duplicadas'] += len(lote) - len(novos)
+        if cartao:
+            criados = DespesaCartao.objects.bulk_create(novos)
+            # bulk_create não dispara signals: o livro de parcelas é gerado aqui
+            ParcelaCartao.objects.bulk_create(
+                [parcela for despesa in criados for parcela in despesa.gerar_parcelas()], batch_size=batch_size
+            )
+        else:
+            criados = Transacao.objects.bulk_create(novos)
+            somar_transacoes(criados)
+        resumo['importadas'] += len(criados)
+        lote.clear()
+
+    with transaction.atomic():
+        for numero, lancamento in leitor(linhas_texto(linhas)):
+            resumo['lidas'] += 1
+            if isinstance(lancamento, ErroImportacao):
+                if len(resumo['erros']) < max_erros:
+                    resumo['erros'].append(f"Linha {numero}: {lancamento}")
+                continue
+            if lancamento['valor'] == 0 or (cartao and not _e_compra(lancamento, formato)):
+                resumo['ignoradas'] += 1
+                continue
+
+            # Linhas idênticas no mesmo dia, em qualquer ordem no arquivo (o
+            # FITID já identifica o lançamento: não precisa contar)
+            ocorrencia = None
+            if not lancamento['id']:
+                base = (lancamento['data'], lancamento['valor'], lancamento['descricao'])
+                ocorrencia = ocorrencias[base] = ocorrencias.get(base, 0) + 1
+
+            chave = impressao(dono, lancamento, ocorrencia)
+            if chave in lote:
+                resumo['duplicadas'] += 1
+                continue
+            lote[chave] = _montar(user, cartao, lancamento, chave)
+            if len(lote) >= batch_size:
+                gravar()
+        gravar()
+
+    if resumo['importadas']:
+        invalidar_diagnostico(user_id=user.pk)
+        invalidar_widgets(user.pk, 'caixa', 'cartoes')
+    return resumo
+
+
+def _e_compra(lancamento, formato):
+    """ Fatura no OFX traz compras negativas; no CSV, positivas. O resto é pagamento/estorno """
+    return lancamento['valor'] < 0 if formato == 'ofx' else lancamento['valor'] > 0
+
+
+def _impressoes_existentes(user, cartao, chaves):
+    if cartao:
+        consulta = DespesaCartao.objects.filter(cartao=cartao, impressao__in=chaves)
+    else:
+        consulta = Transacao.objects.filter(user=user, impressao__in=chaves)
+    return set(consulta.values_list('impressao', flat=True))
+
+
+def _montar(user, cartao, lancamento, chave):
+    categoria = categorizar(lancamento['descricao'])
+    valor = abs(lancamento['valor']).quantize(CENTAVO)
+    if cartao:
+        return DespesaCartao(
+            cartao=cartao, descricao=lancamento['descricao'], valor=valor,
+            data_compra=lancamento['data'], categoria=categoria, impressao=chave,
+        )
+    return Transacao(
+        user=user, descricao=lancamento['descricao'], valor=valor,
+        tipo='receita' if lancamento['valor'] > 0 else 'despesa', categoria=categoria,
+        data=lancamento['data'], impressao=chave,
+    )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+
+from core.bot_logic import atualizar_historico, montar_simbolo_yahoo
+from core.models import Ativo
+
+
+class Command(BaseCommand):
+    help = ("Atualiza a série local de fechamentos e dividendos dos ativos cadastrados, "
+            "baixando só o trecho que falta de cada símbolo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Só os ativos deste username.")
+        parser.add_argument('--workers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        ativos = Ativo.objects.exclude(tipo='CRIPTO')
+        if options['usuario']:
+            ativos = ativos.filter(user__username=options['usuario'])
+
+        inicios = {}
+        for ticker, tipo, data_inicio in ativos.values('ticker', 'tipo').annotate(
+            data_inicio=Min('data_inicio')
+        ).values_list('ticker', 'tipo', 'data_inicio'):
+            simbolo = montar_simbolo_yahoo(Ativo(ticker=ticker, tipo=tipo))
+            inicios[simbolo] = min(data_inicio, inicios.get(simbolo, data_inicio))
+
+        atualizados, falhas = atualizar_historico(inicios, max_workers=options['workers'])
+        for falha in falhas:
+            self.stdout.write(self.style.WARNING(f"{falha['simbolo']}: {falha['erro']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(inicios)} símbolo(s); {atualizados} atualizado(s) na rede, o resto já estava em dia."
+        ))
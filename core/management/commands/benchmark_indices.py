@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import dados_sinteticos
+from core.models import Transacao, ContaPagar, Compromisso, Nota, OperacaoInvestimento
+from core.resumo_logic import intervalo_mes
+
+
+class _Reverter(Exception):
+    pass
+
+
+def consultas_quentes(user):
+    """ As consultas por usuário/data do dashboard, financas e saúde financeira """
+    hoje = timezone.now().date()
+    inicio, fim = intervalo_mes(hoje.month, hoje.year)
+    return [
+        ('financas: extrato do mês', 'transacao_user_data_idx',
+         Transacao.objects.filter(user=user, data__gte=inicio, data__lt=fim).order_by('-data')),
+        ('saúde: receitas 30 dias', 'transacao_user_tipo_data_idx',
+         Transacao.objects.filter(user=user, tipo='receita', data__gte=hoje - timedelta(days=30))),
+        ('contas atrasadas', 'contapagar_pendentes_idx',
+         ContaPagar.objects.filter(user=user, pago=False, data_vencimento__lt=hoje)),
+        ('próximos compromissos', 'compromisso_pendentes_idx',
+         Compromisso.objects.filter(user=user, concluido=False, data_hora__gte=timezone.now()).order_by('data_hora')[:3]),
+        ('notas recentes', 'nota_user_recentes_idx',
+         Nota.objects.filter(user=user).order_by('-atualizado_em')[:2]),
+        ('aportes 180 dias', 'operacao_ativo_tipo_data_idx',
+         OperacaoInvestimento.objects.filter(ativo__user=user, tipo='C', data__gte=hoje - timedelta(days=180))),
+    ]
+
+
+class Command(BaseCommand):
+    help = ("Gera dados sintéticos, mostra o plano (EXPLAIN) e o tempo das consultas quentes "
+            "e confere se usam os índices compostos. Tudo roda numa transação desfeita no final.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=1_000_000, help="Transações geradas (padrão 1M).")
+        parser.add_argument('--usuarios', type=int, default=200)
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        linhas = options['linhas']
+        try:
+            with transaction.atomic():
+                self._executar(linhas, options['usuarios'], options['repeticoes'])
+                raise _Reverter()
+        except _Reverter:
+            self.stdout.write("Dados sintéticos descartados (rollback).")
+
+    def _executar(self, linhas, total_usuarios, repeticoes):
+        inicio = time.perf_counter()
+        usuarios = dados_sinteticos.criar_usuarios(total_usuarios)
+        dados_sinteticos.gerar_transacoes(usuarios, linhas)
+        dados_sinteticos.gerar_contas(usuarios, linhas // 10)
+        dados_sinteticos.gerar_compromissos(usuarios, linhas // 10)
+        dados_sinteticos.gerar_notas(usuarios, linhas // 20)
+        dados_sinteticos.gerar_operacoes(usuarios, linhas // 5)
+        with connection.cursor() as cursor:
+            # Estatísticas atualizadas para o planejador escolher os índices
+            cursor.execute('ANALYZE')
+        self.stdout.write(f"{linhas} transações geradas em {time.perf_counter() - inicio:.1f}s\n")
+
+        user = usuarios[len(usuarios) // 2]
+        sem_indice = 0
+        for nome, indice, queryset in consultas_quentes(user):
+            plano = queryset.explain()
+            tempos = []
+            for _ in range(repeticoes):
+                t0 = time.perf_counter()
+                list(queryset.all())
+                tempos.append((time.perf_counter() - t0) * 1000)
+            tempos.sort()
+            usa_indice = indice in plano
+            sem_indice += not usa_indice
+            status = self.style.SUCCESS('OK') if usa_indice else self.style.WARNING('SEM ÍNDICE')
+            self.stdout.write(f"[{status}] {nome}: p50 {tempos[len(tempos) // 2]:.2f} ms (esperado {indice})")
+            self.stdout.write('    ' + plano.replace('\n', '\n    '))
+
+        if sem_indice:
+            self.stdout.write(self.style.WARNING(f"{sem_indice} consulta(s) sem o índice esperado."))
@@ -0,0 +1,59 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import dados_sinteticos
+from core.benchmark_logic import executar_benchmark, verificar_limites, limites_configurados, VIEWS
+
+
+class _Reverter(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Gera usuários com volume sintético e mede queries e latência (p50/p95) das views principais. "
+            "Falha se alguma passar do limite. Tudo roda numa transação desfeita no final.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=5)
+        parser.add_argument('--repeticoes', type=int, default=30)
+        parser.add_argument('--view', action='append', choices=VIEWS, help="Repetível. Padrão: todas.")
+        for tabela, padrao in dados_sinteticos.VOLUMES_PADRAO.items():
+            parser.add_argument(f"--{tabela.replace('_', '-')}", type=int, default=padrao, dest=tabela,
+                                help=f"{tabela} por usuário (padrão {padrao}).")
+        parser.add_argument('--json', action='store_true', help="Resultados em JSON (para guardar/comparar).")
+
+    def handle(self, *args, **options):
+        volumes = {tabela: options[tabela] for tabela in dados_sinteticos.VOLUMES_PADRAO}
+        try:
+            with transaction.atomic():
+                resultados = self._executar(options, volumes)
+                raise _Reverter()
+        except _Reverter:
+            pass
+
+        regressoes = verificar_limites(resultados)
+        if options['json']:
+            self.stdout.write(json.dumps({'volumes': volumes, 'resultados': resultados, 'regressoes': regressoes}, indent=2))
+        else:
+            limites = limites_configurados()
+            for r in resultados:
+                teto = limites.get(r['view'], {})
+                self.stdout.write(
+                    f"{r['view']:<26} {r['consultas']:>3} queries (limite {teto.get('consultas', '-')})  "
+                    f"p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms (limite {teto.get('p95_ms', '-')})"
+                )
+        if regressoes:
+            raise CommandError("Limites ultrapassados:\n" + "\n".join(regressoes))
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS("Todas as views dentro dos limites."))
+
+    def _executar(self, options, volumes):
+        inicio = time.perf_counter()
+        usuarios = dados_sinteticos.criar_usuarios(options['usuarios'], prefixo='benchview')
+        dados_sinteticos.gerar_perfil(usuarios, volumes)
+        if not options['json']:
+            self.stdout.write(f"Dados gerados para {len(usuarios)} usuário(s) em {time.perf_counter() - inicio:.1f}s")
+        return executar_benchmark(usuarios[0], views=options['view'], repeticoes=options['repeticoes'])
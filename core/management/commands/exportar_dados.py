@@ -0,0 +1,57 @@
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.exportacao_logic import exportar, ler_desde, nome_arquivo, ErroExportacao, FORMATOS, TABELAS
+
+
+class Command(BaseCommand):
+    help = "Exporta o histórico financeiro de um usuário (CSV/JSONL/ZIP) em streaming, com memória constante."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True)
+        parser.add_argument('--formato', choices=FORMATOS, default='zip')
+        parser.add_argument('--tabela', choices=list(TABELAS), help="Padrão: todas (obrigatória no CSV).")
+        parser.add_argument('--desde', help="AAAA-MM-DD ou data/hora ISO: só o que mudou a partir dali.")
+        parser.add_argument('--saida', help="Arquivo de destino ('-' = stdout). Padrão: backup_<tabela>_<data>.<formato>")
+        parser.add_argument('--lote', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['usuario']}' não existe.")
+
+        # Marcado antes de ler: é o --desde da próxima exportação incremental
+        inicio_exportacao = timezone.now()
+        try:
+            desde = ler_desde(options['desde'])
+            conteudo = exportar(user, formato=options['formato'], tabela=options['tabela'],
+                                desde=desde, chunk_size=options['lote'])
+        except ErroExportacao as erro:
+            raise CommandError(str(erro))
+
+        saida = options['saida'] or nome_arquivo(options['formato'], options['tabela'])
+        inicio = time.perf_counter()
+        total = 0
+        if saida == '-':
+            for bloco in conteudo:
+                sys.stdout.buffer.write(bloco)
+            sys.stdout.buffer.flush()
+            return
+
+        try:
+            with open(saida, 'wb') as arquivo:
+                for bloco in conteudo:
+                    arquivo.write(bloco)
+                    total += len(bloco)
+        except OSError as erro:
+            raise CommandError(str(erro))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{saida}: {total / 1024:.1f} KB em {time.perf_counter() - inicio:.1f}s. "
+            f"Próxima exportação incremental: --desde {inicio_exportacao.isoformat()}"
+        ))
@@ -0,0 +1,64 @@
+import csv
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import dados_sinteticos
+from core.desafio_logic import criar_desafios_em_lote
+from core.models import Desafio
+
+
+class Command(BaseCommand):
+    help = ("Cria desafios (com todas as semanas) em lote, a partir de um CSV "
+            "(objetivo;valor_inicial;incremento;duracao_semanas;data_inicio) ou sintéticos para teste de carga.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Dono dos desafios do CSV (username).")
+        parser.add_argument('--arquivo', help="CSV separado por ';' com cabeçalho.")
+        parser.add_argument('--sinteticos', type=int, default=0,
+                            help="Quantidade de desafios sintéticos (espalhados entre --usuarios).")
+        parser.add_argument('--usuarios', type=int, default=50)
+        parser.add_argument('--semanas', type=int, default=52)
+        parser.add_argument('--lote', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not options['arquivo'] and not options['sinteticos']:
+            raise CommandError("Informe --arquivo ou --sinteticos.")
+
+        inicio = time.perf_counter()
+        if options['arquivo']:
+            if not options['usuario']:
+                raise CommandError("--arquivo exige --usuario.")
+            try:
+                user = User.objects.get(username=options['usuario'])
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário '{options['usuario']}' não existe.")
+            desafios = list(self._ler_csv(options['arquivo'], user))
+            total_desafios, total_semanas = criar_desafios_em_lote(desafios, batch_size=options['lote'])
+        else:
+            usuarios = dados_sinteticos.criar_usuarios(options['usuarios'])
+            total_desafios, total_semanas = dados_sinteticos.gerar_desafios(
+                usuarios, options['sinteticos'], semanas=options['semanas'], batch_size=options['lote']
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_desafios} desafio(s) e {total_semanas} semana(s) criados em {time.perf_counter() - inicio:.1f}s."
+        ))
+
+    def _ler_csv(self, caminho, user):
+        with open(caminho, newline='', encoding='utf-8') as arquivo:
+            for linha, registro in enumerate(csv.DictReader(arquivo, delimiter=';'), start=2):
+                try:
+                    yield Desafio(
+                        user=user,
+                        objetivo=registro['objetivo'],
+                        valor_inicial=Decimal(registro['valor_inicial']),
+                        incremento=Decimal(registro.get('incremento') or 0),
+                        duracao_semanas=int(registro.get('duracao_semanas') or 12),
+                        data_inicio=date.fromisoformat(registro['data_inicio']) if registro.get('data_inicio') else date.today(),
+                    )
+                except (KeyError, ValueError, InvalidOperation) as erro:
+                    raise CommandError(f"Linha {linha} inválida: {erro}")
@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao_logic import importar_extrato, detectar_formato, ErroImportacao
+from core.models import CartaoCredito
+
+
+class Command(BaseCommand):
+    help = "Importa um extrato CSV/OFX (lido em streaming, gravado em lotes, sem duplicar linhas já importadas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--usuario', required=True)
+        parser.add_argument('--cartao', type=int, help="ID do cartão: importa como compras na fatura.")
+        parser.add_argument('--formato', choices=['csv', 'ofx'], help="Padrão: pela extensão do arquivo.")
+        parser.add_argument('--lote', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['usuario']}' não existe.")
+        cartao = None
+        if options['cartao']:
+            cartao = CartaoCredito.objects.filter(pk=options['cartao'], user=user).first()
+            if cartao is None:
+                raise CommandError("Cartão não encontrado para este usuário.")
+
+        formato = options['formato'] or detectar_formato(options['arquivo'])
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resumo = importar_extrato(user, arquivo, formato=formato, cartao=cartao, batch_size=options['lote'])
+        except (OSError, ErroImportacao) as erro:
+            raise CommandError(str(erro))
+
+        for erro in resumo['erros']:
+            self.stdout.write(self.style.WARNING(erro))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumo['lidas']} linha(s) lida(s) em {time.perf_counter() - inicio:.1f}s: "
+            f"{resumo['importadas']} importada(s), {resumo['duplicadas']} duplicada(s), {resumo['ignoradas']} ignorada(s)."
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tarefas import processar_proxima, liberar_travadas
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de tarefas (análise da carteira etc.), usando o banco como broker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Esvazia a fila e termina.")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera com a fila vazia.")
+        parser.add_argument('--travadas-minutos', type=int, default=30,
+                            help="Tarefas executando há mais que isso voltam para a fila.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker iniciado. Aguardando tarefas...")
+        while True:
+            close_old_connections()
+            liberadas = liberar_travadas(options['travadas_minutos'])
+            if liberadas:
+                self.stdout.write(self.style.WARNING(f"{liberadas} tarefa(s) travada(s) devolvida(s) à fila."))
+
+            tarefa = processar_proxima()
+            if tarefa is not None:
+                estilo = self.style.SUCCESS if tarefa.status == 'concluida' else self.style.ERROR
+                self.stdout.write(estilo(f"Tarefa {tarefa.pk} ({tarefa.tipo}) -> {tarefa.status}"))
+                continue
+
+            if options['uma_vez']:
+                break
+            time.sleep(options['intervalo'])
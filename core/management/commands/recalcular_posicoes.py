@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Ativo
+from core.posicao_logic import reconstruir_posicoes, conferir_posicao
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a posição (quantidade, custo, preço médio) de todos os ativos a partir das operações."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Só os ativos deste username.")
+        parser.add_argument('--verificar', action='store_true',
+                            help="Apenas compara com o replay e lista as divergências, sem gravar.")
+
+    def handle(self, *args, **options):
+        ativos = Ativo.objects.all()
+        if options['usuario']:
+            ativos = ativos.filter(user__username=options['usuario'])
+
+        if options['verificar']:
+            divergentes = 0
+            for ativo in ativos.iterator(chunk_size=500):
+                diferencas = conferir_posicao(ativo, corrigir=False)
+                if diferencas:
+                    divergentes += 1
+                    self.stdout.write(f"{ativo.ticker} (pk={ativo.pk}): {diferencas}")
+            self.stdout.write(f"{divergentes} ativo(s) divergente(s).")
+            return
+
+        total = reconstruir_posicoes(ativos)
+        self.stdout.write(self.style.SUCCESS(f"Posições reconstruídas: {total} ativo(s)."))
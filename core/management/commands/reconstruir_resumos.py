@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.resumo_logic import reconstruir_resumos
+
+
+class Command(BaseCommand):
+    help = "Refaz o rollup mensal do caixa (ResumoMensal) a partir de todas as transações."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Só as transações deste username.")
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usuario']:
+            users = User.objects.filter(username=options['usuario'])
+        total = reconstruir_resumos(users)
+        self.stdout.write(self.style.SUCCESS(f"Resumos reconstruídos: {total} linha(s)."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.screener_logic import atualizar_snapshot
+
+
+class Command(BaseCommand):
+    help = "Baixa o screener do Fundamentus e grava o snapshot usado pelo Radar de Mercado."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forcar', action='store_true', help="Reprocessa mesmo se o HTML não mudou.")
+
+    def handle(self, *args, **options):
+        snapshot, reprocessado = atualizar_snapshot(forcar=options['forcar'])
+        if reprocessado:
+            self.stdout.write(self.style.SUCCESS(
+                f"Snapshot gerado: {snapshot.total_papeis} papéis (hash {snapshot.hash_conteudo[:12]})."
+            ))
+        else:
+            self.stdout.write("HTML sem alterações desde o último snapshot. Nada a reprocessar.")
@@ -0,0 +1,108 @@
+"""
+Spans de tempo dos pipelines do robô e do screener.
+
+Um Medidor acompanha uma execução: `etapa()` cronometra um trecho (e conta
+a falha se ele levantar exceção) e `registrar()` guarda a duração de cada
+chamada por símbolo (cotação, info, histórico...). No fim, `salvar()` grava
+um ExecucaoPipeline com o tempo por etapa e os símbolos mais lentos, e emite
+uma linha JSON no logger 'core.medicao'.
+
+Funções internas do pipeline podem abrir spans sem receber o medidor:
+`etapa(nome)` usa o medidor ativado com `medidor.ativo()` (ou não mede nada).
+"""
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.utils import timezone
+
+from .models import ExecucaoPipeline
+
+logger = logging.getLogger(__name__)
+
+# Símbolos mais lentos guardados no resumo e execuções mantidas por pipeline/usuário
+LIMITE_SIMBOLOS = 20
+EXECUCOES_MANTIDAS = 20
+
+_medidor_ativo = contextvars.ContextVar('medidor_ativo', default=None)
+
+
+class Medidor:
+    def __init__(self, pipeline, user=None):
+        self.pipeline = pipeline
+        self.user = user
+        self.iniciado_em = timezone.now()
+        self._inicio = time.perf_counter()
+        self.etapas = {}
+        self.chamadas = []
+
+    def _etapa(self, nome):
+        # ms: tempo de relógio da etapa; ms_chamadas: soma das chamadas por símbolo (paralelas)
+        return self.etapas.setdefault(nome, {'ms': 0.0, 'chamadas': 0, 'ms_chamadas': 0.0, 'falhas': 0})
+
+    @contextmanager
+    def etapa(self, nome):
+        """ Cronometra o bloco; uma exceção conta como falha da etapa (e é relançada) """
+        inicio = time.perf_counter()
+        dados = self._etapa(nome)
+        try:
+            yield dados
+        except Exception:
+            dados['falhas'] += 1
+            raise
+        finally:
+            dados['ms'] += (time.perf_counter() - inicio) * 1000
+
+    @contextmanager
+    def ativo(self):
+        """ Torna este o medidor das chamadas a `etapa()` dentro do bloco """
+        marcador = _medidor_ativo.set(self)
+        try:
+            yield self
+        finally:
+            _medidor_ativo.reset(marcador)
+
+    def registrar(self, etapa, simbolo, ms, erro=None):
+        """ Duração de uma chamada por símbolo (rodando em paralelo: não soma no tempo da etapa) """
+        dados = self._etapa(etapa)
+        dados['chamadas'] += 1
+        dados['ms_chamadas'] += ms
+        if erro:
+            dados['falhas'] += 1
+        self.chamadas.append({'simbolo': simbolo, 'etapa': etapa, 'ms': round(ms, 1), 'erro': erro or ''})
+
+    def falha(self, etapa):
+        self._etapa(etapa)['falhas'] += 1
+
+    def resumo(self):
+        return {
+            'pipeline': self.pipeline,
+            'duracao_ms': round((time.perf_counter() - self._inicio) * 1000, 1),
+            'total_falhas': sum(d['falhas'] for d in self.etapas.values()),
+            'etapas': {
+                nome: {**d, 'ms': round(d['ms'], 1), 'ms_chamadas': round(d['ms_chamadas'], 1)}
+                for nome, d in self.etapas.items()
+            },
+            'simbolos': sorted(self.chamadas, key=lambda c: -c['ms'])[:LIMITE_SIMBOLOS],
+        }
+
+    def salvar(self):
+        resumo = self.resumo()
+        logger.info(json.dumps({**resumo, 'user': getattr(self.user, 'pk', None)}, ensure_ascii=False))
+        execucao = ExecucaoPipeline.objects.create(user=self.user, iniciado_em=self.iniciado_em, **resumo)
+        # Só as execuções mais recentes ficam no banco
+        antigas = ExecucaoPipeline.objects.filter(pipeline=self.pipeline, user=self.user).values_list('pk', flat=True)[EXECUCOES_MANTIDAS:]
+        ExecucaoPipeline.objects.filter(pk__in=list(antigas)).delete()
+        return execucao
+
+
+def etapa(nome):
+    """ Span no medidor ativo (sem medidor ativo, não faz nada) """
+    medidor = _medidor_ativo.get()
+    return medidor.etapa(nome) if medidor is not None else nullcontext()
+
+
+def ultima_execucao(pipeline, user=None):
+    return ExecucaoPipeline.objects.filter(pipeline=pipeline, user=user).first()
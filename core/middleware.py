@@ -0,0 +1,36 @@
+"""
+Middlewares do projeto.
+
+WhiteNoiseMiddleware aceita views async: o do pacote é só síncrono, e um
+único middleware síncrono na cadeia faz o Django rodar toda requisição ASGI
+numa thread (as views async perdem o sentido). No WSGI funciona igual ao
+original.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as WhiteNoiseBase
+
+
+class WhiteNoiseMiddleware(WhiteNoiseBase):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # stat/abertura do arquivo são bloqueantes: ficam fora do loop
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_ativo_data_inicio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('analise_carteira', 'Análise da Carteira')], max_length=30)),
+                ('status', models.CharField(choices=[('pendente', 'Na Fila'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=12)),
+                ('progresso', models.PositiveSmallIntegerField(default=0)),
+                ('mensagem', models.CharField(blank=True, default='', max_length=255)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('finalizado_em', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='tarefa_fila_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pendente', 'executando'])), fields=('user', 'tipo'), name='tarefa_unica_em_andamento')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_tarefa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotScreener',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gerado_em', models.DateTimeField(help_text='Quando a tabela foi baixada e processada')),
+                ('verificado_em', models.DateTimeField(help_text='Última vez que o HTML foi conferido')),
+                ('hash_conteudo', models.CharField(max_length=64)),
+                ('total_papeis', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-gerado_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PapelScreener',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('papel', models.CharField(max_length=12)),
+                ('cotacao', models.FloatField(null=True)),
+                ('pl', models.FloatField(null=True)),
+                ('pvp', models.FloatField(null=True)),
+                ('psr', models.FloatField(null=True)),
+                ('dy', models.FloatField(null=True)),
+                ('p_ativo', models.FloatField(null=True)),
+                ('p_cap_giro', models.FloatField(null=True)),
+                ('p_ebit', models.FloatField(null=True)),
+                ('p_ativ_circ_liq', models.FloatField(null=True)),
+                ('ev_ebit', models.FloatField(null=True)),
+                ('ev_ebitda', models.FloatField(null=True)),
+                ('mrg_ebit', models.FloatField(null=True)),
+                ('mrg_liq', models.FloatField(null=True)),
+                ('liq_corr', models.FloatField(null=True)),
+                ('roic', models.FloatField(null=True)),
+                ('roe', models.FloatField(null=True)),
+                ('liq_2meses', models.FloatField(null=True)),
+                ('patrim_liq', models.FloatField(null=True)),
+                ('div_brut_patrim', models.FloatField(null=True)),
+                ('cresc_rec_5a', models.FloatField(null=True)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='papeis', to='core.snapshotscreener')),
+            ],
+        ),
+    ]
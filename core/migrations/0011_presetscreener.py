@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_snapshotscreener_papelscreener'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresetScreener',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50)),
+                ('criterios', models.JSONField(default=list)),
+                ('ordenar_por', models.CharField(choices=[('dy', 'Dividend Yield'), ('roe', 'ROE'), ('roic', 'ROIC'), ('liq_2meses', 'Liquidez')], default='dy', max_length=20)),
+                ('limite', models.PositiveSmallIntegerField(default=20)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['nome'],
+            },
+        ),
+    ]
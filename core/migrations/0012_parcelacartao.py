@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:49
+
+import django.db.models.deletion
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+
+
+def expandir_despesas_existentes(apps, schema_editor):
+    """ Gera o livro de parcelas das compras já cadastradas """
+    DespesaCartao = apps.get_model('core', 'DespesaCartao')
+    ParcelaCartao = apps.get_model('core', 'ParcelaCartao')
+
+    lote = []
+    for despesa in DespesaCartao.objects.all().iterator(chunk_size=1000):
+        total = max(despesa.parcelas, 1)
+        valor_parcela = (despesa.valor / total).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        inicio = despesa.data_compra.year * 12 + despesa.data_compra.month - 1
+        for numero in range(1, total + 1):
+            indice = inicio + numero - 1
+            lote.append(ParcelaCartao(
+                despesa_id=despesa.pk,
+                cartao_id=despesa.cartao_id,
+                competencia=date(indice // 12, indice % 12 + 1, 1),
+                numero=numero,
+                valor=valor_parcela if numero < total else despesa.valor - valor_parcela * (total - 1),
+            ))
+        if len(lote) >= 1000:
+            ParcelaCartao.objects.bulk_create(lote)
+            lote = []
+    ParcelaCartao.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_presetscreener'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParcelaCartao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(help_text='Primeiro dia do mês da fatura')),
+                ('numero', models.PositiveSmallIntegerField()),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cartao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lancamentos', to='core.cartaocredito')),
+                ('despesa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lancamentos', to='core.despesacartao')),
+            ],
+            options={
+                'ordering': ['competencia'],
+                'indexes': [models.Index(fields=['cartao', 'competencia'], name='parcela_cartao_mes_idx')],
+            },
+        ),
+        migrations.RunPython(expandir_despesas_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:50
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum, F, Q
+
+
+def preencher_acumuladores(apps, schema_editor):
+    """ Acumuladores das posições já existentes, numa query agrupada """
+    Ativo = apps.get_model('core', 'Ativo')
+    OperacaoInvestimento = apps.get_model('core', 'OperacaoInvestimento')
+    decimal = models.DecimalField(max_digits=24, decimal_places=8)
+
+    somas = OperacaoInvestimento.objects.values('ativo').order_by().annotate(
+        qc=Sum('quantidade', filter=Q(tipo='C')),
+        custo=Sum(F('quantidade') * F('preco_unitario') + F('taxas'), filter=Q(tipo='C'), output_field=decimal),
+        qv=Sum('quantidade', filter=Q(tipo='V')),
+        receita=Sum(F('quantidade') * F('preco_unitario') - F('taxas'), filter=Q(tipo='V'), output_field=decimal),
+    )
+    lote = []
+    for linha in somas:
+        lote.append(Ativo(
+            pk=linha['ativo'],
+            quantidade_comprada=linha['qc'] or Decimal('0'),
+            custo_compras=linha['custo'] or Decimal('0'),
+            quantidade_vendida=linha['qv'] or Decimal('0'),
+            receita_vendas=linha['receita'] or Decimal('0'),
+        ))
+    Ativo.objects.bulk_update(
+        lote, ['quantidade_comprada', 'custo_compras', 'quantidade_vendida', 'receita_vendas'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_parcelacartao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ativo',
+            name='custo_compras',
+            field=models.DecimalField(decimal_places=8, default=0, help_text='Σ (qtd * preço + taxas) das compras', max_digits=24),
+        ),
+        migrations.AddField(
+            model_name='ativo',
+            name='quantidade_comprada',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='ativo',
+            name='quantidade_vendida',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='ativo',
+            name='receita_vendas',
+            field=models.DecimalField(decimal_places=8, default=0, help_text='Σ (qtd * preço - taxas) das vendas', max_digits=24),
+        ),
+        migrations.RunPython(preencher_acumuladores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_ativo_acumuladores_posicao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compromisso',
+            index=models.Index(condition=models.Q(('concluido', False)), fields=['user', 'data_hora'], name='compromisso_pendentes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compromisso',
+            index=models.Index(fields=['user', 'data_hora'], name='compromisso_user_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contapagar',
+            index=models.Index(condition=models.Q(('pago', False)), fields=['user', 'data_vencimento'], name='contapagar_pendentes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nota',
+            index=models.Index(fields=['user', '-atualizado_em'], name='nota_user_recentes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='operacaoinvestimento',
+            index=models.Index(fields=['ativo', 'tipo', 'data'], name='operacao_ativo_tipo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['user', 'data'], name='transacao_user_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['user', 'tipo', 'data'], name='transacao_user_tipo_data_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_indices_consultas_por_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiagnosticoFinanceiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.PositiveIntegerField(default=1)),
+                ('valido', models.BooleanField(default=False)),
+                ('data_referencia', models.DateField(blank=True, help_text='Dia em que foi calculado (janela de 30 dias)', null=True)),
+                ('score', models.IntegerField(default=0)),
+                ('taxa_poupanca', models.FloatField(default=0)),
+                ('total_atrasado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('uso_cartao', models.FloatField(default=0)),
+                ('recomendacoes', models.JSONField(default=list)),
+                ('gerado_em', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='diagnostico_financeiro', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
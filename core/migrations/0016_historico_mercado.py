@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_diagnosticofinanceiro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieHistorica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('simbolo', models.CharField(max_length=20, unique=True)),
+                ('inicio', models.DateField(blank=True, help_text='Primeiro dia coberto pela série', null=True)),
+                ('fim', models.DateField(blank=True, help_text='Último pregão gravado', null=True)),
+                ('atualizado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DividendoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('simbolo', models.CharField(max_length=20)),
+                ('data', models.DateField(help_text='Data ex')),
+                ('valor', models.FloatField(help_text='Valor por ação/cota')),
+            ],
+            options={
+                'ordering': ['simbolo', 'data'],
+                'constraints': [models.UniqueConstraint(fields=('simbolo', 'data'), name='dividendo_historico_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrecoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('simbolo', models.CharField(max_length=20)),
+                ('data', models.DateField()),
+                ('fechamento', models.FloatField()),
+            ],
+            options={
+                'ordering': ['simbolo', 'data'],
+                'constraints': [models.UniqueConstraint(fields=('simbolo', 'data'), name='preco_historico_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def preencher_resumos(apps, schema_editor):
+    """ Monta o rollup das transações já existentes (uma query agrupada) """
+    Transacao = apps.get_model('core', 'Transacao')
+    ResumoMensal = apps.get_model('core', 'ResumoMensal')
+    grupos = (
+        Transacao.objects.annotate(mes=TruncMonth('data'))
+        .values('user_id', 'mes', 'tipo', 'categoria').order_by()
+        .annotate(total=Sum('valor'), quantidade=Count('id'))
+    )
+    ResumoMensal.objects.bulk_create([ResumoMensal(**grupo) for grupo in grupos], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_historico_mercado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês')),
+                ('tipo', models.CharField(choices=[('receita', 'Receita (Entrada)'), ('despesa', 'Despesa (Saída)')], max_length=10)),
+                ('categoria', models.CharField(choices=[('salario', 'Salário'), ('freela', 'Freelance/Extra'), ('investimento', 'Investimentos'), ('moradia', 'Moradia/Contas'), ('alimentacao', 'Alimentação'), ('transporte', 'Transporte'), ('lazer', 'Lazer'), ('saude', 'Saúde'), ('educacao', 'Educação'), ('outros', 'Outros')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['mes'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'mes', 'tipo', 'categoria'), name='resumo_mensal_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_resumomensal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='despesacartao',
+            name='impressao',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='transacao',
+            name='impressao',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddIndex(
+            model_name='despesacartao',
+            index=models.Index(fields=['cartao', 'impressao'], name='despesa_impressao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['user', 'impressao'], name='transacao_impressao_idx'),
+        ),
+    ]
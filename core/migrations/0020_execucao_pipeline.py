@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_atualizado_em_exportacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoPipeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pipeline', models.CharField(choices=[('robo', 'Robô (Análise da Carteira)'), ('screener', 'Screener (Fundamentus)')], max_length=20)),
+                ('iniciado_em', models.DateTimeField()),
+                ('duracao_ms', models.FloatField(default=0)),
+                ('total_falhas', models.PositiveIntegerField(default=0)),
+                ('etapas', models.JSONField(default=dict)),
+                ('simbolos', models.JSONField(default=list)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-iniciado_em'],
+                'indexes': [models.Index(fields=['pipeline', 'user', '-iniciado_em'], name='execucao_recentes_idx')],
+            },
+        ),
+    ]
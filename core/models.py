@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone 
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 
 # ==========================================
 # 1. AGENDA / COMPROMISSOS
@@ -18,6 +20,12 @@ class Compromisso(models.Model):
 
     class Meta:
         ordering = ['data_hora']
+        indexes = [
+            # Agenda e próximos compromissos do dashboard
+            # Parcial: o "WHERE NOT concluido" do ORM casa com a condição do índice
+            models.Index(fields=['user', 'data_hora'], condition=models.Q(concluido=False), name='compromisso_pendentes_idx'),
+            models.Index(fields=['user', 'data_hora'], name='compromisso_user_data_idx'),
+        ]
 
 # ==========================================
 # 2. BLOCO DE NOTAS
@@ -33,6 +41,11 @@ class Nota(models.Model):
     def __str__(self):
         return self.titulo
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-atualizado_em'], name='nota_user_recentes_idx'),
+        ]
+
 # ==========================================
 # 3. CONTROLE FINANCEIRO (Fluxo de Caixa)
 # ==========================================
@@ -62,6 +75,10 @@ class Transacao(models.Model):
     categoria = models.CharField(max_length=20, choices=CATEGORIA_CHOICES, default='outros')
     data = models.DateField()
     pago = models.BooleanField(default=True, verbose_name="Efetuado/Recebido")
+    # Hash da linha do extrato importado (evita importar a mesma linha duas vezes)
+    impressao = models.CharField(max_length=40, blank=True, default='', editable=False)
+    # Exportação incremental ("desde"): o que mudou depois da última sincronização
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         sinal = "+" if self.tipo == 'receita' else "-"
@@ -70,6 +87,35 @@ class Transacao(models.Model):
     class Meta:
         verbose_name = "Transação"
         verbose_name_plural = "Transações"
+        indexes = [
+            # Extrato do mês (financas) e totais por tipo (dashboard, saúde financeira)
+            models.Index(fields=['user', 'data'], name='transacao_user_data_idx'),
+            models.Index(fields=['user', 'tipo', 'data'], name='transacao_user_tipo_data_idx'),
+            models.Index(fields=['user', 'impressao'], name='transacao_impressao_idx'),
+            models.Index(fields=['user', 'atualizado_em'], name='transacao_atualizado_idx'),
+        ]
+
+class ResumoMensal(models.Model):
+    """
+    Rollup do caixa por (usuário, mês, tipo, categoria). Mantido pelos
+    signals de Transacao; totais do dashboard, resumo por categoria e saúde
+    financeira leem algumas dezenas destas linhas em vez do histórico todo.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    mes = models.DateField(help_text="Primeiro dia do mês")
+    tipo = models.CharField(max_length=10, choices=Transacao.TIPO_CHOICES)
+    categoria = models.CharField(max_length=20, choices=Transacao.CATEGORIA_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['mes']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'mes', 'tipo', 'categoria'], name='resumo_mensal_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.mes:%m/%Y} {self.tipo}/{self.categoria}: R$ {self.total}"
 
 # ==========================================
 # 4. CARTÃO DE CRÉDITO
@@ -95,10 +141,61 @@ class DespesaCartao(models.Model):
     # Controle de Parcelas
     parcelas = models.IntegerField(default=1, verbose_name="Qtde Parcelas")
     parcela_atual = models.IntegerField(default=1)
+    # Hash da linha da fatura importada
+    impressao = models.CharField(max_length=40, blank=True, default='', editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cartao', 'impressao'], name='despesa_impressao_idx'),
+        ]
 
     def __str__(self):
         return f"{self.descricao} ({self.parcela_atual}/{self.parcelas})"
 
+    def gerar_parcelas(self):
+        """
+        Expande a compra em uma ParcelaCartao por mês de fatura.
+        Os centavos que sobram da divisão vão para a última parcela.
+        """
+        total = max(self.parcelas, 1)
+        valor = Decimal(self.valor)
+        valor_parcela = (valor / total).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        inicio = self.data_compra.year * 12 + self.data_compra.month - 1
+
+        parcelas = []
+        for numero in range(1, total + 1):
+            indice = inicio + numero - 1
+            parcelas.append(ParcelaCartao(
+                despesa=self,
+                cartao_id=self.cartao_id,
+                competencia=date(indice // 12, indice % 12 + 1, 1),
+                numero=numero,
+                valor=valor_parcela if numero < total else valor - valor_parcela * (total - 1),
+            ))
+        return parcelas
+
+class ParcelaCartao(models.Model):
+    """
+    Livro de faturas materializado: uma linha por (compra, mês).
+    Mantido pelos signals de DespesaCartao; a fatura de qualquer mês e o
+    limite tomado de cada cartão viram uma soma indexada.
+    """
+    despesa = models.ForeignKey(DespesaCartao, on_delete=models.CASCADE, related_name='lancamentos')
+    cartao = models.ForeignKey(CartaoCredito, on_delete=models.CASCADE, related_name='lancamentos')
+    competencia = models.DateField(help_text="Primeiro dia do mês da fatura")
+    numero = models.PositiveSmallIntegerField()
+    valor = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['competencia']
+        indexes = [
+            models.Index(fields=['cartao', 'competencia'], name='parcela_cartao_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.despesa.descricao} {self.numero}/{self.despesa.parcelas} - {self.competencia:%m/%Y}"
+
 # ==========================================
 # 5. INVESTIMENTOS
 # ==========================================
@@ -119,10 +216,23 @@ class Ativo(models.Model):
     # Aumentei casas decimais para suportar frações de Cripto (ex: 0.00045 BTC)
     quantidade_atual = models.DecimalField(max_digits=15, decimal_places=8, default=0)
     preco_medio = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Acumuladores da posição (mantidos incrementalmente a cada operação)
+    quantidade_comprada = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    custo_compras = models.DecimalField(max_digits=24, decimal_places=8, default=0, help_text="Σ (qtd * preço + taxas) das compras")
+    quantidade_vendida = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    receita_vendas = models.DecimalField(max_digits=24, decimal_places=8, default=0, help_text="Σ (qtd * preço - taxas) das vendas")
     
     def total_investido(self):
         return self.quantidade_atual * self.preco_medio
 
+    def lucro_realizado(self):
+        """ Vendas - custo médio das cotas vendidas """
+        if not self.quantidade_comprada:
+            return self.receita_vendas
+        custo_medio = self.custo_compras / self.quantidade_comprada
+        return self.receita_vendas - self.quantidade_vendida * custo_medio
+
     def __str__(self):
         return f"{self.ticker} ({self.get_tipo_display()})"
 
@@ -166,7 +276,14 @@ class OperacaoInvestimento(models.Model):
     quantidade = models.DecimalField(max_digits=15, decimal_places=8, default=0)
     preco_unitario = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     taxas = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Aportes por período e replay de compras/vendas do ativo
+            models.Index(fields=['ativo', 'tipo', 'data'], name='operacao_ativo_tipo_data_idx'),
+        ]
+
     def valor_total(self):
         if self.tipo == 'D':
             return self.preco_unitario 
@@ -179,6 +296,15 @@ class OperacaoInvestimento(models.Model):
 # 6. DESAFIOS & METAS
 # ==========================================
 
+class DesafioQuerySet(models.QuerySet):
+    def com_totais(self):
+        """ Totais das semanas anotados na mesma query (evita 2-3 aggregates por desafio) """
+        return self.annotate(
+            valor_total_planejado=models.Sum('semanas__valor'),
+            valor_total_pago=models.Sum('semanas__valor', filter=models.Q(semanas__pago=True)),
+            qtd_semanas=models.Count('semanas'),
+        )
+
 class Desafio(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     objetivo = models.CharField(max_length=100, help_text="Ex: Trocar de Moto, Viagem")
@@ -191,9 +317,15 @@ class Desafio(models.Model):
     data_inicio = models.DateField(default=timezone.now)
     concluido = models.BooleanField(default=False)
 
+    objects = DesafioQuerySet.as_manager()
+
     def total_planejado(self):
+        # Veio anotado por com_totais(): não precisa consultar
+        if hasattr(self, 'qtd_semanas'):
+            if self.qtd_semanas:
+                return self.valor_total_planejado or 0
         # Se as semanas já existem, soma elas (é o mais seguro)
-        if self.semanas.exists():
+        elif self.semanas.exists():
             return self.semanas.aggregate(models.Sum('valor'))['valor__sum'] or 0
             
         # Fórmula da Soma de P.A. (Caso ainda não tenha gerado)
@@ -206,8 +338,27 @@ class Desafio(models.Model):
             return 0
 
     def total_pago(self):
+        if hasattr(self, 'valor_total_pago'):
+            return self.valor_total_pago or 0
         return self.semanas.filter(pago=True).aggregate(models.Sum('valor'))['valor__sum'] or 0
 
+    def gerar_semanas(self):
+        """
+        Semanas do desafio em memória (sem salvar), para um único bulk_create.
+        Valor = Inicial + ((Semana - 1) * Aumento), uma semana a cada 7 dias.
+        """
+        incremento = self.incremento or 0
+        return [
+            SemanaDesafio(
+                desafio=self,
+                numero=i,
+                data_prevista=self.data_inicio + timedelta(days=7 * (i - 1)),
+                valor=self.valor_inicial + (i - 1) * incremento,
+                pago=False,
+            )
+            for i in range(1, self.duracao_semanas + 1)
+        ]
+
     def progresso_percentual(self):
         total = self.total_planejado()
         if total == 0: return 0
@@ -247,11 +398,16 @@ class ContaPagar(models.Model):
     data_vencimento = models.DateField()
     pago = models.BooleanField(default=False)
     recorrencia = models.CharField(max_length=1, choices=RECORRENCIA_CHOICES, default='M')
+    atualizado_em = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Conta a Pagar"
         verbose_name_plural = "Contas a Pagar"
         ordering = ['data_vencimento'] 
+        indexes = [
+            # Parcial: só as contas em aberto (a maioria já está paga)
+            models.Index(fields=['user', 'data_vencimento'], condition=models.Q(pago=False), name='contapagar_pendentes_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.data_vencimento.strftime('%d/%m')}"
@@ -271,4 +427,266 @@ class ContaPagar(models.Model):
         elif dias_restantes <= 5:
             return 'proximo'  
         else:
-            return 'longe'
\ No newline at end of file
+            return 'longe'
+# ==========================================
+# 8. TAREFAS EM SEGUNDO PLANO (Fila no próprio banco)
+# ==========================================
+class Tarefa(models.Model):
+    TIPO_CHOICES = [
+        ('analise_carteira', 'Análise da Carteira'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pendente', 'Na Fila'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+
+    EM_ANDAMENTO = ['pendente', 'executando']
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='pendente')
+    progresso = models.PositiveSmallIntegerField(default=0)
+    mensagem = models.CharField(max_length=255, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    finalizado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['criado_em']
+        indexes = [
+            models.Index(fields=['status', 'criado_em'], name='tarefa_fila_idx'),
+        ]
+        constraints = [
+            # Uma tarefa do mesmo tipo por usuário na fila/execução (dedupe)
+            models.UniqueConstraint(
+                fields=['user', 'tipo'],
+                condition=models.Q(status__in=['pendente', 'executando']),
+                name='tarefa_unica_em_andamento',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.user} ({self.get_status_display()})"
+
+    @property
+    def em_andamento(self):
+        return self.status in self.EM_ANDAMENTO
+
+class ExecucaoPipeline(models.Model):
+    """
+    Resumo de uma execução do robô ou do screener: tempo de cada etapa, as
+    falhas e os símbolos mais lentos (ver core/medicao.py).
+    """
+    PIPELINE_CHOICES = [
+        ('robo', 'Robô (Análise da Carteira)'),
+        ('screener', 'Screener (Fundamentus)'),
+    ]
+
+    pipeline = models.CharField(max_length=20, choices=PIPELINE_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    iniciado_em = models.DateTimeField()
+    duracao_ms = models.FloatField(default=0)
+    total_falhas = models.PositiveIntegerField(default=0)
+    # {etapa: {'ms': ..., 'chamadas': ..., 'falhas': ...}}, na ordem de execução
+    etapas = models.JSONField(default=dict)
+    # [{'simbolo', 'etapa', 'ms', 'erro'}], os mais lentos primeiro
+    simbolos = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-iniciado_em']
+        indexes = [
+            models.Index(fields=['pipeline', 'user', '-iniciado_em'], name='execucao_recentes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_pipeline_display()} {self.iniciado_em:%d/%m %H:%M} ({self.duracao_ms / 1000:.1f}s)"
+
+    NOMES_ETAPAS = {
+        'simbolos': 'Montagem dos símbolos',
+        'cotacoes': 'Cotações (lote)',
+        'coleta': 'Coleta paralela',
+        'info': 'Indicadores (.info)',
+        'historico': 'Histórico e dividendos',
+        'calculo': 'Cálculo dos scores',
+        'gravacao': 'Gravação no banco',
+        'download': 'Download',
+        'parse': 'Parse (read_html)',
+        'limpeza': 'Limpeza',
+        'carregar': 'Leitura do snapshot',
+        'filtro': 'Filtro',
+    }
+
+    def lista_etapas(self):
+        """ Etapas na ordem de execução, com nome legível e média por chamada """
+        return [
+            {
+                'nome': self.NOMES_ETAPAS.get(etapa, etapa), **dados,
+                'media_ms': dados.get('ms_chamadas', 0) / dados['chamadas'] if dados.get('chamadas') else None,
+            }
+            for etapa, dados in self.etapas.items()
+        ]
+
+# ==========================================
+# 9. RADAR DE MERCADO (Snapshot do Fundamentus)
+# ==========================================
+class SnapshotScreener(models.Model):
+    gerado_em = models.DateTimeField(help_text="Quando a tabela foi baixada e processada")
+    verificado_em = models.DateTimeField(help_text="Última vez que o HTML foi conferido")
+    hash_conteudo = models.CharField(max_length=64)
+    total_papeis = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-gerado_em']
+
+    def __str__(self):
+        return f"Screener {self.gerado_em:%d/%m %H:%M} ({self.total_papeis} papéis)"
+
+class PapelScreener(models.Model):
+    snapshot = models.ForeignKey(SnapshotScreener, on_delete=models.CASCADE, related_name='papeis')
+    papel = models.CharField(max_length=12)
+    cotacao = models.FloatField(null=True)
+    pl = models.FloatField(null=True)
+    pvp = models.FloatField(null=True)
+    psr = models.FloatField(null=True)
+    dy = models.FloatField(null=True)
+    p_ativo = models.FloatField(null=True)
+    p_cap_giro = models.FloatField(null=True)
+    p_ebit = models.FloatField(null=True)
+    p_ativ_circ_liq = models.FloatField(null=True)
+    ev_ebit = models.FloatField(null=True)
+    ev_ebitda = models.FloatField(null=True)
+    mrg_ebit = models.FloatField(null=True)
+    mrg_liq = models.FloatField(null=True)
+    liq_corr = models.FloatField(null=True)
+    roic = models.FloatField(null=True)
+    roe = models.FloatField(null=True)
+    liq_2meses = models.FloatField(null=True)
+    patrim_liq = models.FloatField(null=True)
+    div_brut_patrim = models.FloatField(null=True)
+    cresc_rec_5a = models.FloatField(null=True)
+
+    def __str__(self):
+        return self.papel
+
+class PresetScreener(models.Model):
+    """ Filtro salvo pelo usuário para o Radar (critérios declarativos em JSON) """
+    ORDENACAO_CHOICES = [
+        ('dy', 'Dividend Yield'),
+        ('roe', 'ROE'),
+        ('roic', 'ROIC'),
+        ('liq_2meses', 'Liquidez'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    nome = models.CharField(max_length=50)
+    criterios = models.JSONField(default=list)
+    ordenar_por = models.CharField(max_length=20, choices=ORDENACAO_CHOICES, default='dy')
+    limite = models.PositiveSmallIntegerField(default=20)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+# ==========================================
+# 10. SAÚDE FINANCEIRA (Snapshot por usuário)
+# ==========================================
+class DiagnosticoFinanceiro(models.Model):
+    """
+    Último diagnóstico calculado. Os signals marcam como inválido (e sobem a
+    versão) quando algum dado de entrada muda; a próxima leitura recalcula.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='diagnostico_financeiro')
+    versao = models.PositiveIntegerField(default=1)
+    valido = models.BooleanField(default=False)
+    data_referencia = models.DateField(null=True, blank=True, help_text="Dia em que foi calculado (janela de 30 dias)")
+    score = models.IntegerField(default=0)
+    taxa_poupanca = models.FloatField(default=0)
+    total_atrasado = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    uso_cartao = models.FloatField(default=0)
+    recomendacoes = models.JSONField(default=list)
+    gerado_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Diagnóstico de {self.user} (v{self.versao})"
+
+    @property
+    def etag(self):
+        return f'"saude-{self.user_id}-{self.versao}-{self.data_referencia:%Y%m%d}"'
+
+    def como_dict(self):
+        return {
+            'score': self.score,
+            'taxa_poupanca': self.taxa_poupanca,
+            'total_atrasado': self.total_atrasado,
+            'uso_cartao': self.uso_cartao,
+            'recomendacoes': self.recomendacoes,
+        }
+
+class VersaoWidget(models.Model):
+    """
+    Versão de cada widget do dashboard por usuário (core/painel_logic.py).
+    Entra na chave do fragmento em cache; os signals sobem a versão na mesma
+    transação da escrita, e todos os processos enxergam a mudança na hora.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='versoes_widget')
+    widget = models.CharField(max_length=20)
+    versao = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'widget'], name='versao_widget_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.widget} de {self.user} (v{self.versao})"
+
+# ==========================================
+# 11. HISTÓRICO DE MERCADO (Séries locais)
+# ==========================================
+class SerieHistorica(models.Model):
+    """
+    Controle da série local de um símbolo: até onde os fechamentos e
+    dividendos já foram baixados. A atualização só busca o que falta.
+    """
+    simbolo = models.CharField(max_length=20, unique=True)
+    inicio = models.DateField(null=True, blank=True, help_text="Primeiro dia coberto pela série")
+    fim = models.DateField(null=True, blank=True, help_text="Último pregão gravado")
+    atualizado_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.simbolo} ({self.inicio} a {self.fim})"
+
+class PrecoHistorico(models.Model):
+    simbolo = models.CharField(max_length=20)
+    data = models.DateField()
+    fechamento = models.FloatField()
+
+    class Meta:
+        ordering = ['simbolo', 'data']
+        constraints = [
+            models.UniqueConstraint(fields=['simbolo', 'data'], name='preco_historico_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.simbolo} {self.data}: {self.fechamento}"
+
+class DividendoHistorico(models.Model):
+    simbolo = models.CharField(max_length=20)
+    data = models.DateField(help_text="Data ex")
+    valor = models.FloatField(help_text="Valor por ação/cota")
+
+    class Meta:
+        ordering = ['simbolo', 'data']
+        constraints = [
+            models.UniqueConstraint(fields=['simbolo', 'data'], name='dividendo_historico_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.simbolo} {self.data}: {self.valor}"
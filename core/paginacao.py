@@ -0,0 +1,58 @@
+"""
+Paginação por cursor (keyset) em (campo, id).
+
+Em vez de OFFSET, cada página continua de onde a anterior parou:
+WHERE (campo, id) < (último_campo, último_id). O custo de qualquer página é
+o mesmo da primeira e o índice (user, campo) atende a consulta.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+TAMANHO_PAGINA = 25
+TAMANHO_MAXIMO = 100
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(valor, pk):
+    bruto = json.dumps([valor.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, campo):
+    """ Cursor -> (valor já convertido para o tipo do campo, pk) """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, pk = json.loads(bruto)
+        return campo.to_python(valor), int(pk)
+    except Exception as e:
+        raise CursorInvalido(f"Cursor inválido: {cursor!r}") from e
+
+
+def paginar_keyset(queryset, campo, cursor=None, tamanho=TAMANHO_PAGINA, decrescente=False):
+    """
+    Uma página de `queryset` ordenado por (campo, id).
+    Retorna (itens, próximo_cursor); próximo_cursor é None na última página.
+    """
+    tamanho = max(1, min(int(tamanho), TAMANHO_MAXIMO))
+    sinal = '-' if decrescente else ''
+    queryset = queryset.order_by(f'{sinal}{campo}', f'{sinal}pk')
+
+    if cursor:
+        valor, pk = decodificar_cursor(cursor, queryset.model._meta.get_field(campo))
+        comparacao = 'lt' if decrescente else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{campo}__{comparacao}': valor}) | Q(**{campo: valor, f'pk__{comparacao}': pk})
+        )
+
+    # Um a mais para saber se existe próxima página
+    itens = list(queryset[:tamanho + 1])
+    if len(itens) <= tamanho:
+        return itens, None
+    itens = itens[:tamanho]
+    ultimo = itens[-1]
+    return itens, codificar_cursor(getattr(ultimo, campo), ultimo.pk)
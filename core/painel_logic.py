@@ -0,0 +1,157 @@
+"""
+Cache dos widgets do dashboard.
+
+Cada widget (caixa, cartões, aportes, compromissos, notas, desafio, contas)
+é um fragmento do dashboard.html guardado com {% cache %}, por usuário. A
+chave leva a versão do widget (VersaoWidget, no banco), que os signals dos
+modelos donos do dado sobem na mesma transação da escrita (ver signals.py).
+Como a versão é lida do banco, um fragmento desatualizado nunca é servido,
+mesmo com o cache de fragmentos local a cada processo. Um widget sem mudança
+sai pronto do cache; só os desatualizados são renderizados.
+
+Os dados ficam em PainelDashboard e são buscados sob demanda: widget servido
+do cache não dispara nenhuma query.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import cached_property
+
+from django.conf import settings
+from django.db.models import Sum, F, Q
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Compromisso, Nota, CartaoCredito, OperacaoInvestimento, Desafio, ContaPagar, VersaoWidget
+from .resumo_logic import totais_caixa
+
+WIDGETS = ('caixa', 'cartoes', 'aportes', 'compromissos', 'notas', 'desafio', 'contas')
+
+CONFIG_PADRAO = {
+    'ALIAS': 'default',
+    'TTL': 6 * 60 * 60,
+    # Compromissos saem da lista quando passa a hora: o fragmento vale pouco
+    'TTL_AGENDA': 5 * 60,
+}
+
+
+def configuracao():
+    return {**CONFIG_PADRAO, **getattr(settings, 'PAINEL_CACHE', {})}
+
+
+def criar_versoes(user_id, widgets=WIDGETS):
+    """
+    Linhas de versão do usuário (o signal de User cria no cadastro). Começam
+    de um valor nunca usado: um pk reaproveitado (usuário apagado) não
+    encontra os fragmentos do dono anterior.
+    """
+    inicial = time.time_ns()
+    VersaoWidget.objects.bulk_create(
+        [VersaoWidget(user_id=user_id, widget=widget, versao=inicial) for widget in widgets],
+        ignore_conflicts=True,
+    )
+
+
+def versoes(user_id):
+    """ {widget: versão} do usuário numa query (cria as que faltam, p.ex. usuários antigos) """
+    atuais = dict(VersaoWidget.objects.filter(user_id=user_id).values_list('widget', 'versao'))
+    faltando = [widget for widget in WIDGETS if widget not in atuais]
+    if faltando:
+        criar_versoes(user_id, faltando)
+        atuais = dict(VersaoWidget.objects.filter(user_id=user_id).values_list('widget', 'versao'))
+    return atuais
+
+
+def invalidar_widgets(user_id, *widgets):
+    """ Sobe a versão dos widgets do usuário (todos, se nenhum for informado) """
+    if user_id is None:
+        return 0
+    return VersaoWidget.objects.filter(
+        user_id=user_id, widget__in=widgets or WIDGETS
+    ).update(versao=F('versao') + 1)
+
+
+def cartoes_com_fatura(user, mes, ano):
+    """
+    Cartões do usuário anotados com a fatura do mês/ano e o limite tomado,
+    numa única query agrupada sobre o livro de parcelas (ParcelaCartao).
+    """
+    competencia = date(ano, mes, 1)
+    return CartaoCredito.objects.filter(user=user).annotate(
+        fatura=Coalesce(Sum('lancamentos__valor', filter=Q(lancamentos__competencia=competencia)), Decimal('0')),
+        limite_tomado=Coalesce(Sum('lancamentos__valor'), Decimal('0')),
+    ).order_by('pk')
+
+
+class PainelDashboard:
+    """ Versões, chaves de tempo e os dados de cada widget (calculados no primeiro acesso) """
+
+    def __init__(self, user, agora=None):
+        self.user = user
+        self.agora = agora or timezone.now()
+        self.versoes = versoes(user.pk)
+        config = configuracao()
+        self.alias = config['ALIAS']
+        self.ttl = config['TTL']
+        self.ttl_agenda = config['TTL_AGENDA']
+        # Partes da chave que dependem do calendário (fatura do mês, vencimentos do dia...)
+        self.periodo = self.agora.strftime('%Y-%m')
+        self.dia = self.agora.strftime('%Y-%m-%d')
+
+    @cached_property
+    def cartoes(self):
+        """ Gráfico das faturas do mês (a cor segue o uso do limite) e o total delas """
+        grafico = {'labels': [], 'valores': [], 'cores': [], 'total': 0}
+        for cartao in cartoes_com_fatura(self.user, self.agora.month, self.agora.year):
+            grafico['total'] += cartao.fatura
+            grafico['labels'].append(cartao.nome)
+            grafico['valores'].append(float(cartao.fatura))
+
+            uso = (cartao.limite_tomado / cartao.limite) * 100 if cartao.limite > 0 else 0
+            if uso > 80:
+                grafico['cores'].append('#e74a3b')  # Vermelho
+            elif uso > 50:
+                grafico['cores'].append('#f6c23e')  # Amarelo
+            else:
+                grafico['cores'].append('#4e73df')  # Azul
+        return grafico
+
+    @cached_property
+    def caixa(self):
+        """ Receitas e despesas do rollup; as despesas incluem as faturas dos cartões """
+        receitas, despesas_caixa = totais_caixa(self.user)
+        despesas = despesas_caixa + self.cartoes['total']
+        return {'receitas': receitas, 'despesas': despesas, 'saldo': receitas - despesas}
+
+    @cached_property
+    def aportes(self):
+        """ Compras dos últimos 6 meses, agrupadas por mês no banco """
+        por_mes = OperacaoInvestimento.objects.filter(
+            ativo__user=self.user,
+            tipo='C',
+            data__gte=self.agora.date() - timedelta(days=180),
+        ).annotate(mes=TruncMonth('data')).values('mes').annotate(
+            total=Sum(F('quantidade') * F('preco_unitario') + F('taxas'))
+        ).order_by('mes')
+        return {
+            'labels': [a['mes'].strftime("%b/%y") for a in por_mes],
+            'valores': [float(a['total']) for a in por_mes],
+        }
+
+    @cached_property
+    def compromissos(self):
+        return list(Compromisso.objects.filter(
+            user=self.user, data_hora__gte=self.agora, concluido=False
+        ).order_by('data_hora')[:3])
+
+    @cached_property
+    def notas(self):
+        return list(Nota.objects.filter(user=self.user).order_by('-atualizado_em')[:2])
+
+    @cached_property
+    def desafio(self):
+        return Desafio.objects.filter(user=self.user, concluido=False).com_totais().first()
+
+    @cached_property
+    def contas(self):
+        return list(ContaPagar.objects.filter(user=self.user, pago=False).order_by('data_vencimento'))
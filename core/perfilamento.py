@@ -0,0 +1,239 @@
+"""
+Perfilamento por requisição (opt-in).
+
+Com settings.PERFILAMENTO['ATIVO'] o PerfilamentoMiddleware mede, em cada
+requisição amostrada: tempo total, queries (quantidade, tempo e repetidas)
+e tempo de renderização dos templates. O resultado sai de três formas:
+
+  - header Server-Timing (aparece na aba Network do navegador);
+  - uma linha de log estruturada (JSON) no logger 'core.perfilamento';
+  - histogramas agregados por view em /metrics (formato Prometheus).
+
+Desligado, o middleware nem entra na cadeia (MiddlewareNotUsed). Com
+AMOSTRAGEM < 1, as requisições fora da amostra custam um random().
+"""
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as backend_django
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {
+    'ATIVO': False,
+    'AMOSTRAGEM': 1.0,        # fração das requisições medidas (0 a 1)
+    'LIMITE_REPETIDAS': 2,    # mesma query (SQL + parâmetros) a partir de N vezes = duplicada
+    'METRICAS_TOKEN': '',     # /metrics para scrapers: header "Authorization: Bearer <token>"
+}
+
+# Limites (ms) dos baldes dos histogramas, como no Prometheus ('le')
+BALDES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_coleta_atual = contextvars.ContextVar('coleta_perfilamento', default=None)
+
+
+def configuracao():
+    return {**CONFIG_PADRAO, **getattr(settings, 'PERFILAMENTO', {})}
+
+
+class Coleta:
+    """ O que foi medido numa requisição """
+
+    def __init__(self):
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.db_em_template_ms = 0.0
+        self.template_ms = 0.0
+        self.renderizando = 0
+        self.por_sql = {}
+
+    def registrar_sql(self, sql, params, duracao_ms):
+        self.consultas += 1
+        self.db_ms += duracao_ms
+        if self.renderizando:
+            self.db_em_template_ms += duracao_ms
+        try:
+            chave = (sql, repr(params))
+        except Exception:
+            chave = (sql, None)
+        self.por_sql[chave] = self.por_sql.get(chave, 0) + 1
+
+    def duplicadas(self, limite):
+        """ [(sql, vezes)] das queries idênticas repetidas, mais repetidas primeiro """
+        repetidas = [(sql, vezes) for (sql, _), vezes in self.por_sql.items() if vezes >= limite]
+        return sorted(repetidas, key=lambda item: -item[1])
+
+
+def _medir_sql(coleta):
+    def wrapper(execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            coleta.registrar_sql(sql, params, (time.perf_counter() - inicio) * 1000)
+    return wrapper
+
+
+# --- Templates: o render do backend (um por render()/render_to_string) ---
+
+_render_original = backend_django.Template.render
+
+
+def _render_medido(self, context=None, request=None):
+    coleta = _coleta_atual.get()
+    if coleta is None:
+        return _render_original(self, context, request)
+    coleta.renderizando += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context, request)
+    finally:
+        coleta.renderizando -= 1
+        if not coleta.renderizando:
+            coleta.template_ms += (time.perf_counter() - inicio) * 1000
+
+
+def _instalar_medicao_templates():
+    if backend_django.Template.render is not _render_medido:
+        backend_django.Template.render = _render_medido
+
+
+# --- Agregado por view (em processo) ---
+
+class Metricas:
+    """ Contagem, somas e histograma do tempo total por view, protegidos por lock """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = {}
+
+    def registrar(self, view, total_ms, db_ms, consultas, template_ms, duplicadas):
+        with self._lock:
+            dados = self.views.get(view)
+            if dados is None:
+                dados = self.views[view] = {
+                    'baldes': [0] * (len(BALDES_MS) + 1), 'quantidade': 0, 'total_ms': 0.0,
+                    'db_ms': 0.0, 'consultas': 0, 'template_ms': 0.0, 'duplicadas': 0,
+                }
+            dados['baldes'][bisect_left(BALDES_MS, total_ms)] += 1
+            dados['quantidade'] += 1
+            dados['total_ms'] += total_ms
+            dados['db_ms'] += db_ms
+            dados['consultas'] += consultas
+            dados['template_ms'] += template_ms
+            dados['duplicadas'] += duplicadas
+
+    def copia(self):
+        with self._lock:
+            return {view: {**dados, 'baldes': list(dados['baldes'])} for view, dados in self.views.items()}
+
+    def limpar(self):
+        with self._lock:
+            self.views.clear()
+
+
+metricas = Metricas()
+
+
+def texto_prometheus(dados=None):
+    """ Exposição em texto do Prometheus (histograma de latência + somas por view) """
+    dados = metricas.copia() if dados is None else dados
+    linhas = [
+        '# HELP agenda_requisicao_ms Tempo total da requisição por view (ms).',
+        '# TYPE agenda_requisicao_ms histogram',
+    ]
+    for view, d in sorted(dados.items()):
+        acumulado = 0
+        for limite, quantidade in zip(BALDES_MS, d['baldes']):
+            acumulado += quantidade
+            linhas.append(f'agenda_requisicao_ms_bucket{{view="{view}",le="{limite}"}} {acumulado}')
+        linhas.append(f'agenda_requisicao_ms_bucket{{view="{view}",le="+Inf"}} {d["quantidade"]}')
+        linhas.append(f'agenda_requisicao_ms_sum{{view="{view}"}} {d["total_ms"]:.3f}')
+        linhas.append(f'agenda_requisicao_ms_count{{view="{view}"}} {d["quantidade"]}')
+    for nome, campo, descricao in (
+        ('agenda_db_ms_total', 'db_ms', 'Tempo em SQL (ms).'),
+        ('agenda_db_consultas_total', 'consultas', 'Queries executadas.'),
+        ('agenda_db_duplicadas_total', 'duplicadas', 'Queries idênticas repetidas na mesma requisição.'),
+        ('agenda_template_ms_total', 'template_ms', 'Tempo renderizando templates (ms).'),
+    ):
+        linhas += [f'# HELP {nome} {descricao}', f'# TYPE {nome} counter']
+        for view, d in sorted(dados.items()):
+            valor = d[campo]
+            linhas.append(f'{nome}{{view="{view}"}} {valor:.3f}' if isinstance(valor, float) else f'{nome}{{view="{view}"}} {valor}')
+    return '\n'.join(linhas) + '\n'
+
+
+def pode_ver_metricas(request):
+    token = configuracao()['METRICAS_TOKEN']
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+# --- Middleware ---
+
+class PerfilamentoMiddleware:
+    def __init__(self, get_response):
+        config = configuracao()
+        if not config['ATIVO']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.amostragem = float(config['AMOSTRAGEM'])
+        self.limite_repetidas = int(config['LIMITE_REPETIDAS'])
+        _instalar_medicao_templates()
+
+    def __call__(self, request):
+        if self.amostragem < 1 and random.random() >= self.amostragem:
+            return self.get_response(request)
+
+        coleta = Coleta()
+        marcador = _coleta_atual.set(coleta)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(_medir_sql(coleta)))
+                response = self.get_response(request)
+        finally:
+            _coleta_atual.reset(marcador)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'sem_rota'
+        if view == 'metricas':
+            return response
+
+        # Python = total - SQL - template (o SQL disparado pelo template conta só no SQL)
+        template_ms = max(coleta.template_ms - coleta.db_em_template_ms, 0.0)
+        app_ms = max(total_ms - coleta.db_ms - template_ms, 0.0)
+        duplicadas = coleta.duplicadas(self.limite_repetidas)
+        total_duplicadas = sum(vezes - 1 for _, vezes in duplicadas)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={coleta.db_ms:.1f};desc="{coleta.consultas} queries"',
+            f'tpl;dur={template_ms:.1f};desc="templates"',
+            f'app;dur={app_ms:.1f};desc="python"',
+            f'total;dur={total_ms:.1f}',
+        ])
+        metricas.registrar(view, total_ms, coleta.db_ms, coleta.consultas, template_ms, total_duplicadas)
+
+        registro = {
+            'view': view, 'metodo': request.method, 'caminho': request.path, 'status': response.status_code,
+            'total_ms': round(total_ms, 2), 'db_ms': round(coleta.db_ms, 2), 'consultas': coleta.consultas,
+            'template_ms': round(template_ms, 2), 'app_ms': round(app_ms, 2), 'duplicadas': total_duplicadas,
+        }
+        if duplicadas:
+            registro['sql_duplicado'] = [{'sql': sql[:300], 'vezes': vezes} for sql, vezes in duplicadas[:5]]
+            logger.warning(json.dumps(registro, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+        return response
@@ -0,0 +1,158 @@
+"""
+Posição dos ativos (quantidade, custo, preço médio e lucro realizado).
+
+Cada operação só mexe nos acumuladores do seu ativo pelo próprio delta:
+criar soma, excluir subtrai, editar subtrai o valor antigo e soma o novo.
+O replay completo das operações (`recalcular_ativo`) fica como verificação
+(settings.POSICAO_VERIFICAR_REPLAY) e o `manage.py recalcular_posicoes`
+reconstrói a base inteira com uma única query agrupada.
+"""
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, F, Q, DecimalField
+from django.db.models.functions import Coalesce
+
+from .models import Ativo, OperacaoInvestimento
+from .health_logic import invalidar_diagnostico
+
+logger = logging.getLogger(__name__)
+
+ACUMULADORES = ['quantidade_comprada', 'custo_compras', 'quantidade_vendida', 'receita_vendas']
+CAMPOS_POSICAO = ACUMULADORES + ['quantidade_atual', 'preco_medio']
+
+ZERO = Decimal('0')
+_DECIMAL = DecimalField(max_digits=24, decimal_places=8)
+
+
+def componentes_operacao(operacao):
+    """ Quanto a operação soma em cada acumulador (dividendos não mexem na posição) """
+    if operacao.tipo == 'C':
+        return {
+            'quantidade_comprada': operacao.quantidade,
+            'custo_compras': operacao.quantidade * operacao.preco_unitario + operacao.taxas,
+        }
+    if operacao.tipo == 'V':
+        return {
+            'quantidade_vendida': operacao.quantidade,
+            'receita_vendas': operacao.quantidade * operacao.preco_unitario - operacao.taxas,
+        }
+    return {}
+
+
+def derivar_posicao(ativo):
+    """ Quantidade atual e preço médio a partir dos acumuladores """
+    ativo.quantidade_atual = ativo.quantidade_comprada - ativo.quantidade_vendida
+    if ativo.quantidade_atual > 0 and ativo.quantidade_comprada:
+        # Preço Médio Simples = Total Gasto / Total de Cotas Compradas
+        ativo.preco_medio = ativo.custo_compras / ativo.quantidade_comprada
+    else:
+        ativo.preco_medio = ZERO
+    return ativo
+
+
+def aplicar_operacao(operacao, sinal=1, ativo_id=None):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) a operação da posição do ativo.
+    `ativo_id` permite desfazer uma operação cujo ativo foi trocado na edição.
+    """
+    deltas = componentes_operacao(operacao)
+    if not deltas:
+        return None
+
+    with transaction.atomic():
+        ativo = Ativo.objects.select_for_update().filter(pk=ativo_id or operacao.ativo_id).first()
+        if ativo is None:
+            # Ativo sendo excluído (CASCADE): não há posição a manter
+            return None
+        for campo, delta in deltas.items():
+            setattr(ativo, campo, getattr(ativo, campo) + sinal * delta)
+        derivar_posicao(ativo)
+        ativo.save(update_fields=CAMPOS_POSICAO)
+
+        if getattr(settings, 'POSICAO_VERIFICAR_REPLAY', False):
+            conferir_posicao(ativo)
+    return ativo
+
+
+# --- REPLAY COMPLETO (fallback / verificação) ---
+
+def _somas_operacoes():
+    return {
+        'quantidade_comprada': Coalesce(Sum('quantidade', filter=Q(tipo='C')), ZERO, output_field=_DECIMAL),
+        'custo_compras': Coalesce(
+            Sum(F('quantidade') * F('preco_unitario') + F('taxas'), filter=Q(tipo='C'), output_field=_DECIMAL),
+            ZERO, output_field=_DECIMAL,
+        ),
+        'quantidade_vendida': Coalesce(Sum('quantidade', filter=Q(tipo='V')), ZERO, output_field=_DECIMAL),
+        'receita_vendas': Coalesce(
+            Sum(F('quantidade') * F('preco_unitario') - F('taxas'), filter=Q(tipo='V'), output_field=_DECIMAL),
+            ZERO, output_field=_DECIMAL,
+        ),
+    }
+
+
+def calcular_por_replay(ativo):
+    """ Acumuladores refeitos a partir de todas as operações do ativo (uma query) """
+    return OperacaoInvestimento.objects.filter(ativo=ativo).aggregate(**_somas_operacoes())
+
+
+def recalcular_ativo(ativo):
+    """ Recalcula a posição do zero, a partir de todas as operações """
+    for campo, valor in calcular_por_replay(ativo).items():
+        setattr(ativo, campo, valor)
+    derivar_posicao(ativo)
+    ativo.save(update_fields=CAMPOS_POSICAO)
+    return ativo
+
+
+def conferir_posicao(ativo, corrigir=True):
+    """
+    Compara os acumuladores incrementais com o replay. Se divergirem,
+    registra o aviso e (por padrão) grava o valor do replay.
+    Retorna o dict das diferenças {campo: (incremental, replay)}.
+    """
+    replay = calcular_por_replay(ativo)
+    diferencas = {
+        campo: (getattr(ativo, campo), valor)
+        for campo, valor in replay.items()
+        if abs(Decimal(getattr(ativo, campo)) - valor) > Decimal('0.000001')
+    }
+    if diferencas:
+        logger.warning("Posição divergente em %s (pk=%s): %s", ativo.ticker, ativo.pk, diferencas)
+        if corrigir:
+            recalcular_ativo(ativo)
+    return diferencas
+
+
+# --- RECONSTRUÇÃO EM LOTE ---
+
+def reconstruir_posicoes(queryset=None, batch_size=500):
+    """
+    Recalcula a posição de todos os ativos com uma única query agrupada sobre
+    as operações e grava tudo com bulk_update. Retorna o total de ativos.
+    """
+    ativos = queryset if queryset is not None else Ativo.objects.all()
+    somas = {
+        linha.pop('ativo'): linha
+        for linha in OperacaoInvestimento.objects.filter(ativo__in=ativos)
+        .values('ativo').order_by().annotate(**_somas_operacoes())
+    }
+
+    vazio = dict.fromkeys(ACUMULADORES, ZERO)
+    total = 0
+    lote = []
+    for ativo in ativos.order_by('pk').iterator(chunk_size=batch_size):
+        for campo, valor in somas.get(ativo.pk, vazio).items():
+            setattr(ativo, campo, valor)
+        lote.append(derivar_posicao(ativo))
+        if len(lote) >= batch_size:
+            Ativo.objects.bulk_update(lote, CAMPOS_POSICAO)
+            total += len(lote)
+            lote = []
+    Ativo.objects.bulk_update(lote, CAMPOS_POSICAO)
+    # bulk_update não dispara signals
+    invalidar_diagnostico(user__ativo__in=ativos)
+    return total + len(lote)
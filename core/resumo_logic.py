@@ -0,0 +1,128 @@
+"""
+Rollup mensal do caixa (ResumoMensal).
+
+Cada transação só mexe na linha (usuário, mês, tipo, categoria) dela:
+criar soma, excluir subtrai, editar subtrai a versão antiga e soma a nova.
+Inserções em lote (bulk_create não dispara signals) usam `somar_transacoes`;
+o `manage.py reconstruir_resumos` refaz tudo com uma única query agrupada.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, Count, F, Q
+from django.db.models.functions import TruncMonth
+
+from .models import Transacao, ResumoMensal
+
+ZERO = Decimal('0')
+
+
+def primeiro_dia(data):
+    # Aceita a data ainda como texto (instância criada com data='2025-01-10')
+    return Transacao._meta.get_field('data').to_python(data).replace(day=1)
+
+
+def intervalo_mes(mes, ano):
+    """ (primeiro dia do mês, primeiro dia do mês seguinte) """
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def _aplicar_deltas(deltas):
+    """ deltas: {(user_id, mes, tipo, categoria): (valor, quantidade)} """
+    with transaction.atomic():
+        for (user_id, mes, tipo, categoria), (valor, quantidade) in deltas.items():
+            if not valor and not quantidade:
+                continue
+            chave = {'user_id': user_id, 'mes': mes, 'tipo': tipo, 'categoria': categoria}
+            atualizadas = ResumoMensal.objects.filter(**chave).update(
+                total=F('total') + valor, quantidade=F('quantidade') + quantidade
+            )
+            if not atualizadas and quantidade > 0:
+                # Só soma cria linha: subtrair de um resumo inexistente (ex.: usuário
+                # sendo excluído em CASCADE) não tem o que desfazer
+                ResumoMensal.objects.get_or_create(**chave)
+                ResumoMensal.objects.filter(**chave).update(
+                    total=F('total') + valor, quantidade=F('quantidade') + quantidade
+                )
+
+
+def aplicar_transacao(transacao, sinal=1):
+    """ Soma (sinal=1) ou subtrai (sinal=-1) a transação do rollup do mês dela """
+    chave = (transacao.user_id, primeiro_dia(transacao.data), transacao.tipo, transacao.categoria)
+    _aplicar_deltas({chave: (sinal * Decimal(str(transacao.valor)), sinal)})
+
+
+def somar_transacoes(transacoes):
+    """ Soma ao rollup as transações inseridas em lote (um UPDATE por grupo) """
+    deltas = defaultdict(lambda: (ZERO, 0))
+    for t in transacoes:
+        chave = (t.user_id, primeiro_dia(t.data), t.tipo, t.categoria)
+        valor, quantidade = deltas[chave]
+        deltas[chave] = (valor + Decimal(str(t.valor)), quantidade + 1)
+    _aplicar_deltas(deltas)
+
+
+def reconstruir_resumos(users=None, batch_size=1000):
+    """
+    Apaga e refaz o rollup a partir de todas as transações (uma query
+    agrupada). `users` restringe a alguns usuários. Retorna o total de linhas.
+    """
+    transacoes = Transacao.objects.all()
+    resumos = ResumoMensal.objects.all()
+    if users is not None:
+        transacoes = transacoes.filter(user__in=users)
+        resumos = resumos.filter(user__in=users)
+
+    grupos = (
+        transacoes.annotate(mes=TruncMonth('data'))
+        .values('user_id', 'mes', 'tipo', 'categoria').order_by()
+        .annotate(total=Sum('valor'), quantidade=Count('id'))
+    )
+    with transaction.atomic():
+        resumos.delete()
+        criados = ResumoMensal.objects.bulk_create([ResumoMensal(**g) for g in grupos], batch_size=batch_size)
+    return len(criados)
+
+
+# --- LEITURAS ---
+
+def totais_caixa(user, desde=None):
+    """ Receitas e despesas do usuário (a partir do mês de `desde`, se informado) """
+    resumos = ResumoMensal.objects.filter(user=user)
+    if desde is not None:
+        resumos = resumos.filter(mes__gte=primeiro_dia(desde))
+    totais = resumos.aggregate(
+        receitas=Sum('total', filter=Q(tipo='receita')),
+        despesas=Sum('total', filter=Q(tipo='despesa')),
+    )
+    return totais['receitas'] or ZERO, totais['despesas'] or ZERO
+
+
+def totais_desde(user, inicio):
+    """
+    Receitas e despesas com data >= inicio. Os meses inteiros saem do rollup;
+    só os dias do mês de `inicio` antes dele são lidos da tabela de transações
+    e descontados.
+    """
+    receitas, despesas = totais_caixa(user, desde=inicio)
+    # No dia 1 o intervalo é vazio; a query roda igual (número de queries fixo)
+    antes = Transacao.objects.filter(user=user, data__gte=primeiro_dia(inicio), data__lt=inicio).aggregate(
+        receitas=Sum('valor', filter=Q(tipo='receita')),
+        despesas=Sum('valor', filter=Q(tipo='despesa')),
+    )
+    return receitas - (antes['receitas'] or ZERO), despesas - (antes['despesas'] or ZERO)
+
+
+def resumo_por_categoria(user, mes):
+    """ [{tipo, categoria, nome, total, quantidade}] do mês, maiores primeiro """
+    nomes = dict(Transacao.CATEGORIA_CHOICES)
+    linhas = ResumoMensal.objects.filter(user=user, mes=primeiro_dia(mes), quantidade__gt=0).order_by('tipo', '-total')
+    return [
+        {'tipo': r.tipo, 'categoria': r.categoria, 'nome': nomes.get(r.categoria, r.categoria),
+         'total': r.total, 'quantidade': r.quantidade}
+        for r in linhas
+    ]
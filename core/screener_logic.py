@@ -0,0 +1,246 @@
+"""
+Snapshot do screener do Fundamentus.
+
+O `manage.py refresh_screener` baixa o resultado.php, faz o parse uma única
+vez e grava a tabela tipada (PapelScreener) junto com o hash do HTML. O
+radar_mercado só lê o snapshot e aplica os filtros, sem tocar na rede.
+As versões `*_async` servem a view async: o download usa o cliente HTTP
+assíncrono e o ORM roda via sync_to_async.
+
+Os filtros são declarativos: uma lista de critérios
+{'campo': 'pl', 'op': 'lte', 'valor': 15} vira uma única máscara booleana.
+"""
+import asyncio
+import hashlib
+import operator
+import weakref
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SnapshotScreener, PapelScreener
+from .cache_mercado import get_cache_mercado
+from .medicao import Medidor, etapa
+from .http_async import sessao_http
+
+URL_FUNDAMENTUS = 'https://www.fundamentus.com.br/resultado.php'
+
+# Coluna do Fundamentus -> campo do PapelScreener
+COLUNAS = {
+    'Papel': 'papel',
+    'Cotação': 'cotacao',
+    'P/L': 'pl',
+    'P/VP': 'pvp',
+    'PSR': 'psr',
+    'Div.Yield': 'dy',
+    'P/Ativo': 'p_ativo',
+    'P/Cap.Giro': 'p_cap_giro',
+    'P/EBIT': 'p_ebit',
+    'P/Ativ Circ.Liq': 'p_ativ_circ_liq',
+    'EV/EBIT': 'ev_ebit',
+    'EV/EBITDA': 'ev_ebitda',
+    'Mrg Ebit': 'mrg_ebit',
+    'Mrg. Líq.': 'mrg_liq',
+    'Liq. Corr.': 'liq_corr',
+    'ROIC': 'roic',
+    'ROE': 'roe',
+    'Liq.2meses': 'liq_2meses',
+    'Patrim. Líq': 'patrim_liq',
+    'Dív.Brut/ Patrim.': 'div_brut_patrim',
+    'Cresc. Rec.5a': 'cresc_rec_5a',
+}
+
+CAMPOS_PERCENTUAIS = ['dy', 'mrg_ebit', 'mrg_liq', 'roic', 'roe', 'cresc_rec_5a']
+CAMPOS_VALORES = ['liq_2meses', 'patrim_liq']
+
+
+# --- CONFIGURAÇÃO DE DISFARCE (O Fundamentus bloqueia o user-agent padrão) ---
+def get_headers():
+    return {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    }
+
+
+def baixar_html_fundamentus():
+    r = requests.get(URL_FUNDAMENTUS, headers=get_headers())
+    r.raise_for_status()
+    return r.text
+
+
+async def baixar_html_fundamentus_async():
+    resposta = await sessao_http().get(URL_FUNDAMENTUS, headers=get_headers())
+    resposta.raise_for_status()
+    return resposta.text
+
+
+def parse_tabela_fundamentus(html):
+    """ Converte o HTML do resultado.php num DataFrame tipado (campos do PapelScreener) """
+    with etapa('parse'):
+        df = pd.read_html(StringIO(html), decimal=',', thousands='.', attrs={'id': 'resultado'})[0]
+        df = df.rename(columns=COLUNAS)[list(COLUNAS.values())]
+
+    with etapa('limpeza'):
+        return _limpar_tabela(df)
+
+
+def _limpar_tabela(df):
+    # Limpeza vetorizada, todas as colunas de uma vez. Só passa pela regex o
+    # que o read_html não converteu sozinho (tirar o '.' de um float já
+    # convertido multiplicaria o valor por 10).
+    numericas = [c for c in df.columns if c != 'papel']
+    texto = [c for c in numericas if df[c].dtype == object]
+    if texto:
+        df[texto] = df[texto].astype(str).replace(r'[.%]', '', regex=True).replace(',', '.', regex=True)
+    df[numericas] = df[numericas].apply(pd.to_numeric, errors='coerce')
+    df[CAMPOS_PERCENTUAIS] = df[CAMPOS_PERCENTUAIS] / 100
+
+    # Cotações acima de 1000 vêm sem a vírgula decimal
+    df['cotacao'] = df['cotacao'].where(df['cotacao'] <= 1000, df['cotacao'] / 100)
+    return df
+
+
+def atualizar_snapshot(html=None, forcar=False):
+    """
+    Baixa o Fundamentus e grava um novo snapshot se o HTML mudou.
+    Download, parse, limpeza e gravação são cronometrados e o resumo fica
+    num ExecucaoPipeline. Retorna (snapshot, reprocessado).
+    """
+    medidor = Medidor('screener')
+    try:
+        with medidor.ativo():
+            return _atualizar_snapshot(html, forcar, medidor)
+    finally:
+        medidor.salvar()
+
+
+def _atualizar_snapshot(html, forcar, medidor):
+    with medidor.etapa('download'):
+        html = html if html is not None else baixar_html_fundamentus()
+        hash_conteudo = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    agora = timezone.now()
+
+    atual = SnapshotScreener.objects.first()
+    if atual and atual.hash_conteudo == hash_conteudo and not forcar:
+        # Conteúdo idêntico: nem faz o parse
+        SnapshotScreener.objects.filter(pk=atual.pk).update(verificado_em=agora)
+        return atual, False
+
+    df = parse_tabela_fundamentus(html)
+    df = df.astype(object).where(df.notna(), None)
+
+    with medidor.etapa('gravacao'), transaction.atomic():
+        snapshot = SnapshotScreener.objects.create(
+            gerado_em=agora, verificado_em=agora, hash_conteudo=hash_conteudo, total_papeis=len(df)
+        )
+        PapelScreener.objects.bulk_create(
+            [PapelScreener(snapshot=snapshot, **linha) for linha in df.to_dict('records')],
+            batch_size=500,
+        )
+        # Só o snapshot mais recente fica no banco
+        SnapshotScreener.objects.exclude(pk=snapshot.pk).delete()
+
+    return snapshot, True
+
+
+async def atualizar_snapshot_async(forcar=False):
+    """ atualizar_snapshot com o download assíncrono; parse e gravação numa thread """
+    medidor = Medidor('screener')
+    try:
+        with medidor.ativo():
+            with medidor.etapa('download'):
+                html = await baixar_html_fundamentus_async()
+            return await sync_to_async(_atualizar_snapshot)(html, forcar, medidor)
+    finally:
+        await sync_to_async(medidor.salvar)()
+
+
+def carregar_tabela():
+    """
+    DataFrame do snapshot mais recente. Se ainda não houver nenhum, faz a
+    primeira carga ao vivo. O DataFrame fica no cache enquanto o hash não mudar.
+    Retorna (snapshot, df).
+    """
+    snapshot = SnapshotScreener.objects.first()
+    if snapshot is None:
+        snapshot, _ = atualizar_snapshot()
+    return snapshot, ler_tabela(snapshot)
+
+
+# Primeira carga em andamento por event loop: requisições simultâneas esperam o mesmo download
+_primeiras_cargas = weakref.WeakKeyDictionary()
+
+
+async def carregar_tabela_async():
+    """ carregar_tabela para views async. Retorna (snapshot, df). """
+    snapshot = await SnapshotScreener.objects.afirst()
+    if snapshot is None:
+        loop = asyncio.get_running_loop()
+        carga = _primeiras_cargas.get(loop)
+        if carga is None:
+            carga = _primeiras_cargas[loop] = loop.create_task(atualizar_snapshot_async())
+            carga.add_done_callback(lambda _: _primeiras_cargas.pop(loop, None))
+        # shield: um cliente que desiste não cancela o download dos outros
+        snapshot, _ = await asyncio.shield(carga)
+    return snapshot, await sync_to_async(ler_tabela)(snapshot)
+
+
+def ler_tabela(snapshot):
+    """ DataFrame do snapshot; fica no cache enquanto o hash não mudar """
+    def ler_do_banco():
+        campos = list(COLUNAS.values())
+        return pd.DataFrame.from_records(
+            PapelScreener.objects.filter(snapshot=snapshot).values_list(*campos), columns=campos
+        ).astype({c: float for c in campos if c != 'papel'})
+
+    return get_cache_mercado().obter_ou_buscar('screener', snapshot.hash_conteudo, ler_do_banco)
+
+
+# --- MOTOR DE FILTROS ---
+
+OPERADORES = {
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'eq': operator.eq,
+}
+
+CAMPOS_FILTRAVEIS = [c for c in COLUNAS.values() if c != 'papel']
+
+# Graham & Bazin: os filtros clássicos do radar
+CRITERIOS_PADRAO = [
+    {'campo': 'liq_2meses', 'op': 'gt', 'valor': 1000000},
+    {'campo': 'pl', 'op': 'gt', 'valor': 0.01},
+    {'campo': 'pl', 'op': 'lte', 'valor': 15},
+    {'campo': 'pvp', 'op': 'gt', 'valor': 0.01},
+    {'campo': 'pvp', 'op': 'lte', 'valor': 1.5},
+    {'campo': 'dy', 'op': 'gt', 'valor': 0.06},
+    {'campo': 'roe', 'op': 'gt', 'valor': 0.10},
+]
+
+
+def montar_mascara(df, criterios):
+    """ Combina todos os critérios numa única máscara booleana """
+    mascaras = []
+    for criterio in criterios:
+        campo, op = criterio['campo'], criterio['op']
+        if campo not in CAMPOS_FILTRAVEIS or op not in OPERADORES:
+            raise ValueError(f"Critério inválido: {criterio}")
+        mascaras.append(OPERADORES[op](df[campo].to_numpy(), float(criterio['valor'])))
+
+    if not mascaras:
+        return np.ones(len(df), dtype=bool)
+    return np.logical_and.reduce(mascaras)
+
+
+def aplicar_filtros(df, criterios, ordenar_por='dy', limite=20):
+    """ Filtra e ranqueia (maior primeiro). Retorna uma lista de dicts. """
+    if ordenar_por not in CAMPOS_FILTRAVEIS:
+        raise ValueError(f"Campo de ordenação inválido: {ordenar_por}")
+    filtrado = df.loc[montar_mascara(df, criterios)]
+    return filtrado.sort_values(by=ordenar_por, ascending=False).head(limite).to_dict('records')
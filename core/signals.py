@@ -0,0 +1,160 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+
+from .models import (
+    DespesaCartao, ParcelaCartao, OperacaoInvestimento,
+    Transacao, ContaPagar, CartaoCredito, Ativo, AnaliseBot,
+    Compromisso, Nota, Desafio, SemanaDesafio,
+)
+from .posicao_logic import aplicar_operacao
+from .resumo_logic import aplicar_transacao
+from .health_logic import invalidar_diagnostico
+from .painel_logic import invalidar_widgets, criar_versoes
+
+
+# --- LIVRO DE FATURAS (ParcelaCartao) ---
+
+@receiver(post_save, sender=DespesaCartao)
+def sincronizar_parcelas(sender, instance, **kwargs):
+    """ Recria as parcelas da compra criada/editada (a exclusão sai por CASCADE) """
+    ParcelaCartao.objects.filter(despesa=instance).delete()
+    ParcelaCartao.objects.bulk_create(instance.gerar_parcelas())
+
+
+# --- POSIÇÃO DOS ATIVOS (delta de cada operação) ---
+
+@receiver(pre_save, sender=OperacaoInvestimento)
+def guardar_operacao_anterior(sender, instance, **kwargs):
+    """ Na edição, guarda a versão do banco para desfazer o delta antigo """
+    instance._posicao_anterior = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._posicao_anterior = OperacaoInvestimento.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=OperacaoInvestimento)
+def atualizar_posicao(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_posicao_anterior', None)
+    if anterior is not None:
+        aplicar_operacao(anterior, sinal=-1)
+    aplicar_operacao(instance)
+
+
+@receiver(post_delete, sender=OperacaoInvestimento)
+def remover_da_posicao(sender, instance, **kwargs):
+    aplicar_operacao(instance, sinal=-1)
+
+
+# --- ROLLUP MENSAL DO CAIXA (ResumoMensal) ---
+
+@receiver(pre_save, sender=Transacao)
+def guardar_transacao_anterior(sender, instance, **kwargs):
+    """ Na edição, guarda a versão do banco para desfazer a soma antiga """
+    instance._resumo_anterior = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._resumo_anterior = Transacao.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Transacao)
+def atualizar_resumo(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_resumo_anterior', None)
+    if anterior is not None:
+        aplicar_transacao(anterior, sinal=-1)
+    aplicar_transacao(instance)
+
+
+@receiver(post_delete, sender=Transacao)
+def remover_do_resumo(sender, instance, **kwargs):
+    aplicar_transacao(instance, sinal=-1)
+
+
+# --- SAÚDE FINANCEIRA (invalida o snapshot do dono do dado) ---
+
+@receiver([post_save, post_delete], sender=Transacao)
+@receiver([post_save, post_delete], sender=ContaPagar)
+@receiver([post_save, post_delete], sender=CartaoCredito)
+@receiver([post_save, post_delete], sender=Ativo)
+def invalidar_por_usuario(sender, instance, **kwargs):
+    invalidar_diagnostico(user_id=instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=DespesaCartao)
+def invalidar_por_cartao(sender, instance, **kwargs):
+    invalidar_diagnostico(user__cartaocredito__id=instance.cartao_id)
+
+
+@receiver([post_save, post_delete], sender=AnaliseBot)
+def invalidar_por_ativo(sender, instance, **kwargs):
+    invalidar_diagnostico(user__ativo__id=instance.ativo_id)
+
+
+# --- WIDGETS DO DASHBOARD (versão do fragmento em cache) ---
+
+def _dono(instance, relacao):
+    """ user_id pelo pai (cartão, ativo, desafio); o pai pode já ter sido apagado """
+    try:
+        return getattr(instance, relacao).user_id
+    except ObjectDoesNotExist:
+        return None
+
+
+@receiver(post_save, sender=User)
+def widgets_usuario_novo(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        criar_versoes(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Transacao)
+def widgets_transacao(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'caixa')
+
+
+@receiver([post_save, post_delete], sender=CartaoCredito)
+def widgets_cartao(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'caixa', 'cartoes')
+
+
+@receiver([post_save, post_delete], sender=DespesaCartao)
+def widgets_despesa_cartao(sender, instance, **kwargs):
+    invalidar_widgets(_dono(instance, 'cartao'), 'caixa', 'cartoes')
+
+
+@receiver([post_save, post_delete], sender=Ativo)
+def widgets_ativo(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'aportes')
+
+
+@receiver([post_save, post_delete], sender=OperacaoInvestimento)
+def widgets_operacao(sender, instance, **kwargs):
+    invalidar_widgets(_dono(instance, 'ativo'), 'aportes')
+
+
+@receiver([post_save, post_delete], sender=Compromisso)
+def widgets_compromisso(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'compromissos')
+
+
+@receiver([post_save, post_delete], sender=Nota)
+def widgets_nota(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'notas')
+
+
+@receiver([post_save, post_delete], sender=ContaPagar)
+def widgets_conta(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'contas')
+
+
+@receiver([post_save, post_delete], sender=Desafio)
+def widgets_desafio(sender, instance, **kwargs):
+    invalidar_widgets(instance.user_id, 'desafio')
+
+
+@receiver([post_save, post_delete], sender=SemanaDesafio)
+def widgets_semana_desafio(sender, instance, **kwargs):
+    invalidar_widgets(_dono(instance, 'desafio'), 'desafio')
@@ -0,0 +1,104 @@
+"""
+Fila de tarefas em segundo plano usando o próprio banco como broker.
+
+O request só enfileira (uma linha em Tarefa); o worker
+(`python manage.py processar_tarefas`) reserva e executa. Não precisa de
+Redis nem de nenhum serviço externo.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Tarefa
+from .bot_logic import executar_analise_carteira
+
+# tipo da tarefa -> função(tarefa, progresso) que retorna o resultado (JSON)
+EXECUTORES = {}
+
+
+def registrar(tipo):
+    def decorador(funcao):
+        EXECUTORES[tipo] = funcao
+        return funcao
+    return decorador
+
+
+@registrar('analise_carteira')
+def _analise_carteira(tarefa, progresso):
+    resultado = executar_analise_carteira(tarefa.user, progresso=progresso)
+    return {'analisados': resultado['analisados'], 'falhas': resultado['falhas']}
+
+
+# --- FILA ---
+
+def enfileirar(user, tipo):
+    """
+    Coloca a tarefa na fila. Se já houver uma igual na fila/execução para o
+    usuário, devolve a existente em vez de duplicar.
+    Retorna (tarefa, criada).
+    """
+    try:
+        with transaction.atomic():
+            return Tarefa.objects.create(user=user, tipo=tipo), True
+    except IntegrityError:
+        existente = Tarefa.objects.filter(user=user, tipo=tipo, status__in=Tarefa.EM_ANDAMENTO).first()
+        if existente is None:
+            # A anterior acabou entre o INSERT e o SELECT: tenta de novo
+            return enfileirar(user, tipo)
+        return existente, False
+
+
+def reservar_proxima():
+    """
+    Reserva a tarefa pendente mais antiga. O UPDATE condicional garante que
+    dois workers nunca peguem a mesma tarefa (funciona em SQLite e Postgres).
+    """
+    candidatas = Tarefa.objects.filter(status='pendente').order_by('criado_em').values_list('pk', flat=True)[:10]
+    for pk in candidatas:
+        reservada = Tarefa.objects.filter(pk=pk, status='pendente').update(
+            status='executando', iniciado_em=timezone.now(), progresso=0
+        )
+        if reservada:
+            return Tarefa.objects.select_related('user').get(pk=pk)
+    return None
+
+
+def executar_tarefa(tarefa):
+    executor = EXECUTORES.get(tarefa.tipo)
+    ultimo = {'percentual': -1}
+
+    def progresso(percentual, mensagem=''):
+        # Evita um UPDATE por ticker: só grava quando o número muda
+        percentual = int(percentual)
+        if percentual != ultimo['percentual']:
+            ultimo['percentual'] = percentual
+            Tarefa.objects.filter(pk=tarefa.pk).update(progresso=percentual, mensagem=mensagem[:255])
+
+    try:
+        if executor is None:
+            raise ValueError(f"Tipo de tarefa desconhecido: {tarefa.tipo}")
+        resultado = executor(tarefa, progresso)
+        Tarefa.objects.filter(pk=tarefa.pk).update(
+            status='concluida', progresso=100, mensagem='', resultado=resultado, finalizado_em=timezone.now()
+        )
+    except Exception as e:
+        Tarefa.objects.filter(pk=tarefa.pk).update(
+            status='erro', mensagem=str(e)[:255], finalizado_em=timezone.now()
+        )
+    tarefa.refresh_from_db()
+    return tarefa
+
+
+def processar_proxima():
+    """ Executa uma tarefa da fila. Retorna a tarefa ou None se a fila estiver vazia. """
+    tarefa = reservar_proxima()
+    if tarefa is None:
+        return None
+    return executar_tarefa(tarefa)
+
+
+def liberar_travadas(minutos=30):
+    """ Devolve para a fila tarefas cujo worker morreu no meio da execução """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return Tarefa.objects.filter(status='executando', iniciado_em__lt=limite).update(status='pendente')
@@ -0,0 +1,45 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import dados_sinteticos
+from core.benchmark_logic import executar_benchmark, verificar_limites, percentil, VIEWS
+
+POUCO = {'transacoes': 20, 'despesas_cartao': 5, 'operacoes': 10, 'compromissos': 5, 'notas': 3, 'contas': 3, 'desafios': 1}
+MUITO = {'transacoes': 400, 'despesas_cartao': 80, 'operacoes': 150, 'compromissos': 60, 'notas': 30, 'contas': 20, 'desafios': 4}
+
+
+class BenchmarkViewsTest(TestCase):
+    def test_percentil(self):
+        self.assertEqual(percentil([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentil(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentil([], 95), 0.0)
+
+    def test_verificar_limites(self):
+        resultados = [{'view': 'dashboard', 'consultas': 12, 'p95_ms': 10}]
+        limites = {'dashboard': {'consultas': 9, 'p95_ms': 5}}
+        self.assertEqual(len(verificar_limites(resultados, limites)), 2)
+        self.assertEqual(verificar_limites(resultados, {'dashboard': {'consultas': 20}}), [])
+
+    def test_views_dentro_dos_limites_e_queries_constantes(self):
+        pouco, muito = dados_sinteticos.criar_usuarios(2, prefixo='benchteste')
+        dados_sinteticos.gerar_perfil([pouco], POUCO)
+        dados_sinteticos.gerar_perfil([muito], MUITO, seed=7)
+
+        resultado_pouco = executar_benchmark(pouco, repeticoes=3, aquecimento=1)
+        resultado_muito = executar_benchmark(muito, repeticoes=5, aquecimento=1)
+
+        self.assertEqual([r['view'] for r in resultado_muito], VIEWS)
+        # Sem N+1: o número de queries não depende do volume
+        self.assertEqual(
+            {r['view']: r['consultas'] for r in resultado_pouco},
+            {r['view']: r['consultas'] for r in resultado_muito},
+        )
+        self.assertEqual(verificar_limites(resultado_muito), [])
+
+    def test_comando(self):
+        saida = io.StringIO()
+        call_command('benchmark_views', '--usuarios', '1', '--repeticoes', '2', '--transacoes', '20',
+                     '--despesas-cartao', '5', '--operacoes', '5', '--view', 'dashboard', stdout=saida)
+        self.assertIn('dentro dos limites', saida.getvalue())
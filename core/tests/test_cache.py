@@ -0,0 +1,85 @@
+from unittest.mock import patch
+from django.test import TestCase
+import pandas as pd
+from core.cache_mercado import CacheMemoria, CacheDjango
+from core.bot_logic import ClienteCacheado
+
+
+class ClienteContador:
+    """ Conta quantas vezes cada método foi à "rede" """
+    def __init__(self):
+        self.chamadas = []
+
+    def cotacoes(self, simbolos):
+        self.chamadas.append(('cotacoes', tuple(simbolos)))
+        return pd.Series({s: 10.0 for s in simbolos})
+
+    def info(self, simbolo):
+        self.chamadas.append(('info', simbolo))
+        return {'dividendYield': 0.05}
+
+    def dividendos(self, simbolo):
+        self.chamadas.append(('dividendos', simbolo))
+        return pd.Series(dtype=float)
+
+
+class CacheMemoriaTest(TestCase):
+    def test_ttl_expira(self):
+        """Depois do TTL do tipo, o valor volta a ser buscado"""
+        cache = CacheMemoria(ttls={'preco': 60})
+        with patch('core.cache_mercado.time.monotonic', return_value=1000):
+            cache.guardar('preco', 'WEGE3.SA', 40.0)
+            self.assertEqual(cache.obter('preco', 'WEGE3.SA'), 40.0)
+        with patch('core.cache_mercado.time.monotonic', return_value=1061):
+            self.assertIsNone(cache.obter('preco', 'WEGE3.SA'))
+
+    def test_lru_descarta_o_mais_antigo(self):
+        """Ao passar do limite, sai a entrada usada há mais tempo"""
+        cache = CacheMemoria(limites={'info': 2})
+        cache.guardar('info', 'A', 1)
+        cache.guardar('info', 'B', 2)
+        cache.obter('info', 'A')
+        cache.guardar('info', 'C', 3)
+
+        self.assertIsNone(cache.obter('info', 'B'))
+        self.assertEqual(cache.obter('info', 'A'), 1)
+
+    def test_estatisticas(self):
+        cache = CacheMemoria()
+        cache.obter_ou_buscar('screener', 'fundamentus', lambda: 'tabela')
+        cache.obter_ou_buscar('screener', 'fundamentus', lambda: 'tabela')
+        stats = cache.estatisticas()['screener']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_travas_de_busca_sao_liberadas(self):
+        """Uma trava por busca em andamento, não uma por chave já vista"""
+        cache = CacheMemoria()
+        for simbolo in ('WEGE3.SA', 'ITSA4.SA', 'BBAS3.SA'):
+            cache.obter_ou_buscar('info', simbolo, lambda: {})
+        def falhar():
+            raise ValueError('ticker desconhecido')
+
+        with self.assertRaises(ValueError):
+            cache.obter_ou_buscar('info', 'FALHA3.SA', falhar)
+        self.assertEqual(cache._buscas, {})
+
+        cache.limpar()
+        self.assertEqual(cache.estatisticas(), {})
+
+
+class ClienteCacheadoTest(TestCase):
+    def test_dois_usuarios_um_download(self):
+        """O segundo usuário com o mesmo ticker não vai à rede"""
+        for cache in (CacheMemoria(), CacheDjango()):
+            cache.limpar()
+            origem = ClienteContador()
+            ClienteCacheado(origem, cache).cotacoes(['WEGE3.SA'])
+            ClienteCacheado(origem, cache).cotacoes(['WEGE3.SA', 'ITSA4.SA'])
+            ClienteCacheado(origem, cache).info('WEGE3.SA')
+            ClienteCacheado(origem, cache).info('WEGE3.SA')
+
+            self.assertEqual(origem.chamadas, [
+                ('cotacoes', ('WEGE3.SA',)),
+                ('cotacoes', ('ITSA4.SA',)),
+                ('info', 'WEGE3.SA'),
+            ])
@@ -0,0 +1,71 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Desafio, SemanaDesafio
+
+
+class DesafioEmLoteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='poupador', password='123')
+        self.client.force_login(self.user)
+
+    def criar(self, semanas=10):
+        self.client.post(reverse('desafio_novo'), {
+            'objetivo': 'Viagem', 'valor_inicial': '10.00', 'incremento': '5.00',
+            'duracao_semanas': semanas, 'data_inicio': '2025-01-06',
+        })
+        return Desafio.objects.get(user=self.user, objetivo='Viagem')
+
+    def test_criacao_com_um_insert_de_semanas(self):
+        """Todas as semanas saem de um único bulk_create, com valor e data da P.A."""
+        with CaptureQueriesContext(connection) as consultas:
+            desafio = self.criar(semanas=52)
+
+        inserts = [q for q in consultas if q['sql'].startswith('INSERT INTO "core_semanadesafio"')]
+        self.assertEqual(len(inserts), 1)
+
+        semanas = list(desafio.semanas.order_by('numero'))
+        self.assertEqual(len(semanas), 52)
+        self.assertEqual(semanas[0].valor, Decimal('10.00'))
+        self.assertEqual(semanas[-1].valor, Decimal('265.00'))
+        self.assertEqual(semanas[-1].data_prevista, date(2025, 12, 29))
+
+    def test_marcar_intervalo(self):
+        desafio = self.criar()
+        url = reverse('desafio_marcar_semanas', args=[desafio.pk])
+
+        self.client.post(url, {'de': 3, 'ate': 6, 'acao': 'pagar'})
+        pagas = set(desafio.semanas.filter(pago=True).values_list('numero', flat=True))
+        self.assertEqual(pagas, {3, 4, 5, 6})
+        self.assertFalse(desafio.semanas.filter(pago=True, data_pagamento__isnull=True).exists())
+
+        # Intervalo invertido também vale
+        self.client.post(url, {'de': 5, 'ate': 4, 'acao': 'desmarcar'})
+        pagas = set(desafio.semanas.filter(pago=True).values_list('numero', flat=True))
+        self.assertEqual(pagas, {3, 6})
+
+    def test_marcar_desafio_de_outro_usuario(self):
+        desafio = self.criar()
+        outro = User.objects.create_user(username='intruso', password='123')
+        self.client.force_login(outro)
+
+        resposta = self.client.post(reverse('desafio_marcar_semanas', args=[desafio.pk]), {'de': 1, 'ate': 10})
+
+        self.assertEqual(resposta.status_code, 404)
+        self.assertFalse(SemanaDesafio.objects.filter(pago=True).exists())
+
+    def test_comando_sinteticos(self):
+        saida = StringIO()
+        call_command('importar_desafios', sinteticos=30, usuarios=3, semanas=8, lote=7, stdout=saida)
+
+        self.assertEqual(Desafio.objects.filter(user__username__startswith='bench').count(), 30)
+        self.assertEqual(SemanaDesafio.objects.count(), 240)
+        self.assertIn('30 desafio(s)', saida.getvalue())
@@ -0,0 +1,139 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core.desempenho_logic import calcular_desempenho, xirr
+from core.models import Ativo, OperacaoInvestimento, PrecoHistorico
+
+D0 = date(2024, 1, 1)
+
+
+def operacao(ativo, tipo, dia, quantidade, preco, taxas=0, ticker='WEGE3'):
+    return {'ativo': ativo, 'ticker': ticker, 'simbolo': f'{ticker}.SA', 'tipo': tipo,
+            'data': D0 + timedelta(days=dia), 'quantidade': quantidade, 'preco_unitario': preco, 'taxas': taxas}
+
+
+def fechamentos(pontos, simbolo='WEGE3.SA'):
+    """ {dia: preço} -> DataFrame de fechamentos (os dias sem preço repetem o anterior) """
+    return pd.DataFrame({simbolo: list(pontos.values())}, index=[D0 + timedelta(days=d) for d in pontos])
+
+
+class DesempenhoTest(TestCase):
+    def test_twr_ignora_o_momento_do_aporte(self):
+        """+20% e depois -50%: TWR de -40% mesmo com o segundo aporte no topo"""
+        operacoes = pd.DataFrame([operacao(1, 'C', 0, 10, 10), operacao(1, 'C', 5, 10, 12)])
+        resultado = calcular_desempenho(
+            operacoes, fechamentos({0: 10, 4: 12, 10: 6}), fim=D0 + timedelta(days=10)
+        )
+
+        self.assertAlmostEqual(resultado['twr'], -0.40)
+        serie = resultado['serie']
+        self.assertAlmostEqual(serie['valor'].iloc[-1], 120.0)
+        self.assertAlmostEqual(serie['aportes'].sum(), 220.0)
+        self.assertAlmostEqual(resultado['contribuicoes'][0]['resultado'], -100.0)
+
+    def test_venda_dividendo_e_contribuicao(self):
+        operacoes = pd.DataFrame([
+            operacao(1, 'C', 0, 10, 10),
+            operacao(2, 'C', 0, 10, 10, ticker='ITSA4'),
+            operacao(1, 'V', 10, 10, 11),
+            operacao(2, 'D', 10, 0, 5, ticker='ITSA4'),
+        ])
+        precos = fechamentos({0: 10, 10: 11}).join(fechamentos({0: 10, 10: 10}, 'ITSA4.SA'))
+        resultado = calcular_desempenho(operacoes, precos, fim=D0 + timedelta(days=10))
+
+        # (110 vendidos + 100 em carteira + 5 de dividendo) / 200 aplicados
+        self.assertAlmostEqual(resultado['twr'], 0.075)
+        contribuicoes = {c['ticker']: c for c in resultado['contribuicoes']}
+        self.assertAlmostEqual(contribuicoes['WEGE3']['contribuicao'], 0.05)
+        self.assertAlmostEqual(contribuicoes['ITSA4']['contribuicao'], 0.025)
+        self.assertAlmostEqual(contribuicoes['WEGE3']['valor_final'], 0.0)
+
+    def test_periodo_parcial_abre_com_a_posicao(self):
+        """Começando no meio, a posição anterior vira o valor de abertura"""
+        operacoes = pd.DataFrame([operacao(1, 'C', 0, 10, 10)])
+        precos = fechamentos({0: 10, 5: 20, 10: 30})
+        resultado = calcular_desempenho(operacoes, precos, inicio=D0 + timedelta(days=6), fim=D0 + timedelta(days=10))
+
+        self.assertAlmostEqual(resultado['twr'], 0.5)
+        self.assertGreater(resultado['xirr'], 0)
+
+    def test_periodo_vazio(self):
+        """inicio depois de fim: resultado vazio, sem erro"""
+        operacoes = pd.DataFrame([operacao(1, 'C', 10, 10, 10)])
+        resultado = calcular_desempenho(
+            operacoes, fechamentos({10: 10}), inicio=D0 + timedelta(days=150), fim=D0 + timedelta(days=60)
+        )
+        self.assertTrue(resultado['serie'].empty)
+        self.assertIsNone(resultado['xirr'])
+        self.assertEqual(resultado['contribuicoes'], [])
+
+    def test_xirr(self):
+        # -1000 hoje, +1100 em um ano: 10% a.a.
+        self.assertAlmostEqual(xirr([date(2024, 1, 1), date(2024, 12, 31)], [-1000, 1100]), 0.10, places=4)
+        self.assertIsNone(xirr([date(2024, 1, 1), date(2024, 6, 1)], [100, 100]))
+
+    def test_centenas_de_ativos_dez_anos(self):
+        """300 ativos x 10 anos de pregões em bem menos de um segundo"""
+        rnd = np.random.default_rng(42)
+        dias = pd.bdate_range('2015-01-01', '2024-12-31')
+        simbolos = [f'ATV{i}.SA' for i in range(300)]
+        precos = pd.DataFrame(
+            20 * np.exp(np.cumsum(rnd.normal(0, 0.01, (len(dias), len(simbolos))), axis=0)),
+            index=dias, columns=simbolos,
+        )
+        operacoes = pd.DataFrame({
+            'ativo': np.arange(6000) % 300,
+            'tipo': rnd.choice(['C', 'C', 'C', 'V', 'D'], 6000),
+            'data': dias[rnd.integers(0, len(dias), 6000)],
+            'quantidade': rnd.integers(1, 50, 6000).astype(float),
+            'preco_unitario': rnd.uniform(10, 30, 6000),
+            'taxas': 0.0,
+        })
+        operacoes['ticker'] = 'ATV' + operacoes['ativo'].astype(str)
+        operacoes['simbolo'] = operacoes['ticker'] + '.SA'
+
+        t0 = time.perf_counter()
+        resultado = calcular_desempenho(operacoes, precos, fim=date(2024, 12, 31))
+        decorrido = time.perf_counter() - t0
+
+        self.assertEqual(len(resultado['contribuicoes']), 300)
+        self.assertLess(decorrido, 1.0)
+
+
+class DesempenhoViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='investidor', password='123')
+        self.client.force_login(self.user)
+        ativo = Ativo.objects.create(user=self.user, ticker='WEGE3', tipo='ACAO')
+        OperacaoInvestimento.objects.create(
+            ativo=ativo, tipo='C', data=D0, quantidade=Decimal('10'), preco_unitario=Decimal('10')
+        )
+        PrecoHistorico.objects.bulk_create([
+            PrecoHistorico(simbolo='WEGE3.SA', data=D0, fechamento=10),
+            PrecoHistorico(simbolo='WEGE3.SA', data=D0 + timedelta(days=30), fechamento=12),
+        ])
+
+    def test_json_do_periodo(self):
+        resposta = self.client.get(reverse('investimentos_desempenho'), {'inicio': '2024-01-01', 'fim': '2024-03-01'})
+        dados = resposta.json()
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertAlmostEqual(dados['twr'], 0.2)
+        self.assertEqual(dados['serie']['datas'][0], '2024-01-01')
+        self.assertEqual(dados['serie']['valor'][-1], 120.0)
+        self.assertEqual(dados['contribuicoes'][0]['ticker'], 'WEGE3')
+
+    def test_data_invalida(self):
+        resposta = self.client.get(reverse('investimentos_desempenho'), {'inicio': 'ontem'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_periodo_invertido(self):
+        resposta = self.client.get(reverse('investimentos_desempenho'), {'inicio': '2024-06-01', 'fim': '2024-03-01'})
+        self.assertEqual(resposta.status_code, 400)
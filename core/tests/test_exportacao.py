@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.exportacao_logic import exportar, ErroExportacao
+from core.models import Transacao, CartaoCredito, DespesaCartao, Ativo, OperacaoInvestimento, ContaPagar, Nota
+
+
+class ExportacaoTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.outro = User.objects.create_user(username='outro', password='123')
+        Transacao.objects.create(user=self.user, descricao='Salário', valor=Decimal('5000.00'), tipo='receita',
+                                 categoria='salario', data=date(2025, 3, 5))
+        Transacao.objects.create(user=self.user, descricao='Mercado, "grande"', valor=Decimal('250.40'),
+                                 tipo='despesa', categoria='alimentacao', data=date(2025, 3, 6))
+        Transacao.objects.create(user=self.outro, descricao='Não é meu', valor=1, tipo='despesa', data=date(2025, 3, 6))
+        cartao = CartaoCredito.objects.create(user=self.user, nome='Nubank', limite=5000, dia_fechamento=1, dia_vencimento=10)
+        DespesaCartao.objects.create(cartao=cartao, descricao='TV', valor=Decimal('3000.00'), parcelas=10,
+                                     data_compra=date(2025, 2, 1))
+        ativo = Ativo.objects.create(user=self.user, ticker='WEGE3', tipo='ACAO')
+        OperacaoInvestimento.objects.create(ativo=ativo, tipo='C', data=date(2025, 1, 2), quantidade=10,
+                                            preco_unitario=Decimal('40.00'))
+        ContaPagar.objects.create(user=self.user, titulo='IPVA', valor=Decimal('1200.00'), data_vencimento=date(2025, 4, 1))
+        Nota.objects.create(user=self.user, titulo='Lista', conteudo='linha 1\nlinha 2')
+
+    def baixar(self, **params):
+        return b''.join(exportar(self.user, **params))
+
+    def test_csv_de_uma_tabela(self):
+        conteudo = self.baixar(formato='csv', tabela='transacoes').decode('utf-8-sig')
+        linhas = list(csv.DictReader(io.StringIO(conteudo)))
+        self.assertEqual([l['descricao'] for l in linhas], ['Salário', 'Mercado, "grande"'])
+        self.assertEqual(linhas[1]['valor'], '250.40')
+
+    def test_csv_exige_tabela(self):
+        with self.assertRaises(ErroExportacao):
+            exportar(self.user, formato='csv')
+
+    def test_jsonl_com_todas_as_tabelas(self):
+        objetos = [json.loads(l) for l in self.baixar(formato='jsonl').decode('utf-8').splitlines()]
+        por_tabela = {}
+        for objeto in objetos:
+            por_tabela.setdefault(objeto['tabela'], []).append(objeto)
+        self.assertEqual({t: len(o) for t, o in por_tabela.items()},
+                         {'transacoes': 2, 'despesas_cartao': 1, 'operacoes': 1, 'contas': 1, 'notas': 1})
+        self.assertEqual(por_tabela['operacoes'][0]['ativo_ticker'], 'WEGE3')
+        self.assertEqual(por_tabela['despesas_cartao'][0]['cartao_nome'], 'Nubank')
+
+    def test_zip_com_manifesto(self):
+        pacote = zipfile.ZipFile(io.BytesIO(self.baixar(formato='zip')))
+        self.assertEqual(set(pacote.namelist()), {
+            'transacoes.csv', 'despesas_cartao.csv', 'operacoes.csv', 'contas.csv', 'notas.csv', 'manifesto.json',
+        })
+        manifesto = json.loads(pacote.read('manifesto.json'))
+        # A nota tem quebra de linha no conteúdo: conta registros, não linhas de texto
+        self.assertEqual(manifesto['linhas']['notas'], 1)
+        self.assertEqual(manifesto['linhas']['transacoes'], 2)
+        notas = list(csv.DictReader(io.StringIO(pacote.read('notas.csv').decode('utf-8'))))
+        self.assertEqual(notas[0]['conteudo'], 'linha 1\nlinha 2')
+
+    def test_incremental_so_o_que_mudou(self):
+        corte = timezone.now()
+        Transacao.objects.filter(user=self.user).update(atualizado_em=corte - timedelta(days=1))
+        alterada = Transacao.objects.get(descricao='Salário')
+        alterada.valor = Decimal('5100.00')
+        alterada.save()
+
+        conteudo = self.baixar(formato='csv', tabela='transacoes', desde=corte).decode('utf-8-sig')
+        linhas = list(csv.DictReader(io.StringIO(conteudo)))
+        self.assertEqual([l['valor'] for l in linhas], ['5100.00'])
+
+    def test_blocos_sem_acumular(self):
+        Transacao.objects.bulk_create([
+            Transacao(user=self.user, descricao=f'Linha {i}', valor=1, tipo='despesa', data=date(2025, 1, 1))
+            for i in range(50)
+        ])
+        blocos = list(exportar(self.user, formato='csv', tabela='transacoes', chunk_size=10))
+        self.assertGreater(len(blocos), 5)
+        self.assertTrue(all(len(b) < 1000 for b in blocos))
+
+    def test_view_em_streaming(self):
+        self.client.login(username='felipe', password='123')
+        resposta = self.client.get(reverse('exportar_dados'), {'formato': 'jsonl', 'tabela': 'contas'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        self.assertIn('attachment', resposta['Content-Disposition'])
+        linhas = b''.join(resposta.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(l)['titulo'] for l in linhas], ['IPVA'])
+
+    def test_view_parametros_invalidos(self):
+        self.client.login(username='felipe', password='123')
+        resposta = self.client.get(reverse('exportar_dados'), {'formato': 'csv'})
+        self.assertRedirects(resposta, reverse('configuracoes'))
+        resposta = self.client.get(reverse('exportar_dados'), {'desde': 'ontem'})
+        self.assertRedirects(resposta, reverse('configuracoes'))
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            destino = os.path.join(pasta, 'backup.zip')
+            saida = io.StringIO()
+            call_command('exportar_dados', '--usuario', 'felipe', '--saida', destino, stdout=saida)
+            self.assertIn('--desde', saida.getvalue())
+            self.assertIn('transacoes.csv', zipfile.ZipFile(destino).namelist())
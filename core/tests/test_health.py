@@ -0,0 +1,98 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.health_logic import gerar_diagnostico_financeiro, obter_diagnostico
+from core.models import (
+    Transacao, ContaPagar, CartaoCredito, DespesaCartao, Ativo, AnaliseBot
+)
+
+# Caixa (rollup + dias do mês anterior), contas, limite, dívida do cartão, carteira, análises
+QUERIES_DIAGNOSTICO = 7
+
+
+class DiagnosticoFinanceiroTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.hoje = timezone.now().date()
+
+    def popular(self, vezes):
+        for i in range(vezes):
+            Transacao.objects.create(user=self.user, descricao='Salário', valor=1000, tipo='receita', data=self.hoje)
+            Transacao.objects.create(user=self.user, descricao='Mercado', valor=900, tipo='despesa', data=self.hoje)
+            ContaPagar.objects.create(user=self.user, titulo='Luz', valor=50, data_vencimento=self.hoje - timedelta(days=2))
+            cartao = CartaoCredito.objects.create(user=self.user, nome=f'Cartão {i}', limite=1000, dia_vencimento=10)
+            DespesaCartao.objects.create(cartao=cartao, descricao='Compra', valor=800, data_compra=self.hoje)
+            ativo = Ativo.objects.create(user=self.user, ticker=f'RUIM{i}', tipo='ACAO', quantidade_atual=2, preco_medio=10)
+            AnaliseBot.objects.create(ativo=ativo, recomendacao='VENDER')
+
+    def test_valores_agregados(self):
+        """Os totais batem com a soma linha a linha"""
+        self.popular(3)
+        Transacao.objects.create(user=self.user, descricao='Antiga', valor=999, tipo='receita', data=self.hoje - timedelta(days=60))
+
+        diagnostico = gerar_diagnostico_financeiro(self.user)
+
+        self.assertEqual(diagnostico['taxa_poupanca'], 10)
+        self.assertEqual(diagnostico['total_atrasado'], Decimal('150'))
+        self.assertEqual(diagnostico['uso_cartao'], 80)
+        alerta = next(r for r in diagnostico['recomendacoes'] if r['titulo'] == 'Otimização de Carteira')
+        for ticker in ['RUIM0', 'RUIM1', 'RUIM2']:
+            self.assertIn(ticker, alerta['msg'])
+
+    def test_quantidade_de_queries_fixa(self):
+        """O número de queries não cresce com o volume de dados"""
+        self.popular(1)
+        with self.assertNumQueries(QUERIES_DIAGNOSTICO):
+            gerar_diagnostico_financeiro(self.user)
+
+        self.popular(20)
+        with self.assertNumQueries(QUERIES_DIAGNOSTICO):
+            gerar_diagnostico_financeiro(self.user)
+
+
+class SnapshotSaudeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.client.force_login(self.user)
+        self.hoje = timezone.now().date()
+
+    def test_snapshot_reaproveitado(self):
+        """Sem mudanças, a segunda leitura não recalcula"""
+        obter_diagnostico(self.user)
+        with self.assertNumQueries(1):
+            snapshot = obter_diagnostico(self.user)
+        self.assertTrue(snapshot.valido)
+
+    def test_signals_invalidam(self):
+        """Transação e compra no cartão sobem a versão e forçam o recálculo"""
+        versao = obter_diagnostico(self.user).versao
+
+        Transacao.objects.create(user=self.user, descricao='Salário', valor=1000, tipo='receita', data=self.hoje)
+        snapshot = obter_diagnostico(self.user)
+        self.assertEqual(snapshot.versao, versao + 1)
+        self.assertEqual(snapshot.taxa_poupanca, 100)
+
+        cartao = CartaoCredito.objects.create(user=self.user, nome='Nubank', limite=1000, dia_vencimento=10)
+        versao = obter_diagnostico(self.user).versao
+        DespesaCartao.objects.create(cartao=cartao, descricao='TV', valor=800, data_compra=self.hoje)
+        snapshot = obter_diagnostico(self.user)
+        self.assertEqual(snapshot.versao, versao + 1)
+        self.assertEqual(snapshot.uso_cartao, 80)
+
+    def test_etag_304(self):
+        """Com o mesmo ETag a view responde 304; depois de uma mudança, 200"""
+        url = reverse('saude_financeira')
+        primeira = self.client.get(url)
+        etag = primeira['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        ContaPagar.objects.create(user=self.user, titulo='Luz', valor=50, data_vencimento=self.hoje - timedelta(days=1))
+        nova = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(nova.status_code, 200)
+        self.assertNotEqual(nova['ETag'], etag)
@@ -0,0 +1,119 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pandas as pd
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.bot_logic import atualizar_historico, executar_analise_carteira
+from core.historico_logic import dividendos_acumulados
+from core.models import Ativo, SerieHistorica, PrecoHistorico, DividendoHistorico
+
+
+class ClienteHistorico:
+    """ Série diária fixa; registra cada trecho pedido """
+    def __init__(self, dividendos, fechamento=10.0):
+        self.dividendos_por_data = dividendos
+        self.fechamento = fechamento
+        self.pedidos = []
+
+    def cotacoes(self, simbolos):
+        return pd.Series({s: 20.0 for s in simbolos}, dtype=float)
+
+    def info(self, simbolo):
+        return {'dividendYield': 0.05, 'priceToBook': 1.0, 'trailingPE': 8.0}
+
+    def historico(self, simbolo, inicio, fim=None):
+        self.pedidos.append((simbolo, inicio, fim))
+        datas = pd.date_range(inicio, fim or timezone.localdate(), freq='D')
+        return pd.DataFrame({
+            'fechamento': [self.fechamento] * len(datas),
+            'dividendo': [self.dividendos_por_data.get(d.date(), 0.0) for d in datas],
+        }, index=datas)
+
+
+class HistoricoIncrementalTest(TestCase):
+    def setUp(self):
+        self.hoje = timezone.localdate()
+        self.user = User.objects.create_user(username='investidor', password='123')
+        self.ativo = Ativo.objects.create(
+            user=self.user, ticker='TAEE11', tipo='ACAO', quantidade_atual=Decimal('100'),
+            preco_medio=Decimal('15'), data_inicio=self.hoje - timedelta(days=30),
+        )
+        self.cliente = ClienteHistorico({
+            self.hoje - timedelta(days=40): 9.0,  # antes da compra: não conta
+            self.hoje - timedelta(days=20): 0.5,
+            self.hoje - timedelta(days=5): 0.25,
+        })
+
+    def test_segunda_execucao_sem_rede(self):
+        """Dividendos saem da série local; a repetição no mesmo dia não baixa nada"""
+        resultado = executar_analise_carteira(self.user, cliente=self.cliente)
+        ativo = resultado['ativos'][0]
+        self.assertAlmostEqual(ativo.total_dividendos, 75.0)
+        self.assertEqual(self.cliente.pedidos, [('TAEE11.SA', self.ativo.data_inicio, None)])
+
+        resultado = executar_analise_carteira(self.user, cliente=self.cliente)
+        self.assertAlmostEqual(resultado['ativos'][0].total_dividendos, 75.0)
+        self.assertEqual(len(self.cliente.pedidos), 1)
+
+    def test_busca_so_o_trecho_que_falta(self):
+        inicio = self.hoje - timedelta(days=10)
+        atualizar_historico({'TAEE11.SA': inicio}, cliente=self.cliente)
+        serie = SerieHistorica.objects.get(simbolo='TAEE11.SA')
+        self.assertEqual((serie.inicio, serie.fim), (inicio, self.hoje))
+
+        # Série conferida ontem, último pregão há 3 dias: pede dele em diante
+        SerieHistorica.objects.filter(pk=serie.pk).update(
+            fim=self.hoje - timedelta(days=3), atualizado_em=timezone.now() - timedelta(days=1)
+        )
+        atualizar_historico({'TAEE11.SA': inicio}, cliente=self.cliente)
+        self.assertEqual(self.cliente.pedidos[-1], ('TAEE11.SA', self.hoje - timedelta(days=3), None))
+        self.assertEqual(PrecoHistorico.objects.filter(simbolo='TAEE11.SA').count(), 11)
+
+        # Ativo mais antigo que a série (já conferida hoje): só o buraco antes dela
+        atualizar_historico({'TAEE11.SA': inicio - timedelta(days=5)}, cliente=self.cliente)
+        self.assertEqual(self.cliente.pedidos[-1], ('TAEE11.SA', inicio - timedelta(days=5), inicio - timedelta(days=1)))
+        serie.refresh_from_db()
+        self.assertEqual((serie.inicio, serie.fim), (inicio - timedelta(days=5), self.hoje))
+        self.assertEqual(PrecoHistorico.objects.filter(simbolo='TAEE11.SA').count(), 16)
+
+    def test_buracos_antes_e_depois(self):
+        """Série desatualizada e ativo mais antigo: dois trechos, sem rebaixar o meio"""
+        inicio = self.hoje - timedelta(days=10)
+        atualizar_historico({'TAEE11.SA': inicio}, cliente=self.cliente)
+        SerieHistorica.objects.filter(simbolo='TAEE11.SA').update(
+            fim=self.hoje - timedelta(days=2), atualizado_em=timezone.now() - timedelta(days=1)
+        )
+
+        atualizar_historico({'TAEE11.SA': inicio - timedelta(days=3)}, cliente=self.cliente)
+        self.assertEqual(self.cliente.pedidos[1:], [
+            ('TAEE11.SA', inicio - timedelta(days=3), inicio - timedelta(days=1)),
+            ('TAEE11.SA', self.hoje - timedelta(days=2), None),
+        ])
+        self.assertEqual(PrecoHistorico.objects.filter(simbolo='TAEE11.SA').count(), 14)
+
+    def test_fechamento_parcial_e_corrigido(self):
+        """O último pregão gravado (talvez parcial) é baixado de novo e sobrescrito"""
+        atualizar_historico({'TAEE11.SA': self.hoje - timedelta(days=2)}, cliente=ClienteHistorico({}, fechamento=9.5))
+        SerieHistorica.objects.filter(simbolo='TAEE11.SA').update(atualizado_em=timezone.now() - timedelta(days=1))
+
+        atualizar_historico({'TAEE11.SA': self.hoje - timedelta(days=2)}, cliente=self.cliente)
+        self.assertEqual(PrecoHistorico.objects.get(simbolo='TAEE11.SA', data=self.hoje).fechamento, 10.0)
+        self.assertEqual(PrecoHistorico.objects.filter(simbolo='TAEE11.SA').count(), 3)
+
+    def test_soma_por_intervalo(self):
+        SerieHistorica.objects.create(simbolo='ITSA4.SA', inicio=date(2024, 1, 1), fim=date(2024, 12, 31))
+        DividendoHistorico.objects.bulk_create([
+            DividendoHistorico(simbolo='ITSA4.SA', data=date(2024, 3, 1), valor=0.1),
+            DividendoHistorico(simbolo='ITSA4.SA', data=date(2024, 9, 1), valor=0.2),
+        ])
+        somas = dividendos_acumulados({
+            1: ('ITSA4.SA', date(2024, 1, 1)),
+            2: ('ITSA4.SA', date(2024, 6, 1)),
+            3: ('SEMSERIE3.SA', date(2024, 1, 1)),
+        })
+        self.assertAlmostEqual(somas[1], 0.3)
+        self.assertAlmostEqual(somas[2], 0.2)
+        self.assertNotIn(3, somas)
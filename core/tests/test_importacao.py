@@ -0,0 +1,133 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from core.importacao_logic import importar_extrato, ler_valor, categorizar
+from core.models import Transacao, CartaoCredito, DespesaCartao, ParcelaCartao, ResumoMensal
+
+CSV = """Data;Descrição;Valor
+05/03/2025;SALARIO EMPRESA X;5.000,00
+06/03/2025;Supermercado Bom Preço;-250,40
+06/03/2025;Café;-5,00
+06/03/2025;Café;-5,00
+07/03/2025;Uber *Viagem;-32,10
+"""
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+CHARSET:1252
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250310120000[-3:BRT]<TRNAMT>-89.90<FITID>A1<MEMO>NETFLIX.COM
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20250311
+<TRNAMT>150.00
+<FITID>A2
+<MEMO>PIX RECEBIDO FULANO
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class ImportacaoExtratoTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+
+    def test_csv_e_reimportacao(self):
+        resumo = importar_extrato(self.user, CSV.encode('utf-8').splitlines(keepends=True))
+        self.assertEqual((resumo['lidas'], resumo['importadas'], resumo['duplicadas']), (5, 5, 0))
+
+        # Os dois cafés idênticos do mesmo dia são lançamentos distintos
+        self.assertEqual(Transacao.objects.filter(user=self.user, descricao='Café').count(), 2)
+        salario = Transacao.objects.get(user=self.user, tipo='receita')
+        self.assertEqual((salario.valor, salario.categoria), (Decimal('5000.00'), 'salario'))
+        self.assertEqual(Transacao.objects.get(descricao__startswith='Uber').categoria, 'transporte')
+
+        # Mesmo arquivo de novo: nada entra
+        resumo = importar_extrato(self.user, CSV.splitlines(keepends=True), batch_size=2)
+        self.assertEqual((resumo['importadas'], resumo['duplicadas']), (0, 5))
+        self.assertEqual(Transacao.objects.filter(user=self.user).count(), 5)
+
+        # bulk_create não dispara signals: o rollup é somado pela importação
+        receitas = ResumoMensal.objects.get(user=self.user, tipo='receita')
+        self.assertEqual(receitas.total, Decimal('5000.00'))
+
+    def test_csv_fora_de_ordem(self):
+        """Cafés idênticos do mesmo dia, separados por outro dia, continuam sendo dois lançamentos"""
+        fora_de_ordem = """Data;Descrição;Valor
+06/03/2025;Café;-5,00
+05/03/2025;SALARIO EMPRESA X;5.000,00
+06/03/2025;Café;-5,00
+"""
+        resumo = importar_extrato(self.user, fora_de_ordem.splitlines(keepends=True))
+        self.assertEqual((resumo['importadas'], resumo['duplicadas']), (3, 0))
+        self.assertEqual(Transacao.objects.filter(user=self.user, descricao='Café').count(), 2)
+
+        resumo = importar_extrato(self.user, fora_de_ordem.splitlines(keepends=True))
+        self.assertEqual((resumo['importadas'], resumo['duplicadas']), (0, 3))
+
+    def test_ofx_sgml_cp1252(self):
+        resumo = importar_extrato(self.user, OFX.encode('cp1252').splitlines(keepends=True), formato='ofx')
+        self.assertEqual(resumo['importadas'], 2)
+        netflix = Transacao.objects.get(descricao='NETFLIX.COM')
+        self.assertEqual((netflix.tipo, netflix.valor, netflix.data, netflix.categoria),
+                         ('despesa', Decimal('89.90'), date(2025, 3, 10), 'lazer'))
+
+        resumo = importar_extrato(self.user, OFX.splitlines(keepends=True), formato='ofx')
+        self.assertEqual(resumo['duplicadas'], 2)
+
+    def test_fatura_do_cartao(self):
+        cartao = CartaoCredito.objects.create(user=self.user, nome='Nubank', limite=5000, dia_vencimento=10)
+        resumo = importar_extrato(self.user, OFX.splitlines(keepends=True), formato='ofx', cartao=cartao)
+
+        # O crédito (pagamento/estorno) fica de fora; a compra gera a parcela
+        self.assertEqual((resumo['importadas'], resumo['ignoradas']), (1, 1))
+        despesa = DespesaCartao.objects.get(cartao=cartao)
+        self.assertEqual(ParcelaCartao.objects.filter(despesa=despesa).count(), 1)
+        self.assertFalse(Transacao.objects.exists())
+
+    def test_linhas_invalidas_sao_relatadas(self):
+        resumo = importar_extrato(self.user, ["data,descricao,valor\n", "xx,Coisa,10\n", "2025-03-01,Ok,10\n"])
+        self.assertEqual(resumo['importadas'], 1)
+        self.assertIn('Linha 2', resumo['erros'][0])
+
+    def test_valores_e_categorias(self):
+        self.assertEqual(ler_valor('R$ 1.234,56'), Decimal('1234.56'))
+        self.assertEqual(ler_valor('1,234.56'), Decimal('1234.56'))
+        self.assertEqual(ler_valor('(12,00)'), Decimal('-12.00'))
+        self.assertEqual(categorizar('DROGARIA SÃO PAULO'), 'saude')
+        self.assertEqual(categorizar('Loja qualquer'), 'outros')
+
+    def test_arquivo_grande(self):
+        """Dezenas de milhares de linhas em poucos segundos, em lotes"""
+        def linhas():
+            yield "data;descricao;valor\n"
+            for i in range(30000):
+                yield f"{1 + i % 28:02d}/{1 + i % 12:02d}/2024;Compra {i};-{1 + i % 500},{i % 100:02d}\n"
+
+        t0 = time.perf_counter()
+        resumo = importar_extrato(self.user, linhas())
+        self.assertEqual(resumo['importadas'], 30000)
+        self.assertLess(time.perf_counter() - t0, 20)
+
+    def test_view_upload(self):
+        self.client.force_login(self.user)
+        arquivo = SimpleUploadedFile('extrato.csv', CSV.encode('utf-8'))
+        resposta = self.client.post(reverse('extrato_importar'), {'arquivo': arquivo, 'formato': 'auto'})
+
+        self.assertRedirects(resposta, reverse('financas'))
+        self.assertEqual(Transacao.objects.filter(user=self.user).count(), 5)
+
+    def test_view_cabecalho_invalido(self):
+        self.client.force_login(self.user)
+        arquivo = SimpleUploadedFile('extrato.csv', b"foo;bar\n1;2\n")
+        resposta = self.client.post(reverse('extrato_importar'), {'arquivo': arquivo, 'formato': 'csv'})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('coluna', resposta.context['form'].errors['arquivo'][0])
@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from core.models import Ativo, ContaPagar
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 
 class AtivoModelTest(TestCase):
     def setUp(self):
@@ -48,4 +49,46 @@ class ContaPagarModelTest(TestCase):
             user=self.user, titulo="Agua", valor=50, 
             data_vencimento=ontem, pago=True
         )
-        self.assertEqual(conta.status_vencimento, 'pago')
\ No newline at end of file
+        self.assertEqual(conta.status_vencimento, 'pago')
+class ParcelaCartaoTest(TestCase):
+    def setUp(self):
+        from core.models import CartaoCredito
+        self.user = User.objects.create_user(username='testuser', password='123')
+        self.cartao = CartaoCredito.objects.create(user=self.user, nome='Nubank', limite=1000, dia_vencimento=10)
+
+    def _criar(self, **kwargs):
+        from core.models import DespesaCartao
+        from datetime import date
+        dados = {'cartao': self.cartao, 'descricao': 'TV', 'valor': 100, 'parcelas': 3, 'data_compra': date(2025, 11, 20)}
+        dados.update(kwargs)
+        return DespesaCartao.objects.create(**dados)
+
+    def test_compra_expande_uma_parcela_por_mes(self):
+        """100 em 3x: os centavos que sobram vão para a última parcela"""
+        from datetime import date
+        despesa = self._criar()
+        parcelas = list(despesa.lancamentos.values_list('competencia', 'valor'))
+        self.assertEqual(parcelas, [
+            (date(2025, 11, 1), Decimal('33.33')),
+            (date(2025, 12, 1), Decimal('33.33')),
+            (date(2026, 1, 1), Decimal('33.34')),
+        ])
+
+    def test_edicao_e_exclusao_mantem_o_livro(self):
+        from core.models import ParcelaCartao
+        despesa = self._criar()
+        despesa.parcelas = 2
+        despesa.save()
+        self.assertEqual(ParcelaCartao.objects.filter(despesa=despesa).count(), 2)
+
+        despesa.delete()
+        self.assertFalse(ParcelaCartao.objects.exists())
+
+    def test_fatura_de_mes_futuro_no_financas(self):
+        from django.urls import reverse
+        self._criar()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('financas'), {'mes': 1, 'ano': 2026})
+        cartao = response.context['cartoes'][0]
+        self.assertEqual(cartao.fatura_atual, Decimal('33.34'))
+        self.assertEqual(cartao.total_gasto, Decimal('100'))
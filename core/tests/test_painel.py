@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.desafio_logic import criar_desafio, marcar_semanas
+from core.models import Transacao, Nota, Compromisso, ContaPagar, Desafio
+from core.painel_logic import versoes, invalidar_widgets
+
+
+class PainelCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.client.force_login(self.user)
+
+    def consultas(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            resposta = self.client.get(reverse('dashboard'))
+        return resposta, len(capturadas)
+
+    def test_sem_mudanca_nao_consulta_widgets(self):
+        """Com todos os fragmentos em cache, sobram sessão, usuário e as versões"""
+        Nota.objects.create(user=self.user, titulo='Mercado', conteudo='Leite')
+        _, primeira = self.consultas()
+        resposta, segunda = self.consultas()
+
+        self.assertLess(segunda, primeira)
+        self.assertEqual(segunda, 3)
+        self.assertContains(resposta, 'Mercado')
+
+    def test_so_o_widget_alterado_renderiza_de_novo(self):
+        self.consultas()
+        Transacao.objects.create(user=self.user, descricao='Salário', valor=5000, tipo='receita', data=timezone.now().date())
+
+        with CaptureQueriesContext(connection) as capturadas:
+            resposta = self.client.get(reverse('dashboard'))
+        tabelas = ' '.join(q['sql'] for q in capturadas)
+
+        self.assertContains(resposta, '5000.00')
+        self.assertIn('core_resumomensal', tabelas)  # caixa: versão nova
+        self.assertNotIn('core_nota', tabelas)       # notas: do cache
+        self.assertNotIn('core_contapagar', tabelas)
+
+    def test_signals_sobem_a_versao_do_dono(self):
+        outro = User.objects.create_user(username='outro', password='123')
+        antes, do_outro = versoes(self.user.pk), versoes(outro.pk)
+
+        Compromisso.objects.create(user=self.user, titulo='Dentista', data_hora=timezone.now() + timedelta(days=1))
+        conta = ContaPagar.objects.create(user=self.user, titulo='Luz', valor=100, data_vencimento=timezone.now().date())
+        conta.delete()
+
+        depois = versoes(self.user.pk)
+        self.assertNotEqual(depois['compromissos'], antes['compromissos'])
+        self.assertEqual(depois['contas'], antes['contas'] + 2)
+        self.assertEqual(depois['notas'], antes['notas'])
+        self.assertEqual(versoes(outro.pk), do_outro)
+
+    def test_desafio_em_lote_e_marcar_semanas(self):
+        """Caminhos sem signal (bulk_create/update) também invalidam o widget"""
+        desafio = criar_desafio(Desafio(user=self.user, objetivo='Viagem', valor_inicial=10, duracao_semanas=4))
+        self.assertContains(self.client.get(reverse('dashboard')), 'R$ 0 <small')
+
+        marcar_semanas(desafio, 1, 2)
+        self.assertContains(self.client.get(reverse('dashboard')), 'R$ 20 <small')
+
+    def test_versao_vale_para_todos_os_processos(self):
+        """A versão está no banco: outro worker, com o próprio cache local, não serve fragmento velho"""
+        Nota.objects.create(user=self.user, titulo='Antiga', conteudo='')
+        self.consultas()
+
+        # Escrita tratada "em outro processo": sem passar pelo cache deste
+        Nota.objects.filter(user=self.user).update(titulo='Nova')
+        invalidar_widgets(self.user.pk, 'notas')
+
+        resposta, _ = self.consultas()
+        self.assertContains(resposta, 'Nova')
+        self.assertNotContains(resposta, 'Antiga')
+
+    def test_usuario_novo_nao_herda_fragmentos(self):
+        versao = versoes(self.user.pk)['notas']
+        self.user.delete()
+        novo = User.objects.create_user(username='novo', password='123')
+        self.assertNotEqual(versoes(novo.pk)['notas'], versao)
@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.models import Transacao
+from core.perfilamento import metricas, texto_prometheus, Coleta
+
+LIGADO = {'ATIVO': True, 'AMOSTRAGEM': 1.0, 'LIMITE_REPETIDAS': 2, 'METRICAS_TOKEN': 'segredo'}
+
+
+class PerfilamentoTest(TestCase):
+    def setUp(self):
+        metricas.limpar()
+        self.user = User.objects.create_user(username='felipe', password='123')
+        Transacao.objects.create(user=self.user, descricao='Salário', valor=5000, tipo='receita', data=date.today())
+
+    def cliente(self):
+        # O middleware é montado na primeira requisição de cada Client
+        cliente = Client()
+        cliente.force_login(self.user)
+        return cliente
+
+    def test_desligado_nao_mede(self):
+        with override_settings(PERFILAMENTO={'ATIVO': False}):
+            resposta = self.cliente().get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', resposta)
+        self.assertEqual(metricas.copia(), {})
+
+    def test_server_timing_e_log(self):
+        with override_settings(PERFILAMENTO=LIGADO):
+            with self.assertLogs('core.perfilamento', level='INFO') as logs:
+                resposta = self.cliente().get(reverse('dashboard'))
+        cabecalho = resposta['Server-Timing']
+        for metrica in ('db;dur=', 'tpl;dur=', 'app;dur=', 'total;dur='):
+            self.assertIn(metrica, cabecalho)
+        self.assertIn('"view": "dashboard"', logs.output[0])
+        self.assertGreater(metricas.copia()['dashboard']['consultas'], 0)
+
+    def test_amostragem_zero(self):
+        with override_settings(PERFILAMENTO={**LIGADO, 'AMOSTRAGEM': 0.0}):
+            resposta = self.cliente().get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', resposta)
+
+    def test_detecta_queries_duplicadas(self):
+        coleta = Coleta()
+        for _ in range(3):
+            coleta.registrar_sql('SELECT 1 WHERE id = %s', (1,), 0.5)
+        coleta.registrar_sql('SELECT 1 WHERE id = %s', (2,), 0.5)
+        self.assertEqual(coleta.duplicadas(2), [('SELECT 1 WHERE id = %s', 3)])
+
+    def test_pagina_metrics(self):
+        with override_settings(PERFILAMENTO=LIGADO), self.assertLogs('core.perfilamento', level='INFO'):
+            self.cliente().get(reverse('dashboard'))
+            self.cliente().get(reverse('financas'))
+            anonimo = Client()
+            self.assertEqual(anonimo.get(reverse('metricas')).status_code, 404)
+            resposta = anonimo.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(resposta.status_code, 200)
+        texto = resposta.content.decode()
+        self.assertIn('agenda_requisicao_ms_count{view="dashboard"} 1', texto)
+        self.assertIn('agenda_requisicao_ms_bucket{view="financas",le="+Inf"} 1', texto)
+        # A própria página de métricas não entra no agregado
+        self.assertNotIn('view="metricas"', texto_prometheus())
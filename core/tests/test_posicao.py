@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Ativo, OperacaoInvestimento
+from core.posicao_logic import calcular_por_replay, conferir_posicao
+
+
+class PosicaoIncrementalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='investidor', password='123')
+        self.ativo = Ativo.objects.create(user=self.user, ticker='WEGE3', tipo='ACAO')
+        self.outro = Ativo.objects.create(user=self.user, ticker='ITSA4', tipo='ACAO')
+
+    def operar(self, tipo, quantidade, preco, taxas='0', ativo=None):
+        return OperacaoInvestimento.objects.create(
+            ativo=ativo or self.ativo, tipo=tipo, data=date(2025, 1, 10),
+            quantidade=Decimal(quantidade), preco_unitario=Decimal(preco), taxas=Decimal(taxas),
+        )
+
+    def test_compras_e_venda(self):
+        """Preço médio e lucro realizado saem só dos deltas"""
+        self.operar('C', '10', '20.00', '1.00')
+        self.operar('C', '10', '30.00', '1.00')
+        self.operar('V', '5', '40.00', '0.50')
+        self.operar('D', '0', '12.00')
+
+        self.ativo.refresh_from_db()
+        self.assertEqual(self.ativo.quantidade_atual, Decimal('15'))
+        self.assertEqual(self.ativo.preco_medio, Decimal('25.10'))
+        # 5 * 40 - 0.50 - 5 * 25.10
+        self.assertEqual(self.ativo.lucro_realizado(), Decimal('74.00'))
+        self.assertEqual(conferir_posicao(self.ativo, corrigir=False), {})
+
+    def test_editar_e_excluir(self):
+        """Editar desfaz o valor antigo; excluir subtrai a operação"""
+        compra = self.operar('C', '10', '20.00')
+        venda = self.operar('V', '4', '25.00')
+
+        compra.quantidade = Decimal('20')
+        compra.save()
+        venda.delete()
+
+        self.ativo.refresh_from_db()
+        self.assertEqual(self.ativo.quantidade_atual, Decimal('20'))
+        self.assertEqual(self.ativo.receita_vendas, Decimal('0'))
+        self.assertEqual(conferir_posicao(self.ativo, corrigir=False), {})
+
+    def test_trocar_ativo_da_operacao(self):
+        """A operação sai da posição antiga e entra na nova"""
+        compra = self.operar('C', '10', '20.00')
+        compra.ativo = self.outro
+        compra.save()
+
+        self.ativo.refresh_from_db()
+        self.outro.refresh_from_db()
+        self.assertEqual(self.ativo.quantidade_atual, Decimal('0'))
+        self.assertEqual(self.ativo.preco_medio, Decimal('0'))
+        self.assertEqual(self.outro.quantidade_atual, Decimal('10'))
+        self.assertEqual(self.outro.preco_medio, Decimal('20.00'))
+
+    def test_comando_reconstroi_posicoes(self):
+        """O rebuild em lote corrige acumuladores adulterados"""
+        self.operar('C', '10', '20.00')
+        self.operar('C', '5', '11.00', ativo=self.outro)
+        Ativo.objects.update(quantidade_comprada=0, custo_compras=0, quantidade_atual=0, preco_medio=0)
+
+        call_command('recalcular_posicoes', stdout=StringIO())
+
+        for ativo in Ativo.objects.all():
+            replay = calcular_por_replay(ativo)
+            self.assertEqual(ativo.quantidade_comprada, replay['quantidade_comprada'])
+            self.assertEqual(ativo.custo_compras, replay['custo_compras'])
+        self.assertEqual(Ativo.objects.get(pk=self.outro.pk).preco_medio, Decimal('11.00'))
+
+    def test_excluir_ativo_com_operacoes(self):
+        """O CASCADE das operações não quebra ao tentar atualizar o ativo"""
+        self.operar('C', '10', '20.00')
+        self.ativo.delete()
+        self.assertFalse(OperacaoInvestimento.objects.exists())
@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Transacao, ResumoMensal
+from core.resumo_logic import reconstruir_resumos, somar_transacoes, totais_desde
+
+
+def rollup(user):
+    return {
+        (r.mes, r.tipo, r.categoria): (r.total, r.quantidade)
+        for r in ResumoMensal.objects.filter(user=user, quantidade__gt=0)
+    }
+
+
+class ResumoMensalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+
+    def lancar(self, valor, tipo='despesa', categoria='lazer', data=date(2025, 3, 10)):
+        return Transacao.objects.create(
+            user=self.user, descricao='x', valor=Decimal(valor), tipo=tipo, categoria=categoria, data=data
+        )
+
+    def test_incremental_igual_a_reconstrucao(self):
+        """Criar, editar (valor, mês, categoria) e excluir mantém o rollup igual ao rebuild"""
+        salario = self.lancar('5000', tipo='receita', categoria='salario')
+        cinema = self.lancar('40')
+        mercado = self.lancar('300', categoria='alimentacao')
+
+        cinema.valor = Decimal('60')
+        cinema.data = date(2025, 4, 2)
+        cinema.save()
+        mercado.categoria = 'outros'
+        mercado.save()
+        salario.delete()
+
+        incremental = rollup(self.user)
+        self.assertEqual(incremental, {
+            (date(2025, 4, 1), 'despesa', 'lazer'): (Decimal('60'), 1),
+            (date(2025, 3, 1), 'despesa', 'outros'): (Decimal('300'), 1),
+        })
+        reconstruir_resumos()
+        self.assertEqual(rollup(self.user), incremental)
+
+    def test_soma_em_lote(self):
+        transacoes = Transacao.objects.bulk_create([
+            Transacao(user=self.user, descricao='x', valor=10, tipo='despesa', categoria='lazer', data=date(2025, 3, d))
+            for d in range(1, 11)
+        ])
+        somar_transacoes(transacoes)
+        self.assertEqual(rollup(self.user), {(date(2025, 3, 1), 'despesa', 'lazer'): (Decimal('100'), 10)})
+
+    def test_janela_com_mes_parcial(self):
+        """Os dias do mês de início anteriores a ele ficam de fora"""
+        self.lancar('100', tipo='receita', data=date(2025, 3, 5))
+        self.lancar('200', tipo='receita', data=date(2025, 3, 20))
+        self.lancar('50', data=date(2025, 4, 2))
+
+        self.assertEqual(totais_desde(self.user, date(2025, 3, 15)), (Decimal('200'), Decimal('50')))
+        self.assertEqual(totais_desde(self.user, date(2025, 3, 1)), (Decimal('300'), Decimal('50')))
+
+    def test_excluir_usuario(self):
+        self.lancar('10')
+        self.user.delete()
+        self.assertFalse(ResumoMensal.objects.exists())
+
+    def test_dashboard_e_categorias(self):
+        self.client.force_login(self.user)
+        self.lancar('1000', tipo='receita', categoria='salario', data=date(2020, 1, 5))
+        self.lancar('250', categoria='alimentacao')
+
+        resposta = self.client.get(reverse('dashboard'))
+        self.assertEqual(resposta.context['painel'].caixa['receitas'], Decimal('1000'))
+        self.assertEqual(resposta.context['painel'].caixa['despesas'], Decimal('250'))
+
+        resposta = self.client.get(reverse('financas'), {'mes': 3, 'ano': 2025})
+        self.assertEqual(resposta.context['despesas_mes'], Decimal('250'))
+        self.assertEqual([c['nome'] for c in resposta.context['categorias']], ['Alimentação'])
+
+    def test_comando(self):
+        self.lancar('10')
+        ResumoMensal.objects.all().delete()
+        call_command('reconstruir_resumos', usuario='felipe', stdout=StringIO())
+        self.assertEqual(rollup(self.user), {(date(2025, 3, 1), 'despesa', 'lazer'): (Decimal('10'), 1)})
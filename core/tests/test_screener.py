@@ -0,0 +1,183 @@
+import asyncio
+from unittest.mock import patch
+from django.test import TestCase
+from core.models import SnapshotScreener, PapelScreener, ExecucaoPipeline
+from core.screener_logic import COLUNAS, atualizar_snapshot
+from core.bot_logic import buscar_oportunidades_mercado
+from core.cache_mercado import get_cache_mercado
+
+
+def html_fundamentus(linhas):
+    """ Monta um resultado.php mínimo, no formato brasileiro do Fundamentus """
+    cabecalho = ''.join(f'<th>{c}</th>' for c in COLUNAS)
+    corpo = ''
+    for papel, cotacao, pl, pvp, dy, roe, liq in linhas:
+        valores = {
+            'Papel': papel, 'Cotação': cotacao, 'P/L': pl, 'P/VP': pvp, 'Div.Yield': dy,
+            'ROE': roe, 'Liq.2meses': liq,
+        }
+        corpo += '<tr>' + ''.join(f'<td>{valores.get(c, "0,00")}</td>' for c in COLUNAS) + '</tr>'
+    return f'<table id="resultado"><thead><tr>{cabecalho}</tr></thead><tbody>{corpo}</tbody></table>'
+
+
+HTML = html_fundamentus([
+    ('BOAS3', '10,50', '5,00', '0,90', '9,50%', '18,00%', '5.000.000,00'),
+    ('CARA3', '40,00', '30,00', '4,00', '1,00%', '8,00%', '9.000.000,00'),
+    ('MIUD3', '2,00', '4,00', '0,50', '12,00%', '20,00%', '10.000,00'),
+])
+
+
+class SnapshotScreenerTest(TestCase):
+    def setUp(self):
+        get_cache_mercado().limpar()
+
+    def test_parse_tipado(self):
+        snapshot, reprocessado = atualizar_snapshot(html=HTML)
+
+        self.assertTrue(reprocessado)
+        self.assertEqual(snapshot.total_papeis, 3)
+        boas = PapelScreener.objects.get(papel='BOAS3')
+        self.assertAlmostEqual(boas.cotacao, 10.5)
+        self.assertAlmostEqual(boas.dy, 0.095)
+        self.assertAlmostEqual(boas.liq_2meses, 5000000.0)
+
+    @patch('core.screener_logic.parse_tabela_fundamentus')
+    def test_hash_igual_nao_reprocessa(self, mock_parse):
+        """Se o HTML não mudou, o parse é pulado"""
+        mock_parse.side_effect = lambda html: __import__('core.screener_logic', fromlist=['x']).pd.DataFrame(
+            columns=list(COLUNAS.values())
+        )
+        primeiro, _ = atualizar_snapshot(html=HTML)
+        segundo, reprocessado = atualizar_snapshot(html=HTML)
+
+        self.assertFalse(reprocessado)
+        self.assertEqual(primeiro.pk, segundo.pk)
+        self.assertEqual(mock_parse.call_count, 1)
+
+    def test_resumo_das_etapas(self):
+        """Download, parse (read_html), limpeza e gravação ficam cronometrados"""
+        atualizar_snapshot(html=HTML)
+        execucao = ExecucaoPipeline.objects.get(pipeline='screener')
+        self.assertEqual(list(execucao.etapas), ['download', 'parse', 'limpeza', 'gravacao'])
+        self.assertEqual(execucao.total_falhas, 0)
+
+    def test_novo_html_substitui_snapshot(self):
+        atualizar_snapshot(html=HTML)
+        atualizar_snapshot(html=html_fundamentus([('NOVA3', '1,00', '1,00', '1,00', '1,00%', '1,00%', '1,00')]))
+
+        self.assertEqual(SnapshotScreener.objects.count(), 1)
+        self.assertEqual(list(PapelScreener.objects.values_list('papel', flat=True)), ['NOVA3'])
+
+
+class RadarSnapshotTest(TestCase):
+    @patch('core.screener_logic.baixar_html_fundamentus')
+    def test_radar_filtra_o_snapshot_sem_rede(self, mock_baixar):
+        atualizar_snapshot(html=HTML)
+        oportunidades = buscar_oportunidades_mercado()
+
+        mock_baixar.assert_not_called()
+        self.assertEqual([o['ticker'] for o in oportunidades], ['BOAS3'])
+        self.assertAlmostEqual(oportunidades[0]['detalhes']['dy'], 9.5)
+
+
+class MotorFiltrosTest(TestCase):
+    def setUp(self):
+        get_cache_mercado().limpar()
+        from core.screener_logic import parse_tabela_fundamentus
+        self.df = parse_tabela_fundamentus(HTML)
+
+    def test_mascara_unica_combina_criterios(self):
+        from core.screener_logic import aplicar_filtros
+        criterios = [
+            {'campo': 'dy', 'op': 'gte', 'valor': 0.09},
+            {'campo': 'pvp', 'op': 'lt', 'valor': 1},
+        ]
+        registros = aplicar_filtros(self.df, criterios, ordenar_por='roe')
+        self.assertEqual([r['papel'] for r in registros], ['MIUD3', 'BOAS3'])
+
+    def test_criterio_invalido(self):
+        from core.screener_logic import montar_mascara
+        with self.assertRaises(ValueError):
+            montar_mascara(self.df, [{'campo': 'papel', 'op': 'gt', 'valor': 1}])
+
+
+class PresetRadarViewTest(TestCase):
+    def setUp(self):
+        get_cache_mercado().limpar()
+        from django.contrib.auth.models import User
+        self.user = User.objects.create_user(username='investidor', password='123')
+        self.client.force_login(self.user)
+        atualizar_snapshot(html=HTML)
+
+    @patch('core.screener_logic.baixar_html_fundamentus')
+    def test_preset_avaliado_sobre_o_snapshot(self, mock_baixar):
+        """Um filtro salvo (sem exigência de liquidez) acha a small cap, sem baixar nada"""
+        from django.urls import reverse
+        from core.models import PresetScreener
+        self.client.post(reverse('preset_novo'), {
+            'nome': 'Small Caps', 'ordenar_por': 'dy', 'limite': 10, 'dy_min': '8', 'pvp_max': '1',
+        })
+        preset = PresetScreener.objects.get(user=self.user)
+
+        response = self.client.get(reverse('radar_mercado'), {'preset': preset.pk})
+
+        mock_baixar.assert_not_called()
+        self.assertEqual([o['ticker'] for o in response.context['oportunidades']], ['MIUD3', 'BOAS3'])
+
+    def test_preset_sem_filtros_nao_usa_o_padrao(self):
+        """Preset com todos os campos vazios lista o snapshot inteiro (sem cair em Graham & Bazin)"""
+        from django.urls import reverse
+        from core.models import PresetScreener
+        self.client.post(reverse('preset_novo'), {'nome': 'Tudo', 'ordenar_por': 'dy', 'limite': 10})
+        preset = PresetScreener.objects.get(user=self.user)
+        self.assertEqual(preset.criterios, [])
+
+        response = self.client.get(reverse('radar_mercado'), {'preset': preset.pk})
+        self.assertEqual([o['ticker'] for o in response.context['oportunidades']], ['MIUD3', 'BOAS3', 'CARA3'])
+
+    def test_preset_invalido_e_404(self):
+        """?preset= que não é número dá 404, não erro 500"""
+        from django.urls import reverse
+        response = self.client.get(reverse('radar_mercado'), {'preset': 'abc'})
+        self.assertEqual(response.status_code, 404)
+
+
+class RadarAsyncTest(TestCase):
+    def setUp(self):
+        get_cache_mercado().limpar()
+
+    async def test_primeira_carga_unica_para_requisicoes_simultaneas(self):
+        """Dezenas de requisições sem snapshot esperam um único download"""
+        from core.screener_logic import carregar_tabela_async
+        downloads = []
+
+        async def baixar():
+            downloads.append(1)
+            await asyncio.sleep(0.05)
+            return HTML
+
+        with patch('core.screener_logic.baixar_html_fundamentus_async', side_effect=baixar):
+            resultados = await asyncio.gather(*(carregar_tabela_async() for _ in range(24)))
+
+        self.assertEqual(len(downloads), 1)
+        self.assertEqual({snapshot.pk for snapshot, _ in resultados}, {resultados[0][0].pk})
+        self.assertEqual(len(resultados[-1][1]), 3)
+        self.assertEqual(await SnapshotScreener.objects.acount(), 1)
+
+    async def test_view_async(self):
+        from asgiref.sync import sync_to_async
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        await sync_to_async(atualizar_snapshot)(html=HTML)
+        user = await User.objects.acreate_user(username='investidor', password='123')
+        await self.async_client.aforce_login(user)
+
+        with patch('core.screener_logic.baixar_html_fundamentus_async') as mock_baixar:
+            response = await self.async_client.get(reverse('radar_mercado'))
+            preset_alheio = await self.async_client.get(reverse('radar_mercado'), {'preset': 999})
+
+        mock_baixar.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o['ticker'] for o in response.context['oportunidades']], ['BOAS3'])
+        self.assertEqual(preset_alheio.status_code, 404)
+
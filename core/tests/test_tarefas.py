@@ -0,0 +1,60 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from core.models import Tarefa
+from core.tarefas import enfileirar, processar_proxima
+
+
+class FilaTarefasTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='investidor', password='123')
+
+    def test_nao_duplica_tarefa_em_andamento(self):
+        """Apertar o botão duas vezes não cria duas análises"""
+        primeira, criada = enfileirar(self.user, 'analise_carteira')
+        segunda, criada_de_novo = enfileirar(self.user, 'analise_carteira')
+
+        self.assertTrue(criada)
+        self.assertFalse(criada_de_novo)
+        self.assertEqual(primeira.pk, segunda.pk)
+
+    @patch('core.tarefas.executar_analise_carteira')
+    def test_worker_executa_e_registra_resultado(self, mock_analise):
+        mock_analise.return_value = {'analisados': 3, 'falhas': []}
+        enfileirar(self.user, 'analise_carteira')
+
+        tarefa = processar_proxima()
+
+        self.assertEqual(tarefa.status, 'concluida')
+        self.assertEqual(tarefa.progresso, 100)
+        self.assertEqual(tarefa.resultado['analisados'], 3)
+        self.assertIsNone(processar_proxima())
+
+        # Terminada a anterior, uma nova análise pode ser enfileirada
+        _, criada = enfileirar(self.user, 'analise_carteira')
+        self.assertTrue(criada)
+
+    @patch('core.tarefas.executar_analise_carteira', side_effect=RuntimeError('Yahoo fora do ar'))
+    def test_erro_fica_registrado(self, mock_analise):
+        enfileirar(self.user, 'analise_carteira')
+        tarefa = processar_proxima()
+        self.assertEqual(tarefa.status, 'erro')
+        self.assertIn('Yahoo', tarefa.mensagem)
+
+
+class BotViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='investidor', password='123')
+        self.client.force_login(self.user)
+
+    @patch('core.tarefas.executar_analise_carteira')
+    def test_botao_apenas_enfileira(self, mock_analise):
+        """O request não roda o robô: só cria a tarefa e devolve o status"""
+        response = self.client.get(reverse('bot_executar'))
+        self.assertEqual(response.status_code, 302)
+        mock_analise.assert_not_called()
+
+        tarefa = Tarefa.objects.get(user=self.user)
+        status = self.client.get(reverse('tarefa_status', args=[tarefa.pk])).json()
+        self.assertEqual(status['status'], 'pendente')
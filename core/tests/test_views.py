@@ -1,3 +1,8 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
@@ -46,4 +51,205 @@ class TransacaoViewTest(TestCase):
         
         # Verifica se gravou no banco
         existe = Transacao.objects.filter(descricao='Salário Teste').exists()
-        self.assertTrue(existe)
\ No newline at end of file
+        self.assertTrue(existe)
+
+class DashboardAgregacaoTest(TestCase):
+    def setUp(self):
+        from core.models import CartaoCredito
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.client.force_login(self.user)
+        self.cartao = CartaoCredito.objects.create(user=self.user, nome='Nubank', limite=1000, dia_vencimento=10)
+        cache.clear()
+
+    def _compra(self, cartao, valor, parcelas, meses_atras):
+        from core.models import DespesaCartao
+        from django.utils import timezone
+        hoje = timezone.now().date().replace(day=1)
+        mes = hoje.month - meses_atras
+        ano = hoje.year + (mes - 1) // 12
+        mes = (mes - 1) % 12 + 1
+        return DespesaCartao.objects.create(
+            cartao=cartao, descricao='Compra', valor=valor, parcelas=parcelas,
+            data_compra=hoje.replace(year=ano, month=mes),
+        )
+
+    def test_fatura_do_mes_com_parcelas(self):
+        """Só entram as parcelas que caem no mês atual"""
+        self._compra(self.cartao, 300, 3, 2)   # 3ª parcela: entra (100)
+        self._compra(self.cartao, 300, 3, 3)   # já quitada: fora
+        self._compra(self.cartao, 100, 1, 0)   # à vista no mês: entra (100)
+        Transacao.objects.create(user=self.user, descricao='Salário', valor=5000, tipo='receita', data='2025-01-05')
+
+        response = self.client.get(reverse('dashboard'))
+
+        painel = response.context['painel']
+        self.assertEqual(painel.cartoes['valores'], [200.0])
+        self.assertEqual(painel.caixa['despesas'], 200)
+        self.assertEqual(painel.caixa['saldo'], 4800)
+
+    def test_quantidade_de_queries_constante(self):
+        """Mais cartões e compras não aumentam o número de queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import CartaoCredito
+
+        self._compra(self.cartao, 100, 2, 0)
+        cache.clear()  # mede a renderização completa, sem fragmentos em cache
+        with CaptureQueriesContext(connection) as poucos:
+            self.client.get(reverse('dashboard'))
+
+        for i in range(4):
+            cartao = CartaoCredito.objects.create(user=self.user, nome=f'Cartão {i}', limite=500, dia_vencimento=5)
+            for meses in range(10):
+                self._compra(cartao, 50, 12, meses)
+        cache.clear()
+        with CaptureQueriesContext(connection) as muitos:
+            self.client.get(reverse('dashboard'))
+
+        self.assertEqual(len(poucos), len(muitos))
+
+
+class FinancasFiltroMesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.client.force_login(self.user)
+
+    def test_limites_do_mes(self):
+        """O intervalo pega do dia 1 ao último dia, inclusive na virada do ano"""
+        for data in ['2024-11-30', '2024-12-01', '2024-12-31', '2025-01-01']:
+            Transacao.objects.create(user=self.user, descricao=data, valor=10, tipo='despesa', data=data)
+
+        response = self.client.get(reverse('financas'), {'mes': 12, 'ano': 2024})
+
+        self.assertEqual(
+            sorted(t.descricao for t in response.context['transacoes']), ['2024-12-01', '2024-12-31']
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', "Em tabelas minúsculas o Postgres prefere seq scan")
+    def test_extrato_usa_indice(self):
+        """O filtro por intervalo é sargable: o plano usa o índice (user, data)"""
+        from core.resumo_logic import intervalo_mes
+        inicio, fim = intervalo_mes(12, 2024)
+        plano = Transacao.objects.filter(user=self.user, data__gte=inicio, data__lt=fim).explain()
+        self.assertIn('transacao_user_data_idx', plano)
+
+
+class PaginacaoKeysetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.client.force_login(self.user)
+        # 60 transações em 3 dias: muitos empates na data, o id desempata
+        for i in range(60):
+            Transacao.objects.create(
+                user=self.user, descricao=f'T{i}', valor=10, tipo='despesa', data=f'2024-12-{10 + i % 3:02d}'
+            )
+
+    def test_primeira_pagina_limitada(self):
+        response = self.client.get(reverse('financas'), {'mes': 12, 'ano': 2024})
+        self.assertEqual(len(response.context['transacoes']), 25)
+        self.assertIsNotNone(response.context['proximo_cursor'])
+
+    def test_cursor_percorre_tudo_sem_repetir(self):
+        """Seguindo os cursores do JSON, cada transação aparece uma única vez"""
+        response = self.client.get(reverse('financas'), {'mes': 12, 'ano': 2024})
+        vistos = [t.pk for t in response.context['transacoes']]
+        cursor = response.context['proximo_cursor']
+        while cursor:
+            pagina = self.client.get(reverse('transacoes_api'), {'mes': 12, 'ano': 2024, 'cursor': cursor}).json()
+            vistos += [int(pk) for pk in re.findall(r'/financas/editar/(\d+)/', pagina['html'])]
+            cursor = pagina['proximo']
+
+        self.assertEqual(len(vistos), 60)
+        self.assertEqual(len(set(vistos)), 60)
+        esperado = Transacao.objects.order_by('-data', '-pk').values_list('pk', flat=True)
+        self.assertEqual(vistos, list(esperado))
+
+    def test_agenda_cursor_por_data_hora(self):
+        """O cursor também funciona com DateTimeField (agenda)"""
+        from core.models import Compromisso
+        from datetime import timedelta
+        from django.utils import timezone
+        agora = timezone.now()
+        for i in range(30):
+            Compromisso.objects.create(user=self.user, titulo=f'C{i}', data_hora=agora + timedelta(hours=1, minutes=i // 2))
+
+        primeira = self.client.get(reverse('agenda'))
+        pagina = self.client.get(reverse('agenda_api'), {'cursor': primeira.context['proximo_cursor']}).json()
+
+        self.assertEqual(pagina['quantidade'], 5)
+        self.assertIsNone(pagina['proximo'])
+
+    def test_agenda_comeca_nos_proximos(self):
+        """O histórico não empurra os próximos compromissos para trás do "Carregar mais" """
+        from core.models import Compromisso
+        from datetime import timedelta
+        from django.utils import timezone
+        agora = timezone.now()
+        for i in range(40):
+            Compromisso.objects.create(user=self.user, titulo=f'Antigo {i}', data_hora=agora - timedelta(days=i + 1))
+        Compromisso.objects.create(user=self.user, titulo='Amanhã', data_hora=agora + timedelta(days=1))
+        Compromisso.objects.create(user=self.user, titulo='Hoje', data_hora=agora + timedelta(hours=1))
+
+        proximos = self.client.get(reverse('agenda'))
+        self.assertEqual([c.titulo for c in proximos.context['compromissos']], ['Hoje', 'Amanhã'])
+        self.assertIsNone(proximos.context['proximo_cursor'])
+
+        # Os anteriores, do mais recente para trás, continuam paginados
+        passados = self.client.get(reverse('agenda'), {'passados': 1})
+        self.assertEqual(passados.context['compromissos'][0].titulo, 'Antigo 0')
+        pagina = self.client.get(reverse('agenda_api'), {
+            'passados': 1, 'cursor': passados.context['proximo_cursor'],
+        }).json()
+        self.assertEqual(pagina['quantidade'], 15)
+
+    def test_cursor_invalido(self):
+        response = self.client.get(reverse('notas_api'), {'cursor': 'lixo'})
+        self.assertEqual(response.status_code, 400)
+
+
+class InvestimentosDesafiosQueriesTest(TestCase):
+    """ Regressão de N+1: o número de queries não cresce com ativos/desafios """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='felipe', password='123')
+        self.client.force_login(self.user)
+
+    def popular(self, ativos, desafios, semanas=12):
+        from datetime import date, timedelta
+        from core.models import Ativo, AnaliseBot, Desafio, SemanaDesafio
+        for i in range(ativos):
+            ativo = Ativo.objects.create(user=self.user, ticker=f'ATV{i}', tipo='ACAO', quantidade_atual=1, preco_medio=10)
+            AnaliseBot.objects.create(ativo=ativo, recomendacao='AGUARDAR')
+        for i in range(desafios):
+            desafio = Desafio.objects.create(user=self.user, objetivo=f'Meta {i}', valor_inicial=10, duracao_semanas=semanas)
+            SemanaDesafio.objects.bulk_create([
+                SemanaDesafio(desafio=desafio, numero=n, data_prevista=date(2025, 1, 1) + timedelta(weeks=n),
+                              valor=10 * 2 ** (n - 1), pago=n <= 3)
+                for n in range(1, semanas + 1)
+            ])
+
+    def contar(self, nome_url):
+        from django.test.utils import CaptureQueriesContext
+        cache.clear()  # fragmentos do dashboard em cache esconderiam as queries
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse(nome_url))
+        return len(consultas)
+
+    def test_queries_constantes(self):
+        self.popular(1, 1)
+        poucos = {url: self.contar(url) for url in ['investimentos_dashboard', 'desafios_lista', 'dashboard']}
+
+        self.popular(49, 19)
+        muitos = {url: self.contar(url) for url in ['investimentos_dashboard', 'desafios_lista', 'dashboard']}
+
+        self.assertEqual(poucos, muitos)
+
+    def test_totais_anotados(self):
+        """As anotações dão o mesmo resultado que os aggregates dos métodos"""
+        from core.models import Desafio
+        self.popular(0, 2, semanas=4)
+        for anotado in Desafio.objects.com_totais():
+            original = Desafio.objects.get(pk=anotado.pk)
+            self.assertEqual(anotado.total_planejado(), original.total_planejado())
+            self.assertEqual(anotado.total_pago(), original.total_pago())
+            self.assertEqual(anotado.progresso_percentual(), original.progresso_percentual())
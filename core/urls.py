@@ -15,9 +15,11 @@ urlpatterns = [
 
     # --- MÓDULO FINANÇAS (Fluxo & Cartões) ---
     path('financas/', views.financas, name='financas'),
+    path('financas/transacoes.json', views.transacoes_api, name='transacoes_api'),
     
     # Transações
     path('financas/nova/', views.transacao_nova, name='transacao_nova'),
+    path('financas/importar/', views.extrato_importar, name='extrato_importar'),
     path('financas/editar/<int:id>/', views.transacao_editar, name='transacao_editar'),
     path('financas/deletar/<int:id>/', views.transacao_deletar, name='transacao_deletar'),
     
@@ -33,7 +35,11 @@ urlpatterns = [
     # --- MÓDULO INVESTIMENTOS (Novo & Separado) ---
     path('investimentos/', views.investimentos_dashboard, name='investimentos_dashboard'),
     path('investimentos/bot/executar/', views.bot_executar, name='bot_executar'),
+    path('investimentos/tarefas/<int:id>/', views.tarefa_status, name='tarefa_status'),
+    path('investimentos/desempenho.json', views.investimentos_desempenho, name='investimentos_desempenho'),
     path('investimentos/radar/', views.radar_mercado, name='radar_mercado'), 
+    path('investimentos/radar/filtro/novo/', views.preset_novo, name='preset_novo'),
+    path('investimentos/radar/filtro/deletar/<int:id>/', views.preset_deletar, name='preset_deletar'),
 
     
     # Ativos (Ações, FIIs, etc)
@@ -47,6 +53,7 @@ urlpatterns = [
 
     # --- MÓDULO AGENDA ---
     path('agenda/', views.agenda, name='agenda'),
+    path('agenda/itens.json', views.agenda_api, name='agenda_api'),
     path('agenda/nova/', views.agenda_nova, name='agenda_nova'),
     path('agenda/editar/<int:id>/', views.agenda_editar, name='agenda_editar'),
     path('agenda/deletar/<int:id>/', views.agenda_deletar, name='agenda_deletar'),
@@ -54,6 +61,7 @@ urlpatterns = [
 
     # --- MÓDULO NOTAS ---
     path('notas/', views.notas, name='notas'),    
+    path('notas/itens.json', views.notas_api, name='notas_api'),
     path('notas/nova/', views.nota_nova, name='nota_nova'),
     path('notas/editar/<int:id>/', views.nota_editar, name='nota_editar'),
     path('notas/deletar/<int:id>/', views.nota_deletar, name='nota_deletar'), 
@@ -62,6 +70,7 @@ urlpatterns = [
     path('desafios/', views.desafios_lista, name='desafios_lista'),
     path('desafios/novo/', views.desafio_novo, name='desafio_novo'),
     path('desafios/pagar/<int:id>/', views.desafio_pagar_semana, name='desafio_pagar_semana'),
+    path('desafios/<int:id>/semanas/', views.desafio_marcar_semanas, name='desafio_marcar_semanas'),
     path('desafios/excluir/<int:id>/', views.desafio_excluir, name='desafio_excluir'),
 
     # --- MÓDULO CONTAS A PAGAR ---
@@ -75,4 +84,8 @@ urlpatterns = [
     # --- CONFIGURAÇÕES ---
     path('configuracoes/', views.configuracoes, name='configuracoes'),
     path('configuracoes/senha/', views.alterar_senha, name='alterar_senha'),
+    path('configuracoes/exportar/', views.exportar_dados, name='exportar_dados'),
+
+    # --- MÉTRICAS (perfilamento opt-in) ---
+    path('metrics', views.metricas, name='metricas'),
 ]
\ No newline at end of file
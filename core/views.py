@@ -1,213 +1,141 @@
+import logging
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponse, Http404
+from django.urls import reverse
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, F
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.db import transaction
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
-from datetime import datetime, timedelta
-from .health_logic import gerar_diagnostico_financeiro
-from .bot_logic import executar_analise_carteira, buscar_oportunidades_mercado
+from datetime import date, datetime, timedelta
+from .health_logic import obter_diagnostico
+from .bot_logic import buscar_oportunidades_mercado_async
 
 # Importação dos Models e Forms
 from .models import (
     Compromisso, Nota, Transacao, CartaoCredito, DespesaCartao, 
     Ativo, OperacaoInvestimento, Desafio, SemanaDesafio, ContaPagar, 
-    AnaliseBot  # <--- ADICIONADO AQUI
+    AnaliseBot, Tarefa, SnapshotScreener, PresetScreener
 )
 from .forms import (
     TransacaoForm, CompromissoForm, NotaForm, PerfilForm, CartaoForm, 
     DespesaCartaoForm, AtivoForm, OperacaoInvestimentoForm, DesafioForm, 
-    UsuarioRegistroForm, ContaPagarForm
+    UsuarioRegistroForm, ContaPagarForm, PresetScreenerForm, ImportarExtratoForm,
+    ExportarDadosForm
 )
 
-# Importação da Lógica do Robô
-from .bot_logic import executar_analise_carteira  # <--- ADICIONADO AQUI
+# Fila de tarefas em segundo plano (Robô)
+from .tarefas import enfileirar
+from .desafio_logic import criar_desafio, marcar_semanas
+from .desempenho_logic import desempenho_usuario, resumir_serie
+from .medicao import ultima_execucao
+# Rollup mensal do caixa (totais sem varrer o histórico)
+from .resumo_logic import resumo_por_categoria, intervalo_mes
+# Widgets do dashboard em cache (fragmentos versionados por usuário)
+from .painel_logic import PainelDashboard, cartoes_com_fatura
+# Importação de extratos (CSV/OFX)
+from .importacao_logic import importar_extrato, detectar_formato, ErroImportacao
+# Exportação (backup) em streaming
+from .exportacao_logic import exportar, nome_arquivo
+# Perfilamento por requisição (opt-in)
+from .perfilamento import texto_prometheus, pode_ver_metricas
+# Paginação por cursor (listas longas)
+from .paginacao import paginar_keyset, TAMANHO_PAGINA
+
+logger = logging.getLogger(__name__)
 
 # --- FUNÇÃO AUXILIAR (Helper) ---
-def recalcular_ativo(ativo):
+def filtro_mes(request):
+    """ Mês/ano da URL (?mes=1&ano=2025); se faltar ou for inválido, o atual """
+    agora = timezone.now()
+    try:
+        mes = int(request.GET.get('mes', agora.month))
+        ano = int(request.GET.get('ano', agora.year))
+        date(ano, mes, 1)  # Valida o mês (1-12) e o ano
+    except ValueError:
+        mes, ano = agora.month, agora.year
+    return mes, ano
+
+def transacoes_do_mes(user, mes, ano):
+    # Intervalo [dia 1, dia 1 do mês seguinte): usa o índice (user, data)
+    inicio, fim = intervalo_mes(mes, ano)
+    return Transacao.objects.filter(user=user, data__gte=inicio, data__lt=fim)
+
+def compromissos_da_agenda(request):
     """
-    Recalcula a quantidade e preço médio do ativo baseada em todas as operações.
-    Chamada sempre que se cria, edita ou exclui uma operação.
+    (queryset, decrescente) da agenda: os próximos, a partir de agora e do
+    mais perto; com ?passados=1, os anteriores, do mais recente para trás.
     """
-    compras = OperacaoInvestimento.objects.filter(ativo=ativo, tipo='C').aggregate(Sum('quantidade'))['quantidade__sum'] or 0
-    vendas = OperacaoInvestimento.objects.filter(ativo=ativo, tipo='V').aggregate(Sum('quantidade'))['quantidade__sum'] or 0
-    ativo.quantidade_atual = compras - vendas
-    
-    if ativo.quantidade_atual > 0:
-        total_gasto = 0
-        todas_compras = OperacaoInvestimento.objects.filter(ativo=ativo, tipo='C')
-        for c in todas_compras:
-            # Soma: (Qtd * Preço) + Taxas
-            total_gasto += (c.quantidade * c.preco_unitario) + c.taxas
-        
-        # Preço Médio Simples = Total Gasto / Total de Cotas Compradas
-        ativo.preco_medio = total_gasto / compras
-    else:
-        ativo.preco_medio = 0
-    ativo.save()
+    agora = timezone.now()
+    compromissos = Compromisso.objects.filter(user=request.user)
+    if request.GET.get('passados'):
+        return compromissos.filter(data_hora__lt=agora), True
+    return compromissos.filter(data_hora__gte=agora), False
+
+def pagina_json(request, queryset, campo, template, nome, decrescente=False):
+    """ Próxima página (keyset) renderizada pelo mesmo parcial da página inicial """
+    try:
+        itens, proximo = paginar_keyset(
+            queryset, campo, request.GET.get('cursor'),
+            request.GET.get('tamanho', TAMANHO_PAGINA), decrescente,
+        )
+    except ValueError:
+        return JsonResponse({'erro': 'Cursor ou tamanho inválido.'}, status=400)
+    html = render_to_string(template, {nome: itens}, request=request)
+    return JsonResponse({'html': html, 'proximo': proximo, 'quantidade': len(itens)})
 
 # --- DASHBOARD PRINCIPAL ---
 
 @login_required
 def dashboard(request):
-    agora = timezone.now()
-    mes_atual = agora.month
-    ano_atual = agora.year
-
-    # 1. DADOS FINANCEIROS BÁSICOS (Fluxo de Caixa)
-    receitas = Transacao.objects.filter(user=request.user, tipo='receita').aggregate(Sum('valor'))['valor__sum'] or 0
-    despesas_caixa = Transacao.objects.filter(user=request.user, tipo='despesa').aggregate(Sum('valor'))['valor__sum'] or 0
-    
-    # --- CÁLCULO DA FATURA TOTAL DOS CARTÕES (PARA SOMAR NAS DESPESAS) ---
-    fatura_total_cartoes = 0
-    cartoes = CartaoCredito.objects.filter(user=request.user)
-    
-    # Listas para o Gráfico de Cartões
-    labels_cartao = []
-    data_cartao = []
-    colors_cartao = []
-
-    for cartao in cartoes:
-        despesas = DespesaCartao.objects.filter(cartao=cartao)
-        fatura_deste_cartao = 0
-        limite_tomado = 0
-
-        for despesa in despesas:
-            limite_tomado += despesa.valor # Total da dívida para cor da barra
-
-            # Lógica da Parcela Mensal
-            valor_parcela = despesa.valor / despesa.parcelas
-            meses_passados = (ano_atual - despesa.data_compra.year) * 12 + (mes_atual - despesa.data_compra.month)
-            
-            if 0 <= meses_passados < despesa.parcelas:
-                fatura_deste_cartao += valor_parcela
-
-        # Soma ao total geral de despesas
-        fatura_total_cartoes += fatura_deste_cartao
-        
-        # Prepara dados para o Gráfico
-        labels_cartao.append(cartao.nome)
-        data_cartao.append(float(fatura_deste_cartao)) # <--- Agora exibe a Fatura, não o Total
-        
-        # Define a cor baseada no LIMITE (ainda é útil ver se o cartão está estourado)
-        uso = (limite_tomado / cartao.limite) * 100 if cartao.limite > 0 else 0
-        if uso > 80:
-            colors_cartao.append('#e74a3b') # Vermelho
-        elif uso > 50:
-            colors_cartao.append('#f6c23e') # Amarelo
-        else:
-            colors_cartao.append('#4e73df') # Azul
-
-    # O "Despesas Mês" agora é: Gastos em Dinheiro + Fatura dos Cartões
-    total_despesas = despesas_caixa + fatura_total_cartoes
-    saldo = receitas - total_despesas
-
-    # 2. DADOS PARA O GRÁFICO DE APORTES (INVESTIMENTOS)
-    data_limite = agora.date() - timedelta(days=180)
-    aportes = OperacaoInvestimento.objects.filter(
-        ativo__user=request.user, 
-        tipo='C', 
-        data__gte=data_limite
-    ).order_by('data')
-
-    aportes_mes = {}
-    for aporte in aportes:
-        mes_ano = aporte.data.strftime("%b/%y")
-        valor = (aporte.quantidade * aporte.preco_unitario) + aporte.taxas
-        if mes_ano in aportes_mes:
-            aportes_mes[mes_ano] += float(valor)
-        else:
-            aportes_mes[mes_ano] = float(valor)
-
-    labels_invest = list(aportes_mes.keys())
-    data_invest = list(aportes_mes.values())
-
-    # 3. AGENDA E NOTAS
-    proximos_compromissos = Compromisso.objects.filter(
-        user=request.user, data_hora__gte=agora, concluido=False
-    ).order_by('data_hora')[:3]
-    notas = Nota.objects.filter(user=request.user).order_by('-atualizado_em')[:2]
-
-    # 4. DESAFIO ATIVO
-    desafio_ativo = Desafio.objects.filter(user=request.user, concluido=False).first()
-
-    # 5. CONTAS A PAGAR
-    contas_pendentes = ContaPagar.objects.filter(user=request.user, pago=False).order_by('data_vencimento')
-
-    context = {
-        'receitas': receitas,
-        'despesas': total_despesas,
-        'saldo': saldo,
-        'compromissos': proximos_compromissos,
-        'notas': notas,
-        'labels_invest': labels_invest,
-        'data_invest': data_invest,
-        'labels_cartao': labels_cartao,
-        'data_cartao': data_cartao,
-        'colors_cartao': colors_cartao,
-        'desafio_ativo': desafio_ativo,
-        'contas_pendentes': contas_pendentes, 
-    }
-    return render(request, 'dashboard.html', context)
+    # Cada widget é um fragmento em cache por usuário (painel_logic): os dados
+    # só são buscados para os fragmentos cuja versão mudou
+    painel = PainelDashboard(request.user)
+    return render(request, 'dashboard.html', {'painel': painel})
 
 # --- FINANÇAS (FLUXO E CARTÕES) ---
 @login_required
 def financas(request):
     # --- 1. CONFIGURAÇÃO DO FILTRO DE DATA ---
-    agora = timezone.now()
-    
-    # Tenta pegar da URL (?mes=1&ano=2025), se não tiver, usa o atual
-    mes_filtro = request.GET.get('mes', agora.month)
-    ano_filtro = request.GET.get('ano', agora.year)
-    
-    try:
-        mes_filtro = int(mes_filtro)
-        ano_filtro = int(ano_filtro)
-    except ValueError:
-        mes_filtro = agora.month
-        ano_filtro = agora.year
+    mes_filtro, ano_filtro = filtro_mes(request)
 
     # --- 2. FLUXO DE CAIXA (FILTRADO) ---
-    transacoes = Transacao.objects.filter(
-        user=request.user,
-        data__month=mes_filtro,
-        data__year=ano_filtro
-    ).order_by('-data')
+    # Só a primeira página; o resto vem do transacoes_api ("Carregar mais")
+    transacoes, proximo_cursor = paginar_keyset(
+        transacoes_do_mes(request.user, mes_filtro, ano_filtro), 'data', decrescente=True
+    )
 
     # --- 3. CARTÕES DE CRÉDITO (PROJEÇÃO DA FATURA) ---
-    cartoes = CartaoCredito.objects.filter(user=request.user)
+    # Fatura calculada para o Mês/Ano SELECIONADO pelo usuário
+    cartoes = cartoes_com_fatura(request.user, mes_filtro, ano_filtro)
     
     for cartao in cartoes:
-        despesas = DespesaCartao.objects.filter(cartao=cartao)
-        fatura_mes = 0 
-        total_divida = 0 
-
-        for despesa in despesas:
-            total_divida += despesa.valor 
-
-            # LÓGICA DE PROJEÇÃO:
-            # Calcula a parcela baseada no Mês/Ano SELECIONADO pelo usuário
-            valor_parcela = despesa.valor / despesa.parcelas
-            
-            # Quantos meses se passaram da compra até a data do filtro?
-            meses_passados = (ano_filtro - despesa.data_compra.year) * 12 + (mes_filtro - despesa.data_compra.month)
-            
-            # Se o resultado estiver entre 0 e o número de parcelas, a conta cai neste mês filtrado
-            if 0 <= meses_passados < despesa.parcelas:
-                fatura_mes += valor_parcela
-        
-        cartao.fatura_atual = fatura_mes
-        cartao.total_gasto = total_divida
-        cartao.disponivel = cartao.limite - total_divida
+        cartao.fatura_atual = cartao.fatura
+        cartao.total_gasto = cartao.limite_tomado
+        cartao.disponivel = cartao.limite - cartao.limite_tomado
         
         if cartao.limite > 0:
-            cartao.porcentagem_uso = (total_divida / cartao.limite) * 100
+            cartao.porcentagem_uso = (cartao.limite_tomado / cartao.limite) * 100
         else:
             cartao.porcentagem_uso = 0
 
+    # --- 4. RESUMO DO MÊS POR CATEGORIA (rollup) ---
+    categorias = resumo_por_categoria(request.user, date(ano_filtro, mes_filtro, 1))
+    receitas_mes = sum(c['total'] for c in categorias if c['tipo'] == 'receita')
+    despesas_mes = sum(c['total'] for c in categorias if c['tipo'] == 'despesa')
+
     context = {
         'transacoes': transacoes,
+        'proximo_cursor': proximo_cursor,
+        'categorias': categorias,
+        'receitas_mes': receitas_mes,
+        'despesas_mes': despesas_mes,
         'cartoes': cartoes,
         'mes_atual': mes_filtro,
         'ano_atual': ano_filtro,
@@ -218,44 +146,150 @@ def financas(request):
 
 @login_required
 def investimentos_dashboard(request):
-    ativos = Ativo.objects.filter(user=request.user)
+    # list(): a soma e o template usam a mesma query
+    ativos = list(Ativo.objects.filter(user=request.user))
     total_investido = sum(a.total_investido() for a in ativos)
     
-    # Busca as análises salvas para exibir no Template
-    analises = AnaliseBot.objects.filter(ativo__user=request.user).order_by('-pontuacao')
+    # Busca as análises salvas para exibir no Template (com o ativo no mesmo JOIN)
+    analises = AnaliseBot.objects.filter(ativo__user=request.user).select_related('ativo').order_by('-pontuacao')
+
+    # Última análise enfileirada (para a barra de progresso)
+    tarefa = Tarefa.objects.filter(user=request.user, tipo='analise_carteira').order_by('-criado_em').first()
+
+    # Tempos da última execução do robô (etapas e símbolos mais lentos)
+    execucao = ultima_execucao('robo', request.user)
 
     context = {
         'ativos': ativos,
         'total_investido': total_investido,
         'analises': analises, 
+        'tarefa': tarefa,
+        'execucao': execucao,
     }
     return render(request, 'investimentos.html', context)
 
 @login_required
-def bot_executar(request):
-    """ Botão que roda a análise """
-    try:
-        executar_analise_carteira(request.user)
-        messages.success(request, "Robô finalizou a análise da carteira!")
-    except Exception as e:
-        messages.error(request, f"Erro ao rodar o robô: {str(e)}")
-        
+async def bot_executar(request):
+    """ Botão que coloca a análise na fila (o worker executa em segundo plano) """
+    user = await request.auser()
+    tarefa, criada = await sync_to_async(enfileirar)(user, 'analise_carteira')
+    if criada:
+        messages.success(request, "Análise enfileirada! O robô está trabalhando na sua carteira.")
+    else:
+        messages.info(request, "O robô já está analisando sua carteira. Aguarde a conclusão.")
+
     return redirect('investimentos_dashboard')
 
+@login_required
+def tarefa_status(request, id):
+    """ Consulta de andamento usada pelo polling da página de investimentos """
+    tarefa = get_object_or_404(Tarefa, pk=id, user=request.user)
+    return JsonResponse({
+        'id': tarefa.pk,
+        'status': tarefa.status,
+        'progresso': tarefa.progresso,
+        'mensagem': tarefa.mensagem,
+        'resultado': tarefa.resultado,
+    })
+
+@login_required
+def investimentos_desempenho(request):
+    """ Série diária, TWR, XIRR e contribuição por ativo (gráfico da página de investimentos) """
+    hoje = timezone.now().date()
+    try:
+        fim = date.fromisoformat(request.GET['fim']) if request.GET.get('fim') else hoje
+        inicio = date.fromisoformat(request.GET['inicio']) if request.GET.get('inicio') else fim - timedelta(days=365)
+    except ValueError:
+        return JsonResponse({'erro': 'Datas inválidas (use AAAA-MM-DD).'}, status=400)
+    if inicio > fim:
+        return JsonResponse({'erro': 'O início deve ser anterior ao fim.'}, status=400)
+
+    resultado = desempenho_usuario(request.user, inicio=inicio, fim=fim)
+    serie = resumir_serie(resultado['serie'])
+    return JsonResponse({
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'twr': resultado['twr'],
+        'xirr': resultado['xirr'],
+        'serie': {
+            'datas': [d.strftime('%Y-%m-%d') for d in serie.index],
+            'valor': [round(v, 2) for v in serie['valor']] if len(serie) else [],
+            'twr': [round(v * 100, 2) for v in serie['twr']] if len(serie) else [],
+        },
+        'contribuicoes': [
+            {**c, 'resultado': round(c['resultado'], 2), 'contribuicao': round(c['contribuicao'] * 100, 2),
+             'valor_final': round(c['valor_final'], 2)}
+            for c in resultado['contribuicoes']
+        ],
+    })
+
 # --- AGENDA & NOTAS (Listas) ---
 
 @login_required
 def agenda(request):
-    compromissos = Compromisso.objects.filter(user=request.user).order_by('data_hora')
-    return render(request, 'agenda.html', {'compromissos': compromissos})
+    queryset, decrescente = compromissos_da_agenda(request)
+    compromissos, proximo_cursor = paginar_keyset(queryset, 'data_hora', decrescente=decrescente)
+    return render(request, 'agenda.html', {
+        'compromissos': compromissos, 'proximo_cursor': proximo_cursor, 'passados': decrescente,
+    })
 
 @login_required
 def notas(request):
-    todas_notas = Nota.objects.filter(user=request.user).order_by('-atualizado_em')
-    return render(request, 'notas.html', {'notas': todas_notas})
+    todas_notas, proximo_cursor = paginar_keyset(
+        Nota.objects.filter(user=request.user), 'atualizado_em', decrescente=True
+    )
+    return render(request, 'notas.html', {'notas': todas_notas, 'proximo_cursor': proximo_cursor})
+
+# --- API DE LISTAGEM (páginas seguintes, em JSON) ---
+
+@login_required
+def transacoes_api(request):
+    mes, ano = filtro_mes(request)
+    return pagina_json(
+        request, transacoes_do_mes(request.user, mes, ano), 'data',
+        'parciais/transacoes_linhas.html', 'transacoes', decrescente=True,
+    )
+
+@login_required
+def agenda_api(request):
+    queryset, decrescente = compromissos_da_agenda(request)
+    return pagina_json(
+        request, queryset, 'data_hora', 'parciais/agenda_itens.html', 'compromissos', decrescente=decrescente,
+    )
+
+@login_required
+def notas_api(request):
+    return pagina_json(
+        request, Nota.objects.filter(user=request.user), 'atualizado_em',
+        'parciais/notas_cards.html', 'notas', decrescente=True,
+    )
 
 # --- CRUD TRANSAÇÕES (CAIXA) ---
 
+@login_required
+def extrato_importar(request):
+    """ Upload de extrato CSV/OFX, lido em streaming e gravado em lotes """
+    form = ImportarExtratoForm(request.POST or None, request.FILES or None)
+    form.fields['cartao'].queryset = CartaoCredito.objects.filter(user=request.user)
+    if request.method == 'POST' and form.is_valid():
+        arquivo = form.cleaned_data['arquivo']
+        formato = form.cleaned_data['formato']
+        if formato == 'auto':
+            formato = detectar_formato(arquivo.name)
+        try:
+            resumo = importar_extrato(request.user, arquivo, formato=formato, cartao=form.cleaned_data['cartao'])
+        except ErroImportacao as erro:
+            form.add_error('arquivo', str(erro))
+        else:
+            messages.success(request, (
+                f"{resumo['importadas']} lançamento(s) importado(s), {resumo['duplicadas']} já existente(s), "
+                f"{resumo['ignoradas']} ignorado(s)."
+            ))
+            for erro in resumo['erros'][:5]:
+                messages.warning(request, erro)
+            return redirect('financas')
+    return render(request, 'importar_extrato.html', {'form': form})
+
 @login_required
 def transacao_nova(request):
     if request.method == 'POST':
@@ -372,7 +406,25 @@ def configuracoes(request):
             return redirect('configuracoes')
     else:
         form = PerfilForm(instance=request.user)
-    return render(request, 'configuracoes.html', {'form': form})
+    return render(request, 'configuracoes.html', {'form': form, 'form_exportar': ExportarDadosForm()})
+
+@login_required
+def exportar_dados(request):
+    """ Backup do histórico em streaming (memória constante, qualquer tamanho) """
+    form = ExportarDadosForm(request.GET)
+    if not form.is_valid():
+        for erros in form.errors.values():
+            messages.error(request, erros[0])
+        return redirect('configuracoes')
+
+    formato = form.cleaned_data['formato']
+    tabela = form.cleaned_data['tabela'] or None
+    conteudo = exportar(request.user, formato=formato, tabela=tabela, desde=form.cleaned_data['desde'])
+    tipos = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8', 'zip': 'application/zip'}
+    resposta = StreamingHttpResponse(conteudo, content_type=tipos[formato])
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo(formato, tabela)}"'
+    resposta['Cache-Control'] = 'no-store'
+    return resposta
 
 @login_required
 def alterar_senha(request):
@@ -476,8 +528,9 @@ def operacao_nova(request):
             if operacao.ativo.user != request.user:
                 return redirect('investimentos_dashboard')
             
-            operacao.save()
-            recalcular_ativo(operacao.ativo)
+            # A posição do ativo é atualizada pelo delta (core/signals.py)
+            with transaction.atomic():
+                operacao.save()
             
             return redirect('investimentos_dashboard')
     else:
@@ -494,8 +547,8 @@ def operacao_editar(request, id):
     if request.method == 'POST':
         form = OperacaoInvestimentoForm(request.POST, instance=operacao)
         if form.is_valid():
-            operacao = form.save()
-            recalcular_ativo(operacao.ativo) 
+            with transaction.atomic():
+                operacao = form.save()
             return redirect('investimentos_dashboard')
     else:
         form = OperacaoInvestimentoForm(instance=operacao)
@@ -506,15 +559,15 @@ def operacao_deletar(request, id):
     operacao = get_object_or_404(OperacaoInvestimento, pk=id)
     ativo = operacao.ativo
     if ativo.user == request.user:
-        operacao.delete()
-        recalcular_ativo(ativo) 
+        with transaction.atomic():
+            operacao.delete()
     return redirect('investimentos_dashboard')
 
 # --- MÓDULO DE DESAFIOS & METAS ---
 
 @login_required
 def desafios_lista(request):
-    desafios = Desafio.objects.filter(user=request.user, concluido=False)
+    desafios = Desafio.objects.filter(user=request.user, concluido=False).com_totais().prefetch_related('semanas')
     return render(request, 'desafios.html', {'desafios': desafios})
 
 # core/views.py
@@ -527,32 +580,8 @@ def desafio_novo(request):
             desafio = form.save(commit=False)
             desafio.user = request.user
             
-            # Garante que incremento não seja None para não dar erro na conta
-            if not desafio.incremento:
-                desafio.incremento = 0
-                
-            desafio.save()
-
-            data_atual = desafio.data_inicio
-            
-            # Gera as semanas
-            for i in range(1, desafio.duracao_semanas + 1):
-                
-                # LÓGICA ANTIGA (Aritmética):
-                # Valor = Inicial + ((Semana - 1) * Aumento)
-                acrescimo = (i - 1) * desafio.incremento
-                valor_semana = desafio.valor_inicial + acrescimo
-                
-                SemanaDesafio.objects.create(
-                    desafio=desafio,
-                    numero=i,
-                    data_prevista=data_atual,
-                    valor=valor_semana,
-                    pago=False
-                )
-                
-                # Avança 7 dias
-                data_atual = data_atual + timedelta(days=7)
+            # Desafio + todas as semanas num único bulk_create (mesma transação)
+            criar_desafio(desafio)
 
             messages.success(request, 'Desafio criado com sucesso!')
             return redirect('investimentos_dashboard')
@@ -571,6 +600,23 @@ def desafio_pagar_semana(request, id):
         semana.save()
     return redirect('desafios_lista')
 
+@login_required
+def desafio_marcar_semanas(request, id):
+    """ Paga/desmarca um intervalo de semanas (de..ate) de uma vez """
+    desafio = get_object_or_404(Desafio, pk=id, user=request.user)
+    if request.method == 'POST':
+        try:
+            de = int(request.POST.get('de', 1))
+            ate = int(request.POST.get('ate', desafio.duracao_semanas))
+        except ValueError:
+            messages.error(request, 'Informe números de semana válidos.')
+            return redirect('desafios_lista')
+
+        pagar = request.POST.get('acao') != 'desmarcar'
+        alteradas = marcar_semanas(desafio, min(de, ate), max(de, ate), pago=pagar)
+        messages.success(request, f"{alteradas} semana(s) {'paga(s)' if pagar else 'desmarcada(s)'}.")
+    return redirect('desafios_lista')
+
 @login_required
 def desafio_excluir(request, id):
     desafio = get_object_or_404(Desafio, pk=id)
@@ -655,9 +701,20 @@ def conta_pagar_deletar(request, id):
     conta.delete()
     return redirect('dashboard')
 
+def _snapshot_saude(request):
+    """ Snapshot do diagnóstico, lido uma vez por request (ETag e view) """
+    if not hasattr(request, '_snapshot_saude'):
+        request._snapshot_saude = obter_diagnostico(request.user)
+    return request._snapshot_saude
+
+def _etag_saude(request):
+    return _snapshot_saude(request).etag
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_saude)
 def saude_financeira(request):
-    diagnostico = gerar_diagnostico_financeiro(request.user)
+    diagnostico = _snapshot_saude(request).como_dict()
     
     # Define cor do Score
     cor_score = 'success'
@@ -677,17 +734,62 @@ def saude_financeira(request):
     return render(request, 'saude_financeira.html', context)
 
 @login_required
-def radar_mercado(request):
+async def radar_mercado(request):
     """
-    Varre o mercado e retorna apenas as TOP oportunidades (COM DEBUG)
+    Varre o mercado e retorna apenas as TOP oportunidades.
+    ?preset=<id> aplica um filtro salvo pelo usuário sobre o mesmo snapshot.
+    View async: no ASGI, a primeira carga do Fundamentus não prende um worker.
     """
-    # Chama a função que busca no Fundamentus
-    oportunidades = buscar_oportunidades_mercado()
-    
-    # --- DEBUG: Mostra no terminal o que chegou ---
-    print(f"--- [VIEW DEBUG] A View recebeu {len(oportunidades)} oportunidades. ---")
-    
+    user = await request.auser()
+    presets = [p async for p in PresetScreener.objects.filter(user=user)]
+    preset = None
+    if request.GET.get('preset'):
+        try:
+            preset_id = int(request.GET['preset'])
+        except (TypeError, ValueError):
+            raise Http404()
+        preset = await PresetScreener.objects.filter(pk=preset_id, user=user).afirst()
+        if preset is None:
+            raise Http404()
+
+    # Chama a função que filtra o snapshot do Fundamentus
+    if preset:
+        oportunidades = await buscar_oportunidades_mercado_async(preset.criterios, preset.ordenar_por, preset.limite)
+    else:
+        oportunidades = await buscar_oportunidades_mercado_async()
+    logger.debug("Radar: %d oportunidades", len(oportunidades))
+
     context = {
-        'oportunidades': oportunidades
+        'oportunidades': oportunidades,
+        'snapshot': await SnapshotScreener.objects.afirst(),
+        'presets': presets,
+        'preset': preset,
     }
-    return render(request, 'radar_mercado.html', context)
\ No newline at end of file
+    # Template e context processors (sessão, usuário) são síncronos
+    return await sync_to_async(render)(request, 'radar_mercado.html', context)
+
+@login_required
+def preset_novo(request):
+    if request.method == 'POST':
+        form = PresetScreenerForm(request.POST)
+        if form.is_valid():
+            preset = form.save(commit=False)
+            preset.user = request.user
+            preset.save()
+            return redirect(f"{reverse('radar_mercado')}?preset={preset.pk}")
+    else:
+        form = PresetScreenerForm()
+    return render(request, 'form_generico.html', {'form': form, 'titulo': 'Novo Filtro do Radar'})
+
+@login_required
+def preset_deletar(request, id):
+    preset = get_object_or_404(PresetScreener, pk=id, user=request.user)
+    preset.delete()
+    return redirect('radar_mercado')
+
+# --- MÉTRICAS (perfilamento) ---
+def metricas(request):
+    """ Histogramas por view no formato do Prometheus (staff ou token do scraper) """
+    if not pode_ver_metricas(request):
+        raise Http404()
+    return HttpResponse(texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
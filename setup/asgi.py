@@ -3,6 +3,11 @@ ASGI config for setup project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+É o que o Procfile serve (``gunicorn setup.asgi -k uvicorn_worker.UvicornWorker``):
+radar_mercado e bot_executar são views async e esperam a rede sem ocupar um
+worker. Com o PERFILAMENTO ligado, o middleware dele é síncrono e o Django
+volta a rodar as requisições numa thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
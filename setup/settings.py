@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Opt-in (PERFILAMENTO abaixo); desligado, nem entra na cadeia
+    'core.perfilamento.PerfilamentoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise que também aceita views async (core/middleware.py)
+    'core.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'setup.urls'
@@ -141,3 +144,51 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Cache compartilhado de dados de mercado (core/cache_mercado.py)
+# BACKEND: 'memoria' (LRU em processo) ou 'django' (usa CACHES[ALIAS])
+MERCADO_CACHE = {
+    'BACKEND': os.environ.get('MERCADO_CACHE_BACKEND', 'memoria'),
+    'ALIAS': 'default',
+    'TTL': {'preco': 5 * 60, 'info': 6 * 60 * 60, 'dividendos': 12 * 60 * 60, 'screener': 30 * 60},
+}
+
+# Cliente HTTP assíncrono das views async (core/http_async.py)
+HTTP_ASYNC = {
+    'CONEXOES': 20,
+    'TIMEOUT': 20,
+}
+
+# Widgets do dashboard em cache (core/painel_logic.py): fragmentos por
+# usuário em CACHES[ALIAS]. As versões ficam no banco (VersaoWidget), então
+# um cache local a cada worker só custa misses, nunca fragmento velho.
+PAINEL_CACHE = {
+    'ALIAS': 'default',
+    'TTL': 6 * 60 * 60,
+    'TTL_AGENDA': 5 * 60,
+}
+
+# Posição dos ativos (core/posicao_logic.py): confere cada delta com o
+# replay completo das operações. Mais lento; útil para depuração.
+POSICAO_VERIFICAR_REPLAY = os.environ.get('POSICAO_VERIFICAR_REPLAY', '') == '1'
+
+# Perfilamento por requisição (core/perfilamento.py): Server-Timing, log
+# estruturado e /metrics. AMOSTRAGEM = fração das requisições medidas.
+PERFILAMENTO = {
+    'ATIVO': os.environ.get('PERFILAMENTO', '') == '1',
+    'AMOSTRAGEM': float(os.environ.get('PERFILAMENTO_AMOSTRAGEM', '1.0')),
+    'LIMITE_REPETIDAS': 2,
+    'METRICAS_TOKEN': os.environ.get('METRICAS_TOKEN', ''),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Uma linha JSON por requisição medida
+        'core.perfilamento': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}